@@ -1,12 +1,17 @@
+import hashlib
+import os
+import zipfile
 from dataclasses import dataclass
 from typing import List
 
+import numpy as np
+
 
 @dataclass
 class Node:
     id: int
     family: int
-    costs: List[int]
+    costs: np.ndarray  # Row of Model.cost_matrix (a view, not a copy)
     demand: int
     isDepot: bool = False
 
@@ -29,14 +34,33 @@ class Model:
     fam_members: List[int] = None
     fam_req: List[int] = None
     fam_dem: List[int] = None
-    cost_matrix: List[List[int]] = None
+    cost_matrix: np.ndarray = None  # (num_nodes + 1) x (num_nodes + 1), int32 (or read-only memmap)
     families: List[Family] = None
     nodes: List[Node] = None
     customers: List[Node] = None
     depot: Node = None
 
+    def __getstate__(self):
+        """
+        Pickle only the parsed data. Nodes and families are rebuilt on
+        unpickling, so their cost rows stay views of one matrix; a
+        memory-mapped matrix is sent as its file path and mapped again.
+        """
+        state = self.__dict__.copy()
+        state["families"] = state["nodes"] = state["customers"] = state["depot"] = None
+        if isinstance(self.cost_matrix, np.memmap) and self.cost_matrix.filename:
+            state["cost_matrix"] = self.cost_matrix.filename
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self.cost_matrix, str):
+            self.cost_matrix = np.load(self.cost_matrix, mmap_mode="r")
+        if self.cost_matrix is not None:
+            create_nodes_families(self)
 
-def load_model(file_name):
+
+def load_model(file_name, use_cache=True, mmap=False):
     """
     Parse the CVPR problem instance from a file.
     Format:
@@ -45,15 +69,47 @@ def load_model(file_name):
     3rd line: List of family visits (vl)
     4th line: List of family demands (dl)
     5th line until end: Cost matrix (cij)
+
+    The file is read once. The cost matrix is parsed in bulk by NumPy and,
+    if use_cache is True, stored in a binary sidecar file keyed by the hash
+    of the instance file, so later runs on the same instance skip text
+    parsing entirely.
+
+    With mmap=True the matrix is kept in a sidecar .npy file (int16 when the
+    values fit, int32 otherwise) and opened as a read-only numpy.memmap. It
+    is parsed row by row straight into that file, so even instances with
+    tens of thousands of nodes never hold the matrix in memory; processes
+    opening the same instance share it through the page cache.
     """
 
+    if mmap:
+        return load_model_mmap(file_name)
+
+    with open(file_name, "rb") as f:
+        raw = f.read()
+
+    cache_file = cache_path(file_name, hashlib.blake2b(raw, digest_size=8).hexdigest())
+    parsed_model = read_cache(cache_file) if use_cache else None
+
+    if parsed_model is None:
+        parsed_model = parse_instance(raw)
+        if use_cache:
+            write_cache(cache_file, parsed_model)
+
+    # Create node and family objects
+    parsed_model = create_nodes_families(parsed_model)
+
+    return parsed_model
+
+
+def parse_header(all_lines):
+    """
+    Parse the first four lines of an instance into a Model without a matrix.
+    """
     parsed_model = Model()
-    all_lines = list(open(file_name, "r"))
-    line_counter = 0
 
     # 1st line: |N| L V Q K
-    ln = all_lines[line_counter]
-    no_spaces = ln.split()
+    no_spaces = all_lines[0].split()
 
     parsed_model.num_nodes = int(no_spaces[0])
     parsed_model.num_fam = int(no_spaces[1])
@@ -62,29 +118,114 @@ def load_model(file_name):
     parsed_model.vehicles = int(no_spaces[4])
 
     # 2nd line: List of family members (nl)
-    line_counter += 1
-    ln = all_lines[line_counter]
-    parsed_model.fam_members = list(map(int, ln.split()))
+    parsed_model.fam_members = list(map(int, all_lines[1].split()))
 
     # 3rd line: List of family visits (vl)
-    line_counter += 1
-    ln = all_lines[line_counter]
-    parsed_model.fam_req = list(map(int, ln.split()))
+    parsed_model.fam_req = list(map(int, all_lines[2].split()))
 
     # 4th line: List of family demands (dl)
-    line_counter += 1
-    ln = all_lines[line_counter]
-    parsed_model.fam_dem = list(map(int, ln.split()))
+    parsed_model.fam_dem = list(map(int, all_lines[3].split()))
+
+    return parsed_model
+
+
+def parse_instance(raw):
+    """
+    Parse the contents of an instance file (see load_model for the format)
+    into a Model without nodes and families.
+    """
+    all_lines = raw.split(b"\n", 4)
+    parsed_model = parse_header(all_lines)
+
+    # 5th line until end: Cost matrix (cij), parsed as one block of integers
+    size = parsed_model.num_nodes + 1  # +1 for depot
+    values = np.fromstring(all_lines[4], dtype=np.int32, sep=" ")
+    if values.size < size * size:
+        raise ValueError(f"Cost matrix has {values.size} entries, expected {size} x {size}")
 
-    # 5th line until end: Cost matrix (cij)
-    cost_matrix = []
-    for i in range(parsed_model.num_nodes + 1):  # +1 for depot
-        line_counter += 1
-        ln = all_lines[line_counter]
-        no_spaces = list(map(int, ln.split()))
-        cost_matrix.append(no_spaces)
+    # A single contiguous int32 matrix shared by every consumer of the model
+    parsed_model.cost_matrix = np.ascontiguousarray(values[:size * size].reshape(size, size))
+
+    return parsed_model
 
-    parsed_model.cost_matrix = cost_matrix
+
+def file_digest(file_name, chunk_size=1 << 20):
+    """
+    Hash of a file's contents, read in chunks.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(file_name, digest, extension="npz"):
+    """
+    Sidecar cache file of an instance, named after the hash of its contents.
+    """
+    return f"{file_name}.{digest}.{extension}"
+
+
+def read_cache(cache_file):
+    """
+    Load a Model (without nodes and families) from a sidecar cache file.
+
+    Returns:
+        The Model, or None if there is no usable cache file
+    """
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with np.load(cache_file) as data:
+            header = data["header"].tolist()
+            parsed_model = Model(*header)
+            parsed_model.fam_members = data["fam_members"].tolist()
+            parsed_model.fam_req = data["fam_req"].tolist()
+            parsed_model.fam_dem = data["fam_dem"].tolist()
+            parsed_model.cost_matrix = np.ascontiguousarray(data["cost_matrix"])
+    except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+        return None  # Unreadable or stale cache, parse the text instead
+    return parsed_model
+
+
+def write_cache(cache_file, parsed_model):
+    """
+    Write the parsed data to a sidecar cache file. The file is written under
+    a temporary name and renamed, so a concurrent reader never sees a
+    partial file. Failing to write the cache is not an error.
+    """
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            np.savez(
+                f,
+                header=np.array([parsed_model.num_nodes, parsed_model.num_fam, parsed_model.num_req,
+                                 parsed_model.capacity, parsed_model.vehicles]),
+                fam_members=np.array(parsed_model.fam_members),
+                fam_req=np.array(parsed_model.fam_req),
+                fam_dem=np.array(parsed_model.fam_dem),
+                cost_matrix=parsed_model.cost_matrix,
+            )
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def load_model_mmap(file_name):
+    """
+    load_model(file_name, mmap=True): the matrix is a read-only memmap of a
+    sidecar .npy file, created on the first call for given file contents.
+    """
+    matrix_file = cache_path(file_name, file_digest(file_name), "npy")
+
+    with open(file_name, "rb") as f:
+        parsed_model = parse_header([f.readline() for _ in range(4)])
+        if not os.path.exists(matrix_file):
+            write_matrix_file(f, parsed_model.num_nodes + 1, matrix_file)
+
+    parsed_model.cost_matrix = np.load(matrix_file, mmap_mode="r")
 
     # Create node and family objects
     parsed_model = create_nodes_families(parsed_model)
@@ -92,6 +233,46 @@ def load_model(file_name):
     return parsed_model
 
 
+def write_matrix_file(f, size, matrix_file, chunk_rows=1024):
+    """
+    Stream the cost matrix rows of an open instance file into a .npy file.
+
+    Rows are parsed one at a time into an int32 file; if every value fits in
+    int16 the matrix is then copied, in chunks, into a half-size int16 file.
+    """
+    wide_file = f"{matrix_file}.{os.getpid()}.int32.tmp"
+    narrow_file = f"{matrix_file}.{os.getpid()}.tmp"
+    try:
+        wide = np.lib.format.open_memmap(wide_file, mode="w+", dtype=np.int32, shape=(size, size))
+        low, high = 0, 0
+        for i in range(size):
+            row = np.fromstring(f.readline(), dtype=np.int32, sep=" ")
+            if row.size < size:
+                raise ValueError(f"Cost matrix row {i} has {row.size} entries, expected {size}")
+            wide[i] = row[:size]
+            low = min(low, int(row[:size].min()))
+            high = max(high, int(row[:size].max()))
+        wide.flush()
+
+        limits = np.iinfo(np.int16)
+        if limits.min <= low and high <= limits.max:
+            narrow = np.lib.format.open_memmap(narrow_file, mode="w+", dtype=np.int16, shape=(size, size))
+            for start in range(0, size, chunk_rows):
+                narrow[start:start + chunk_rows] = wide[start:start + chunk_rows]
+            narrow.flush()
+            del narrow
+            del wide
+            os.remove(wide_file)
+        else:
+            del wide
+            os.replace(wide_file, narrow_file)
+        os.replace(narrow_file, matrix_file)
+    finally:
+        for tmp_file in (wide_file, narrow_file):
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+
 def find_position(arr, target):
     """
     Find the position of target in the cumulative sum array
@@ -1,3 +1,6 @@
+from solution_io import is_binary, read_solution
+
+
 def validate_solution(model, routes):
     """
     Validates if the given routes form a valid solution for the CVPR problem.
@@ -69,13 +72,13 @@ def validate_solution(model, routes):
                 route_load += node.demand
 
             # Update route cost
-            route_cost += model.cost_matrix[prev_node_id][node_id]
+            route_cost += int(model.cost_matrix[prev_node_id][node_id])
             prev_node_id = node_id
 
         # Add cost of returning to depot
         if len(route) > 1:
             last_node_id = route[-2]
-            route_cost += model.cost_matrix[last_node_id][0]
+            route_cost += int(model.cost_matrix[last_node_id][0])
 
         # Check if route exceeds vehicle capacity
         if route_load > model.capacity:
@@ -102,20 +105,27 @@ def parse_solution_file(solution_file):
     """
     Parse a solution file into a list of routes.
 
+    Plain files hold one route per line. Files written by
+    solution_io.SolutionWriter (text with "#" headers, or binary) may hold
+    several solutions and updates; the last solution is returned.
+
     Args:
         solution_file: Path to the solution file
 
     Returns:
         routes: List of routes, where each route is a list of node IDs
     """
-    routes = []
-
-    with open(solution_file, 'r') as f:
-        lines = f.readlines()
-
-    for line in lines:
-        if line.strip():
-            route = list(map(int, line.strip().split()))
-            routes.append(route)
-
-    return routes
\ No newline at end of file
+    if not is_binary(solution_file):
+        with open(solution_file, 'r') as f:
+            lines = f.readlines()
+
+        if not any(line.lstrip().startswith('#') for line in lines):
+            routes = []
+            for line in lines:
+                if line.strip():
+                    route = list(map(int, line.strip().split()))
+                    routes.append(route)
+            return routes
+
+    record = read_solution(solution_file)
+    return record.routes if record is not None else []
\ No newline at end of file
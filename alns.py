@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive Large Neighbourhood Search (ALNS).
+
+Every iteration removes a number of visited nodes from the current solution
+with a destroy operator and repairs it with a repair operator. Removing a
+node leaves its family short of visits, and repair may fill the gap with
+any unvisited member of that family, not just the removed one.
+
+Destroy operators:
+    random   uniformly chosen nodes
+    worst    nodes whose removal saves the most (randomised)
+    shaw     nodes related to each other: close in cost, same family (Shaw removal)
+    family   every visited member of one family
+
+Repair operators:
+    greedy   cheapest feasible insertion first
+    regret2  node with the largest regret over its 2 best routes first
+    regret3  as regret2 over the 3 best routes
+
+Operators are picked by roulette wheel over adaptive weights, updated once
+per segment from the scores of the operators in that segment. A candidate
+is accepted with the simulated annealing criterion. The best and second
+best insertion of every node into every route are kept in an
+insertion_cache.InsertionCache: destroy invalidates the routes it changed,
+and every repair insertion updates only the route it went into.
+
+Example:
+    python alns.py fcvrp_P-n101-k4_10_3_3.txt --iterations 2000
+"""
+import argparse
+import itertools
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+import instrumentation
+from Parser import load_model
+from bounds import GapStopper, gap, lower_bound
+from const_heuristic import Fcvrp
+from insertion_cache import InsertionCache
+from operators import descend
+from progress import configure_logging
+from solution_state import Solution
+
+logger = logging.getLogger(__name__)
+
+DESTROY_OPERATORS = ("random", "worst", "shaw", "family")
+REPAIR_OPERATORS = ("greedy", "regret2", "regret3")
+
+# Scores of the operator pair of an iteration (Ropke & Pisinger)
+SCORE_BEST = 33  # New best solution
+SCORE_BETTER = 9  # Better than the current solution
+SCORE_ACCEPTED = 13  # Worse, but accepted
+
+
+def _changed_routes(routes, other):
+    """
+    Indices of the routes that differ between two solutions with the same number of routes.
+    """
+    return [route_index for route_index, (route, other_route) in enumerate(zip(routes, other))
+            if route != other_route]
+
+
+# Destroy operators: remove up to q visited nodes from state and return them
+
+def _visited(state):
+    return [node for route in state.routes for node in route]
+
+
+def _remove(state, nodes):
+    where = {node: route_index for route_index, route in enumerate(state.routes) for node in route}
+    for node in nodes:
+        route_index = where[node]
+        state.remove_node(route_index, state.routes[route_index].index(node))
+
+
+def destroy_random(state, q, rng, context):
+    visited = _visited(state)
+    removed = rng.sample(visited, min(q, len(visited)))
+    _remove(state, removed)
+    return removed
+
+
+def destroy_worst(state, q, rng, context, power=3):
+    costs = state.costs
+    gains = []
+    for route in state.routes:
+        for idx, node in enumerate(route):
+            prev_node = route[idx - 1] if idx > 0 else 0
+            next_node = route[idx + 1] if idx + 1 < len(route) else 0
+            saved = int(costs[prev_node][node]) + int(costs[node][next_node])
+            saved -= 0 if prev_node == next_node else int(costs[prev_node][next_node])
+            gains.append((saved, node))
+    gains.sort(reverse=True)
+    ranked = [node for _, node in gains]
+
+    removed = []
+    while ranked and len(removed) < q:
+        # y^p favours the most expensive nodes without always taking the same ones
+        removed.append(ranked.pop(int(rng.random() ** power * len(ranked))))
+    _remove(state, removed)
+    return removed
+
+
+def destroy_shaw(state, q, rng, context, power=6, family_weight=0.5):
+    matrix = context["matrix"]
+    families = context["families"]
+    remaining = np.array(_visited(state), dtype=np.intp)
+    if remaining.size == 0:
+        return []
+    scale = max(int(context["max_cost"]), 1)
+
+    seed = int(remaining[rng.randrange(remaining.size)])
+    removed = [seed]
+    remaining = remaining[remaining != seed]
+    while remaining.size and len(removed) < q:
+        reference = removed[rng.randrange(len(removed))]
+        # Lower is more related: short arc and, with a smaller weight, the same family
+        relatedness = (matrix[reference, remaining] / scale
+                       + family_weight * (families[remaining] != families[reference]))
+        order = np.argsort(relatedness, kind="stable")
+        chosen = int(remaining[order[int(rng.random() ** power * remaining.size)]])
+        removed.append(chosen)
+        remaining = remaining[remaining != chosen]
+    _remove(state, removed)
+    return removed
+
+
+def destroy_family(state, q, rng, context):
+    visited_families = sorted({state.node_family[node] for node in _visited(state)})
+    if not visited_families:
+        return []
+    family_id = rng.choice(visited_families)
+    removed = [node for node in _visited(state) if state.node_family[node] == family_id]
+    _remove(state, removed)
+    return removed
+
+
+DESTROY = {
+    "random": destroy_random,
+    "worst": destroy_worst,
+    "shaw": destroy_shaw,
+    "family": destroy_family,
+}
+
+
+# Repair operators: restore the required visits of every family
+
+def _candidates(state):
+    """
+    Unvisited members of every family that is short of its required visits.
+    """
+    nodes = []
+    for family in state.model.families:
+        if state.family_visits[family.id] < family.required_visits:
+            nodes.extend(state.unvisited_members(family.id))
+    return np.array(nodes, dtype=np.intp)
+
+
+def repair(state, cache, context, regret=1):
+    """
+    Insert family members until every family has its required visits.
+
+    Args:
+        state: Solution to repair, changed in place
+        cache: InsertionCache over the routes of state
+        context: Shared arrays of the search
+        regret: 1 for greedy insertion, k >= 2 for regret-k insertion
+
+    Returns:
+        True if every family was restored, False if some member could not
+        be inserted anywhere without exceeding the capacity
+    """
+    while True:
+        candidates = _candidates(state)
+        if candidates.size == 0:
+            return True
+        # Capacity violations are infinite
+        costs = cache.feasible_costs(candidates)
+        best = costs.min(axis=0)
+        if not np.isfinite(best).any():
+            return False
+
+        if regret <= 1:
+            column = int(np.argmin(best))
+        else:
+            k = min(regret, costs.shape[0])
+            nearest = np.sort(np.partition(costs, k - 1, axis=0)[:k], axis=0)
+            with np.errstate(invalid="ignore"):
+                regrets = (nearest[1:] - nearest[0]).sum(axis=0)
+            # Nodes with fewer than k feasible routes have infinite regret and go first
+            regrets[~np.isfinite(best)] = -np.inf
+            column = int(np.lexsort((best, -regrets))[0])
+
+        route_index = int(np.argmin(costs[:, column]))
+        node = int(candidates[column])
+        position = cache.position(route_index, node)
+        state.insert_node(route_index, position, node)
+        cache.insert(route_index, position, node)
+
+
+def _roulette(weights, rng):
+    pick = rng.random() * sum(weights)
+    for index, weight in enumerate(weights):
+        pick -= weight
+        if pick <= 0:
+            return index
+    return len(weights) - 1
+
+
+def alns_search(initial_solution, model, max_iterations=1000, time_limit=None, patience=None, seed=None,
+                destroy_operators=DESTROY_OPERATORS, repair_operators=REPAIR_OPERATORS, min_removal=None,
+                max_removal=None, segment_length=100, reaction=0.1, start_worse=0.05, end_temperature_ratio=0.002,
+                operators=None, candidates=None, on_improvement=None, stats=None):
+    """
+    Adaptive Large Neighbourhood Search from an initial solution.
+
+    Args:
+        initial_solution: Feasible list of routes, e.g. Fcvrp.solution
+        model: The problem model
+        max_iterations: Number of destroy/repair iterations (None for no
+                        limit, if time_limit or patience is given)
+        time_limit: Optional wall-clock limit in seconds
+        patience: Optional number of iterations without a new best solution
+                  after which the search stops
+        seed: Random seed
+        destroy_operators: Names from DESTROY_OPERATORS
+        repair_operators: Names from REPAIR_OPERATORS
+        min_removal, max_removal: Range of the number of nodes removed per
+                                  iteration (default: 5% to 30% of the visited
+                                  nodes, at most 60)
+        segment_length: Iterations between two updates of the operator weights
+        reaction: How fast the weights follow the scores (0 keeps them fixed)
+        start_worse: A solution this much worse than the initial one (as a
+                     fraction) is accepted with probability 1/2 at the start
+        end_temperature_ratio: Final temperature as a fraction of the initial one
+        operators: Optional names from operators.OPERATORS; every new best
+                   solution is improved further by descend()
+        candidates: Optional candidates.CandidateLists for descend()
+        on_improvement: Optional callable on_improvement(solution, cost) called
+                        for every new best solution; returning True stops the search
+        stats: Optional dictionary that receives the iteration count, the
+               final operator weights and the number of accepted candidates
+
+    Returns:
+        best_solution: The best solution found (non-empty routes)
+        best_cost: Its cost
+    """
+    if max_iterations is None and time_limit is None and patience is None:
+        raise ValueError("alns_search: max_iterations, time_limit or patience is required")
+    unknown = (set(destroy_operators) - set(DESTROY)) | (set(repair_operators) - set(REPAIR_OPERATORS))
+    if unknown:
+        raise ValueError(f"Unknown ALNS operators: {sorted(unknown)}")
+
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    # Unused vehicles are kept as empty routes so repair can open them
+    routes = [list(route) for route in initial_solution if route]
+    routes += [[] for _ in range(model.vehicles - len(routes))]
+    current = Solution(model, routes)
+    best = current.copy()
+    matrix = np.asarray(model.cost_matrix)
+    cache = InsertionCache(matrix, current.routes, current.demands, model.capacity)
+    context = {
+        "matrix": matrix,
+        "max_cost": matrix.max(),
+        "families": np.array([-1] + current.node_family[1:], dtype=np.intp),
+    }
+    regret_of = {"greedy": 1, "regret2": 2, "regret3": 3}
+
+    destroy_weights = [1.0] * len(destroy_operators)
+    repair_weights = [1.0] * len(repair_operators)
+    destroy_scores = [0.0] * len(destroy_operators)
+    repair_scores = [0.0] * len(repair_operators)
+    destroy_uses = [0] * len(destroy_operators)
+    repair_uses = [0] * len(repair_operators)
+
+    temperature = start_worse * max(current.total_cost, 1) / math.log(2)
+    if max_iterations:
+        cooling = end_temperature_ratio ** (1 / max_iterations)
+    else:
+        cooling = 0.9995
+
+    visited = len(_visited(current))
+    low = min_removal if min_removal is not None else max(1, int(0.05 * visited))
+    high = max_removal if max_removal is not None else max(low, min(60, int(0.3 * visited)))
+    last_improvement = 0
+    accepted = 0
+    done = 0
+    instrumentation.improvement("alns", 0, best.total_cost)
+
+    for iteration in (itertools.count() if max_iterations is None else range(max_iterations)):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if patience is not None and iteration - last_improvement >= patience:
+            break
+        instrumentation.count("alns.iterations")
+        done += 1
+
+        d = _roulette(destroy_weights, rng)
+        r = _roulette(repair_weights, rng)
+        candidate = current.copy()
+        cache.rebind(candidate.routes)
+        with instrumentation.phase("alns.destroy"):
+            DESTROY[destroy_operators[d]](candidate, rng.randint(low, high), rng, context)
+            cache.invalidate(*_changed_routes(current.routes, candidate.routes))
+        with instrumentation.phase("alns.repair"):
+            repaired = repair(candidate, cache, context, regret_of[repair_operators[r]])
+
+        score = 0
+        if repaired:
+            delta = candidate.total_cost - current.total_cost
+            if candidate.total_cost < best.total_cost:
+                if operators:
+                    repaired_routes = [route[:] for route in candidate.routes]
+                    with instrumentation.phase("alns.descend"):
+                        descend(candidate, operators, candidates, deadline=deadline)
+                    cache.invalidate(*_changed_routes(repaired_routes, candidate.routes))
+                score = SCORE_BEST
+            elif delta < 0:
+                score = SCORE_BETTER
+            elif temperature > 0 and rng.random() < math.exp(-delta / temperature):
+                score = SCORE_ACCEPTED
+
+        if score:
+            current = candidate
+            accepted += 1
+            if current.total_cost < best.total_cost:
+                best = current.copy()
+                last_improvement = iteration
+                instrumentation.improvement("alns", iteration + 1, best.total_cost)
+                if on_improvement is not None and on_improvement([route[:] for route in best.routes if route],
+                                                                 best.total_cost):
+                    break
+        else:
+            # The cache follows the candidate: point it back at the current solution
+            cache.rebind(current.routes)
+            cache.invalidate(*_changed_routes(current.routes, candidate.routes))
+
+        destroy_scores[d] += score
+        repair_scores[r] += score
+        destroy_uses[d] += 1
+        repair_uses[r] += 1
+        temperature *= cooling
+
+        if (iteration + 1) % segment_length == 0:
+            for weights, scores, uses in ((destroy_weights, destroy_scores, destroy_uses),
+                                          (repair_weights, repair_scores, repair_uses)):
+                for index in range(len(weights)):
+                    if uses[index]:
+                        weights[index] = (1 - reaction) * weights[index] + reaction * scores[index] / uses[index]
+                    weights[index] = max(weights[index], 0.01)  # Every operator keeps a small chance
+                    scores[index] = 0.0
+                    uses[index] = 0
+
+    if stats is not None:
+        stats["iterations"] = done
+        stats["accepted"] = accepted
+        stats["destroy_weights"] = dict(zip(destroy_operators, destroy_weights))
+        stats["repair_weights"] = dict(zip(repair_operators, repair_weights))
+        stats["cache_recomputed"] = cache.rows_computed
+
+    return [route[:] for route in best.routes if route], best.total_cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ALNS for the FCVRP, starting from the construction heuristic")
+    parser.add_argument("instance", nargs="?", default="fcvrp_P-n101-k4_10_3_3.txt")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target-gap", type=float, default=None,
+                        help="Stop once the cost is within this relative gap of the lower bound, e.g. 0.05")
+    args = parser.parse_args()
+    configure_logging(logging.INFO)
+
+    model = load_model(args.instance)
+    constructor = Fcvrp(None, model=model)
+    constructor.visit_nodes()
+    bound = lower_bound(model, upper_bound=Solution(model, constructor.solution).total_cost)
+    stopper = GapStopper(bound, args.target_gap) if args.target_gap is not None else None
+    stats = {}
+    solution, cost = alns_search(constructor.solution, model, args.iterations, args.time_limit, seed=args.seed,
+                                 on_improvement=stopper, stats=stats)
+    valid, report = Solution(model, solution).report()
+    logger.info("ALNS cost %s (valid: %s) after %s iterations", cost, valid, stats["iterations"])
+    logger.info("Lower bound %s, gap %.2f%%", bound, 100 * gap(cost, bound))
+    logger.info("Destroy weights: %s", {name: round(weight, 2) for name, weight in stats["destroy_weights"].items()})
+    logger.info("Repair weights: %s", {name: round(weight, 2) for name, weight in stats["repair_weights"].items()})
+
+
+if __name__ == "__main__":
+    main()
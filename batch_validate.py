@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Batch validation of many solutions against one instance.
+
+The model is parsed once and handed to every worker of a process pool when
+the worker starts. Each solution is checked with NumPy over the cost
+matrix: all arcs of a solution are gathered and summed per route in one
+pass, and the loads and family visits are counted with bincount. Malformed
+solutions (an unknown node, a node visited twice or a route without
+customers) fall back to SolutionValidator.validate_solution, so their
+error report is exactly the one of the reference validator.
+
+Input is either solution files (one route per line, or the text and binary
+formats of solution_io, as read by SolutionValidator.parse_solution_file;
+the last solution of a file is validated) or, with "-", one solution per line
+of stdin with the routes separated by the depot ("0 5 3 0 7 2 0"). Input is
+consumed in batches, so arbitrarily long streams use bounded memory.
+
+Example:
+    python batch_validate.py fcvrp_P-n101-k4_10_3_3.txt solutions/*.txt --format csv
+    solver | python batch_validate.py fcvrp_P-n101-k4_10_3_3.txt - --format json
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Parser import load_model
+from SolutionValidator import parse_solution_file, validate_solution
+from progress import configure_logging
+
+logger = logging.getLogger(__name__)
+
+CSV_FIELDS = ["solution", "valid", "cost", "vehicles", "route_loads", "route_costs", "family_visits", "errors"]
+
+# Arrays of the model shared by every task of a worker process, set by _init_worker
+_worker_arrays = None
+
+
+class ModelArrays:
+    """
+    The parts of a model needed for validation, as NumPy arrays.
+
+    Attributes:
+        model: The problem model
+        costs: Cost matrix
+        demands: demands[node_id] is the demand of the node
+        families: families[node_id] is the family of the node (-1 for the depot)
+        required: required[family_id] is the number of required visits
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.costs = np.asarray(model.cost_matrix)
+        self.demands = np.array([node.demand for node in model.nodes], dtype=np.int64)
+        self.families = np.array([-1 if node.family is None else node.family for node in model.nodes],
+                                 dtype=np.intp)
+        self.required = np.array([family.required_visits for family in model.families], dtype=np.int64)
+
+
+def split_routes(values):
+    """
+    Split a depot-delimited sequence ("0 5 3 0 7 2 0") into routes with the
+    depot at both ends.
+    """
+    routes = []
+    route = []
+    for value in values:
+        if value == 0:
+            if route:
+                routes.append([0] + route + [0])
+            route = []
+        else:
+            route.append(value)
+    if route:
+        routes.append([0] + route + [0])
+    return routes
+
+
+def validate_routes(arrays, routes):
+    """
+    Vectorised equivalent of SolutionValidator.validate_solution.
+
+    Args:
+        arrays: ModelArrays of the instance
+        routes: List of routes, each starting and ending at the depot
+
+    Returns:
+        valid: Boolean indicating if the solution is valid
+        validation_report: Dictionary in the format of validate_solution,
+                           with family_visits as a list indexed by family id
+    """
+    model = arrays.model
+    interior = [np.asarray(route[1:-1], dtype=np.int64) for route in routes]
+    nodes = np.concatenate(interior) if interior else np.empty(0, dtype=np.int64)
+    lengths = np.array([len(route) for route in interior], dtype=np.int64)
+
+    # Malformed solutions (missing depot endpoints, a depot inside a route, unknown or repeated
+    # nodes): the reference validator reports exactly what is wrong
+    if (not routes or lengths.min() == 0
+            or any(route[0] != 0 or route[-1] != 0 for route in routes)
+            or nodes.min() <= 0 or nodes.max() > model.num_nodes
+            or np.bincount(nodes).max(initial=0) > 1):
+        valid, report = validate_solution(model, routes)
+        report["family_visits"] = [report["family_visits"][family.id] for family in model.families]
+        return valid, report
+
+    errors = []
+    if len(routes) > model.vehicles:
+        errors.append(f"Too many vehicles used: {len(routes)} > {model.vehicles}")
+
+    # Arc into every node (from the depot for the first node of a route) plus the arc back to the depot
+    route_ids = np.repeat(np.arange(len(routes)), lengths)
+    ends = np.cumsum(lengths) - 1
+    prev = np.empty_like(nodes)
+    prev[1:] = nodes[:-1]
+    prev[ends[:-1] + 1] = 0
+    prev[0] = 0
+    arc_costs = arrays.costs[prev, nodes].astype(np.int64)
+    route_costs = np.bincount(route_ids, weights=arc_costs, minlength=len(routes)).astype(np.int64)
+    route_costs += arrays.costs[nodes[ends], 0]
+
+    route_loads = np.bincount(route_ids, weights=arrays.demands[nodes], minlength=len(routes)).astype(np.int64)
+    node_families = arrays.families[nodes]
+    family_visits = np.bincount(node_families[node_families >= 0], minlength=len(arrays.required))
+
+    for route_idx in np.flatnonzero(route_loads > model.capacity):
+        errors.append(f"Route {route_idx} exceeds capacity: {route_loads[route_idx]} > {model.capacity}")
+    for family_id in np.flatnonzero(family_visits < arrays.required):
+        errors.append(f"Family {family_id} has insufficient visits: "
+                      f"{family_visits[family_id]} < {arrays.required[family_id]}")
+
+    report = {
+        "valid": not errors,
+        "total_cost": int(route_costs.sum()),
+        "errors": errors,
+        "route_loads": route_loads.tolist(),
+        "route_costs": route_costs.tolist(),
+        "family_visits": family_visits.tolist(),
+    }
+    return report["valid"], report
+
+
+def _summary(name, routes):
+    valid, report = validate_routes(_worker_arrays, routes)
+    return {
+        "solution": name,
+        "valid": valid,
+        "cost": report["total_cost"],
+        "vehicles": len(routes),
+        "route_loads": report["route_loads"],
+        "route_costs": report["route_costs"],
+        "family_visits": report["family_visits"],
+        "errors": report["errors"],
+    }
+
+
+def _init_worker(model):
+    global _worker_arrays
+    _worker_arrays = ModelArrays(model)
+
+
+def validate_file(solution_file):
+    """
+    Validate one solution file in a worker; unreadable files are reported as invalid.
+    """
+    try:
+        routes = parse_solution_file(solution_file)
+    except (OSError, ValueError) as error:
+        return {"solution": solution_file, "valid": False, "cost": None, "vehicles": 0, "route_loads": [],
+                "route_costs": [], "family_visits": [], "errors": [f"Unreadable solution: {error}"]}
+    return _summary(solution_file, routes)
+
+
+def validate_line(item):
+    """
+    Validate one depot-delimited solution line, given as (name, line), in a worker.
+    """
+    name, line = item
+    try:
+        values = [int(value) for value in line.split()]
+    except ValueError as error:
+        return {"solution": name, "valid": False, "cost": None, "vehicles": 0, "route_loads": [],
+                "route_costs": [], "family_visits": [], "errors": [f"Unreadable solution: {error}"]}
+    return _summary(name, split_routes(values))
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_batch(model, items, task=validate_file, workers=None, batch_size=1024, chunksize=32):
+    """
+    Validate many solutions with one parsed model.
+
+    Args:
+        model: The problem model
+        items: Iterable of solution files (task=validate_file) or of
+               (name, line) pairs (task=validate_line); consumed lazily
+        task: validate_file or validate_line
+        workers: Number of worker processes (default: one per CPU); 1 runs
+                 in this process without a pool
+        batch_size: Number of items handed to the pool at a time
+        chunksize: Number of items sent to a worker per message
+
+    Yields:
+        One summary dictionary per solution, in input order
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        _init_worker(model)
+        for item in items:
+            yield task(item)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as executor:
+        for batch in _batched(items, batch_size):
+            yield from executor.map(task, batch, chunksize=chunksize)
+
+
+def write_csv(summaries, stream):
+    writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for summary in summaries:
+        row = dict(summary)
+        for key in ("route_loads", "route_costs", "family_visits"):
+            row[key] = " ".join(map(str, summary[key]))
+        row["errors"] = "; ".join(summary["errors"])
+        writer.writerow(row)
+        yield summary
+
+
+def write_json_lines(summaries, stream):
+    for summary in summaries:
+        stream.write(json.dumps(summary) + "\n")
+        yield summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate many FCVRP solutions against one instance")
+    parser.add_argument("instance")
+    parser.add_argument("solutions", nargs="+",
+                        help="Solution files, or - to read one depot-delimited solution per stdin line")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv",
+                        help="csv, or json for one JSON object per line")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mmap", action="store_true", help="Memory-map the cost matrix (large instances)")
+    args = parser.parse_args()
+    configure_logging(logging.INFO)
+
+    model = load_model(args.instance, mmap=args.mmap)
+    if args.solutions == ["-"]:
+        items = ((f"stdin:{number}", line) for number, line in enumerate(sys.stdin, 1) if line.strip())
+        task = validate_line
+    else:
+        items = args.solutions
+        task = validate_file
+
+    stream = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = write_csv if args.format == "csv" else write_json_lines
+        total = valid = 0
+        for summary in writer(validate_batch(model, items, task, args.workers), stream):
+            total += 1
+            valid += summary["valid"]
+    finally:
+        if args.output:
+            stream.close()
+    logger.info("Validated %d solutions: %d valid, %d invalid", total, valid, total - valid)
+
+
+if __name__ == "__main__":
+    main()
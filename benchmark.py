@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark harness for the FCVRP pipeline.
+
+Generates synthetic instances (see instance_generator.py) at several sizes,
+runs the construction heuristic, local search and tabu search on each and
+records wall time, iterations per second, peak memory and the final cost as
+JSON. The final solution is checked with SolutionValidator.validate_solution,
+so a speed-up that breaks feasibility shows up in the report, and compared
+with bounds.lower_bound, whose gap shows how far from optimal it may be.
+
+Peak memory is measured with tracemalloc, which also sees NumPy buffers.
+Tracing slows pure Python code down several times, so the timings come from
+an untraced run and the peaks from a second, traced run of the same
+pipeline; --no-memory skips the second run.
+
+Example:
+    python benchmark.py --sizes 100:10 500:25 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from Parser import load_model
+from SolutionValidator import validate_solution
+from bounds import gap, lower_bound
+from const_heuristic import Fcvrp
+from fcvrp import local_search
+from instance_generator import instance_name, write_instance
+from operators import OPERATORS
+from tabus import tabu_search
+
+# (num_nodes, num_families) of the default runs
+DEFAULT_SIZES = [(100, 10), (500, 25), (2000, 50), (10000, 100)]
+
+# Instances from this size on are loaded as a memory-mapped matrix
+MMAP_NODES = 2000
+
+
+def _measure(function, trace_memory):
+    """
+    Run function() and return its result, wall time and peak traced memory (bytes, or None).
+    """
+    if trace_memory:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = function()
+    wall_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    return result, wall_time, peak
+
+
+def _rate(count, wall_time):
+    return count / wall_time if wall_time > 0 else None
+
+
+def _run_pipeline(file_name, mmap, tabu_size, max_iterations, time_limit, seed, trace_memory):
+    """
+    Load, construct, local search and tabu search once; every stage is
+    returned as a dictionary with its wall time and peak memory.
+    """
+    stages = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        model, load_time, load_peak = _measure(lambda: load_model(file_name, mmap=mmap), trace_memory)
+        stages["load"] = {"wall_time": load_time, "peak_memory": load_peak}
+        costs = model.cost_matrix
+
+        def construct():
+            constructor = Fcvrp(None, model=model)
+            constructor.visit_nodes()
+            return constructor.solution
+
+        initial_solution, wall_time, peak = _measure(construct, trace_memory)
+        stages["construction"] = {"wall_time": wall_time, "peak_memory": peak}
+
+        local_stats = {}
+        (local_solution, local_cost), wall_time, peak = _measure(
+            lambda: local_search(initial_solution, costs, model=model, operators=OPERATORS,
+                                 time_limit=time_limit, stats=local_stats), trace_memory)
+        stages["local_search"] = {"wall_time": wall_time, "peak_memory": peak,
+                                  "iterations": local_stats.get("iterations", 0),
+                                  "iterations_per_sec": _rate(local_stats.get("iterations", 0), wall_time),
+                                  "cost": local_cost}
+
+        tabu_stats = {}
+        (tabu_solution, tabu_cost), wall_time, peak = _measure(
+            lambda: tabu_search(local_solution, costs, tabu_size, max_iterations, model=model,
+                                operators=OPERATORS, seed=seed, time_limit=time_limit, stats=tabu_stats),
+            trace_memory)
+        stages["tabu_search"] = {"wall_time": wall_time, "peak_memory": peak,
+                                 "iterations": tabu_stats.get("iterations", 0),
+                                 "iterations_per_sec": _rate(tabu_stats.get("iterations", 0), wall_time),
+                                 "cost": tabu_cost}
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return model, initial_solution, tabu_solution, stages
+
+
+def run_benchmark(num_nodes, num_families, seed=0, directory="benchmark_instances", tabu_size=50,
+                  max_iterations=600, time_limit=None, trace_memory=True):
+    """
+    Benchmark the pipeline on one generated instance.
+
+    Args:
+        num_nodes: Number of customers
+        num_families: Number of families
+        seed: Seed of the instance generator and of the tabu tenure
+        directory: Where generated instances are kept; an instance that is
+                   already there is reused
+        tabu_size: Tabu tenure
+        max_iterations: Tabu search iterations
+        time_limit: Optional time limit in seconds for each of the two searches
+        trace_memory: Also measure the peak memory of every stage, in a
+                      second run under tracemalloc
+
+    Returns:
+        Dictionary with the instance, the timings of every stage and the
+        validation result
+    """
+    os.makedirs(directory, exist_ok=True)
+    file_name = os.path.join(directory, instance_name(num_nodes, num_families, seed))
+    if not os.path.exists(file_name):
+        write_instance(file_name, num_nodes, num_families, seed)
+    mmap = num_nodes >= MMAP_NODES
+
+    model, initial_solution, tabu_solution, stages = _run_pipeline(file_name, mmap, tabu_size, max_iterations,
+                                                                   time_limit, seed, trace_memory=False)
+    if trace_memory:
+        traced = _run_pipeline(file_name, mmap, tabu_size, max_iterations, time_limit, seed, trace_memory=True)[3]
+        for name, stage in stages.items():
+            stage["peak_memory"] = traced[name]["peak_memory"]
+
+    initial_valid, initial_report = validate_solution(model, [[0] + route + [0] for route in initial_solution if route])
+    stages["construction"].update(cost=initial_report["total_cost"], valid=initial_valid)
+    valid, report = validate_solution(model, [[0] + route + [0] for route in tabu_solution if route])
+    bound_start = time.perf_counter()
+    bound = lower_bound(model, upper_bound=report["total_cost"], time_limit=time_limit)
+    bound_time = time.perf_counter() - bound_start
+
+    return {
+        "instance": os.path.basename(file_name),
+        "num_nodes": num_nodes,
+        "num_families": num_families,
+        "num_required": model.num_req,
+        "vehicles": model.vehicles,
+        "seed": seed,
+        **stages,
+        "total_wall_time": sum(stage["wall_time"] for stage in stages.values()),
+        "cost": report["total_cost"],
+        "lower_bound": bound,
+        "gap": gap(report["total_cost"], bound),
+        "bound_wall_time": bound_time,
+        "valid": valid,
+        "errors": report["errors"],
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, seed=0, directory="benchmark_instances", tabu_size=50, max_iterations=600,
+              time_limit=None, trace_memory=True, progress=None):
+    """
+    Benchmark every (num_nodes, num_families) size.
+
+    Args:
+        sizes: Iterable of (num_nodes, num_families)
+        progress: Optional callable progress(result) called after every instance
+        Other arguments as in run_benchmark
+
+    Returns:
+        JSON-serialisable dictionary with the environment, the settings and
+        one result per size
+    """
+    results = []
+    for num_nodes, num_families in sizes:
+        result = run_benchmark(num_nodes, num_families, seed, directory, tabu_size, max_iterations, time_limit,
+                               trace_memory)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "settings": {"seed": seed, "tabu_size": tabu_size, "max_iterations": max_iterations,
+                     "time_limit": time_limit, "trace_memory": trace_memory},
+        "results": results,
+    }
+
+
+def _parse_size(text):
+    num_nodes, _, num_families = text.partition(":")
+    if not num_families:
+        raise argparse.ArgumentTypeError(f"Expected NODES:FAMILIES, got {text!r}")
+    return int(num_nodes), int(num_families)
+
+
+def print_result(result):
+    tabu = result["tabu_search"]
+    print(f"{result['instance']:>24}: cost {result['cost']:>8} gap {100 * result['gap']:5.1f}% "
+          f"valid {str(result['valid']):>5} "
+          f"total {result['total_wall_time']:8.2f} s, tabu {tabu['iterations']} it "
+          f"({tabu['iterations_per_sec'] or 0:.1f} it/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FCVRP pipeline on generated instances")
+    parser.add_argument("--sizes", type=_parse_size, nargs="+", default=DEFAULT_SIZES,
+                        help="Instance sizes as NODES:FAMILIES (default: 100:10 500:25 2000:50 10000:100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", default="benchmark_instances")
+    parser.add_argument("--tabu-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=600)
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds per search stage")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak memory tracking")
+    parser.add_argument("--output", help="JSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    suite = run_suite(args.sizes, args.seed, args.directory, args.tabu_size, args.iterations, args.time_limit,
+                      not args.no_memory, progress=print_result if args.output else None)
+    text = json.dumps(suite, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Lower bounds for the family CVRP.
+
+Two relaxations of the problem, both computed on the NumPy cost matrix:
+
+selection_bound: every visited customer is entered by one arc and left by
+    one arc, so it costs at least half its cheapest incoming plus half its
+    cheapest outgoing arc. A family has to be visited required_visits
+    times, so its share is the sum of the required_visits cheapest members.
+    The depot is left and entered once per route, and at least
+    ceil(required demand / capacity) routes are needed.
+
+assignment_bound: a Lagrangian relaxation in which every visited customer
+    picks one successor and the depot picks one successor per route, while
+    "every visited customer is the successor of exactly one node" is moved
+    into the objective with one multiplier per node. For fixed multipliers
+    the relaxed problem splits per node (cheapest reduced successor, then
+    the cheapest required_visits members per family), and the multipliers
+    are improved by subgradient steps.
+
+gap() turns a solution cost and a bound into the relative optimality gap,
+and GapStopper is an on_improvement callback that stops a search once the
+gap is small enough.
+"""
+import logging
+import math
+import time
+
+import numpy as np
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Rows of the cost matrix converted to float64 at a time, to bound the
+# temporary memory on large (memory-mapped) matrices
+CHUNK_ROWS = 1024
+
+# Subgradient iterations without improvement before the step is halved
+STEP_PATIENCE = 10
+
+
+def min_routes(model):
+    """
+    Least number of routes that can carry the demand of the required visits.
+    """
+    demand = sum(req * dem for req, dem in zip(model.fam_req, model.fam_dem))
+    if demand <= 0:
+        return 0
+    return max(1, math.ceil(demand / model.capacity))
+
+
+def gap(cost, lower_bound):
+    """
+    Relative optimality gap (cost - lower_bound) / cost; 0 when cost is 0.
+    """
+    if cost <= 0:
+        return 0.0
+    return max(0.0, (cost - lower_bound) / cost)
+
+
+def _family_members(model):
+    members = []
+    start = 1
+    for count in model.fam_members:
+        members.append(np.arange(start, start + count))
+        start += count
+    return members
+
+
+def _round(bound, costs):
+    # With integer costs every solution costs an integer, so the bound rounds up
+    if np.issubdtype(costs.dtype, np.integer):
+        return int(math.ceil(bound - 1e-6))
+    return float(bound)
+
+
+def _select(values, members, fam_req):
+    """
+    Mask of the visited customers that minimise the sum of values: the
+    required_visits cheapest members of every family, plus any other member
+    of negative value.
+    """
+    visited = values < 0
+    for family, required in zip(members, fam_req):
+        if required <= 0:
+            continue
+        family_values = values[family]
+        if required < family.size:
+            chosen = family[np.argpartition(family_values, required - 1)[:required]]
+        else:
+            chosen = family
+        visited[chosen] = True
+    visited[0] = False
+    return visited
+
+
+def _row_minima(costs, penalties=None):
+    """
+    Cheapest outgoing reduced arc of every node, self loops excluded.
+
+    Args:
+        costs: Square cost matrix
+        penalties: Optional multiplier per node, subtracted from every arc into that node
+
+    Returns:
+        (minima, argmin) arrays over the rows
+    """
+    size = costs.shape[0]
+    minima = np.empty(size)
+    argmin = np.empty(size, dtype=np.intp)
+    for start in range(0, size, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, size)
+        block = np.asarray(costs[start:stop], dtype=np.float64)
+        if penalties is not None:
+            block = block - penalties
+        rows = np.arange(stop - start)
+        block[rows, rows + start] = np.inf
+        argmin[start:stop] = block.argmin(axis=1)
+        minima[start:stop] = block[rows, argmin[start:stop]]
+    return minima, argmin
+
+
+def _column_minima(costs):
+    """
+    Cheapest incoming arc of every node, self loops excluded.
+    """
+    size = costs.shape[0]
+    minima = np.full(size, np.inf)
+    for start in range(0, size, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, size)
+        block = np.asarray(costs[start:stop], dtype=np.float64)
+        rows = np.arange(stop - start)
+        block[rows, rows + start] = np.inf
+        np.minimum(minima, block.min(axis=0), out=minima)
+    return minima
+
+
+def selection_bound(model, costs=None):
+    """
+    Lower bound from the cheapest arcs into and out of the required family members.
+
+    Args:
+        model: The problem model
+        costs: Cost matrix (default: model.cost_matrix)
+
+    Returns:
+        The bound (an int for integer costs)
+    """
+    costs = model.cost_matrix if costs is None else costs
+    routes = min_routes(model)
+    if routes == 0:
+        return _round(0.0, costs)
+    out_min = _row_minima(costs)[0]
+    in_min = _column_minima(costs)
+    shares = (out_min + in_min) / 2
+    bound = _select(shares, _family_members(model), model.fam_req)
+    total = shares[bound].sum()
+    # The depot is left and entered once per route, each time from a different customer
+    leave = np.sort(np.asarray(costs[0, 1:], dtype=np.float64))[:routes].sum()
+    enter = np.sort(np.asarray(costs[1:, 0], dtype=np.float64))[:routes].sum()
+    return _round(total + (leave + enter) / 2, costs)
+
+
+def assignment_bound(model, costs=None, upper_bound=None, iterations=100, time_limit=None, stats=None):
+    """
+    Lagrangian successor-assignment lower bound, improved by subgradient optimisation.
+
+    Args:
+        model: The problem model
+        costs: Cost matrix (default: model.cost_matrix)
+        upper_bound: Optional cost of a known solution, the target of the
+                     step sizes; without it the target is estimated from the bound
+        iterations: Maximum number of subgradient iterations
+        time_limit: Optional time limit in seconds
+        stats: Optional dictionary filled with the iterations run and the best bound
+
+    Returns:
+        The bound (an int for integer costs)
+    """
+    costs = model.cost_matrix if costs is None else costs
+    min_m = min_routes(model)
+    if min_m == 0:
+        return _round(0.0, costs)
+    max_m = max(min_m, min(model.vehicles, model.num_nodes))
+    members = _family_members(model)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    depot_row = np.asarray(costs[0], dtype=np.float64)
+    route_counts = np.arange(min_m, max_m + 1)
+
+    penalties = np.zeros(costs.shape[0])
+    best = -np.inf
+    step = 2.0
+    stale = 0
+    iteration = 0
+    with instrumentation.phase("bounds.assignment"):
+        for iteration in range(1, iterations + 1):
+            successor_cost, successor = _row_minima(costs, penalties)
+            values = successor_cost + penalties
+            visited = _select(values, members, model.fam_req)
+
+            # The depot starts every route at a different customer; the
+            # number of routes is whatever is cheapest within the fleet
+            depot_costs = depot_row[1:] - penalties[1:]
+            order = np.argsort(depot_costs)[:max_m]
+            prefix = np.cumsum(depot_costs[order])
+            totals = prefix[route_counts - 1] + route_counts * penalties[0]
+            routes = int(route_counts[np.argmin(totals)])
+            bound = values[visited].sum() + totals[routes - min_m]
+
+            in_degree = np.bincount(successor[visited], minlength=costs.shape[0])
+            in_degree[order[:routes] + 1] += 1
+            subgradient = visited.astype(np.float64) - in_degree
+            subgradient[0] = routes - in_degree[0]
+
+            if bound > best + 1e-9:
+                best = bound
+                stale = 0
+            else:
+                stale += 1
+                if stale >= STEP_PATIENCE:
+                    step /= 2
+                    stale = 0
+            norm = float(subgradient @ subgradient)
+            if norm == 0 or step < 1e-4:
+                # Every visited node has exactly one predecessor: the relaxation cannot improve
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            target = upper_bound if upper_bound is not None and upper_bound > best else best + max(abs(best) * 0.05, 1.0)
+            penalties += step * (target - bound) / norm * subgradient
+
+    if stats is not None:
+        stats.update(iterations=iteration, bound=float(best))
+    logger.debug("Assignment bound %.2f after %s iterations", best, iteration)
+    return _round(best, costs)
+
+
+def lower_bound(model, costs=None, upper_bound=None, iterations=100, time_limit=None):
+    """
+    The best of the selection and the assignment bound.
+
+    Args:
+        model: The problem model
+        costs: Cost matrix (default: model.cost_matrix)
+        upper_bound: Optional cost of a known solution (see assignment_bound)
+        iterations: Subgradient iterations of the assignment bound
+        time_limit: Optional time limit in seconds for the assignment bound
+
+    Returns:
+        The bound (an int for integer costs)
+    """
+    selection = selection_bound(model, costs)
+    assignment = assignment_bound(model, costs, upper_bound, iterations, time_limit)
+    logger.info("Lower bounds: selection %s, assignment %s", selection, assignment)
+    return max(selection, assignment)
+
+
+class GapStopper:
+    """
+    on_improvement callback that stops a search once the optimality gap is at most target_gap.
+
+    Attributes:
+        lower_bound: Lower bound of the instance
+        target_gap: Relative gap at which the search stops, e.g. 0.01 for 1%
+        on_improvement: Optional callback called first; the search also stops when it returns True
+        gap: Gap of the last reported solution (None before the first report)
+    """
+
+    def __init__(self, lower_bound, target_gap, on_improvement=None):
+        self.lower_bound = lower_bound
+        self.target_gap = target_gap
+        self.on_improvement = on_improvement
+        self.gap = None
+
+    def __call__(self, solution, cost):
+        stop = bool(self.on_improvement is not None and self.on_improvement(solution, cost))
+        self.gap = gap(cost, self.lower_bound)
+        if self.gap <= self.target_gap:
+            logger.info("Cost %s is within %.2f%% of the lower bound %s", cost, 100 * self.gap, self.lower_bound)
+            return True
+        return stop
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Granular neighbour lists (k-nearest candidate lists).
+
+Good solutions rarely connect nodes that are far apart, so a move is only
+worth scoring if at least one of the arcs it creates joins a node to one of
+its k nearest neighbours. The lists are computed once from Model.cost_matrix
+and shared by every search that is given them.
+"""
+import numpy as np
+
+
+class CandidateLists:
+    """
+    k nearest neighbours of every node and the resulting set of short arcs.
+
+    Attributes:
+        k: Number of neighbours kept per node
+        neighbours: (num_nodes + 1) x k array, neighbours[u] are the k nearest
+                    nodes to u, closest first
+        arc_keys: Sorted keys u * (num_nodes + 1) + v of the candidate arcs: v is
+                  one of the k nearest nodes of u or u one of the k nearest of v.
+                  O(n * k) memory, unlike a dense n x n matrix.
+    """
+
+    def __init__(self, cost_matrix, k=10, chunk_rows=1024):
+        cost_matrix = np.asarray(cost_matrix)
+        n = cost_matrix.shape[0]
+        self.k = k = min(k, n - 1)
+        self.neighbours = np.empty((n, k), dtype=np.intp)
+
+        # Rows are processed in chunks so a memory-mapped matrix is never
+        # copied whole; the diagonal (-1 in the instance files) is excluded.
+        for start in range(0, n, chunk_rows):
+            rows = cost_matrix[start:start + chunk_rows].astype(np.int64)
+            local = np.arange(rows.shape[0])
+            rows[local, start + local] = np.iinfo(np.int64).max
+            nearest = np.argpartition(rows, k - 1, axis=1)[:, :k]
+            order = np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1, kind="stable")
+            self.neighbours[start:start + rows.shape[0]] = np.take_along_axis(nearest, order, axis=1)
+
+        self.size = n
+        sources = np.repeat(np.arange(n, dtype=np.int64), k)
+        targets = self.neighbours.ravel().astype(np.int64)
+        self.arc_keys = np.unique(np.concatenate((sources * n + targets, targets * n + sources)))
+        self._arc_set = None
+
+    def is_candidate(self, u, v):
+        """
+        Whether the arcs (u, v) are candidate arcs; u and v are node IDs or broadcastable arrays of them.
+        """
+        keys = np.asarray(u, dtype=np.int64) * self.size + np.asarray(v, dtype=np.int64)
+        found = np.searchsorted(self.arc_keys, keys)
+        return self.arc_keys[np.minimum(found, self.arc_keys.size - 1)] == keys
+
+    def any_candidate(self, *arcs):
+        """
+        True if at least one of the (u, v) arcs is a candidate arc.
+        """
+        # The scalar scans ask one arc at a time, which a set answers faster than searchsorted
+        if self._arc_set is None:
+            self._arc_set = frozenset(self.arc_keys.tolist())
+        size = self.size
+        arc_set = self._arc_set
+        for u, v in arcs:
+            if u * size + v in arc_set:
+                return True
+        return False
+
+
+def build_candidate_lists(model, k=10):
+    """
+    Candidate lists for a parsed model.
+
+    Args:
+        model: The problem model (see Parser.load_model)
+        k: Number of nearest neighbours per node
+
+    Returns:
+        A CandidateLists object
+    """
+    return CandidateLists(model.cost_matrix, k)
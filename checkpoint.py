@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints of the tabu search, for resuming pre-empted runs.
+
+tabu_search(..., checkpoint_file=PATH, checkpoint_interval=N) saves the
+whole search state every N iterations: the current and the best solution,
+the tabu memory with its expiry stamps and the state of its random
+generator, the iteration and improvement counters, the hashes of the
+visited solutions and, when the run re-optimises routes, the memo of the
+route_tsp.RouteOptimizer. tabus.resume_tabu_search(PATH, model) continues
+from the saved state and, for runs limited by iterations rather than by
+time, reproduces the uninterrupted run exactly. From the command line:
+
+    python checkpoint.py INSTANCE CHECKPOINT [--time-limit SECONDS]
+
+File format (little endian): the 8-byte header MAGIC, a version byte and
+three reserved bytes; the fixed-size scalar block SCALARS; the arrays, each
+as a uint64 byte count followed by the raw items; and a CRC32 of everything
+before it. Routes are stored as uint32 node IDs with uint32 route offsets.
+The file is written under a temporary name, flushed to disk and renamed,
+so a pre-emption during a save leaves the previous checkpoint in place.
+"""
+import argparse
+import logging
+import math
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+MAGIC = b"FCVT"
+VERSION = 2
+HEADER = struct.Struct("<4sBxxx")
+SCALARS = struct.Struct("<qqqqqqqdddBBBBBxxx")
+MT_STATE_SIZE = 625  # random.Random state: 624 words and the position
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TabuCheckpoint:
+    """
+    Saved state of a tabu search at the start of an iteration.
+
+    Attributes:
+        iteration: The next iteration to run
+        last_improvement: Iteration of the last new best solution
+        revisits: Moves made tabu because they returned to a visited solution
+        current_solution, current_cost: The current solution (routes, depot excluded) and its cost
+        best_solution, best_cost: The best solution so far and its cost
+        tabu_size, max_iterations, patience, operators, avoid_revisits, vectorized: Search settings
+        tabu_expires: Tabu pairs (a, b) and their expiry iterations, in TabuMemory order
+        rng_state: random.Random.getstate() of the tabu tenure generator
+        seen: Visited solution hashes, oldest first (None if revisits are not tracked)
+        seen_max_size: Bound of the set of visited solution hashes
+        optimizer_memo: (order, cost, exact) entries of the RouteOptimizer memo, least recent first (or None)
+    """
+    iteration: int
+    last_improvement: int
+    revisits: int
+    current_solution: List[List[int]]
+    current_cost: float
+    best_solution: List[List[int]]
+    best_cost: float
+    tabu_size: int
+    max_iterations: Optional[int]
+    patience: Optional[int]
+    operators: tuple
+    avoid_revisits: bool
+    vectorized: Optional[bool]
+    tabu_expires: list
+    rng_state: tuple
+    seen: Optional[list] = None
+    seen_max_size: int = 0
+    optimizer_memo: Optional[list] = None
+
+
+def _array(data, dtype):
+    data = np.ascontiguousarray(data, dtype=dtype)
+    return struct.pack("<Q", data.nbytes) + data.tobytes()
+
+
+def _routes(routes):
+    offsets = np.zeros(len(routes) + 1, dtype="<u4")
+    np.cumsum([len(route) for route in routes], out=offsets[1:])
+    nodes = np.fromiter((node for route in routes for node in route), dtype="<u4", count=int(offsets[-1]))
+    return _array(offsets, "<u4") + _array(nodes, "<u4")
+
+
+def _optional(value):
+    return -1 if value is None else value
+
+
+def _cost(value, integer):
+    return int(value) if integer else value
+
+
+def encode(checkpoint):
+    """
+    The checkpoint as bytes.
+    """
+    # Integer costs come back as int, so a resumed run reports costs of the same type
+    integer = all(isinstance(cost, (int, np.integer)) for cost in (checkpoint.current_cost, checkpoint.best_cost))
+    version, words, gauss_next = checkpoint.rng_state
+    scalars = SCALARS.pack(
+        checkpoint.iteration, checkpoint.last_improvement, checkpoint.revisits,
+        _optional(checkpoint.max_iterations), _optional(checkpoint.patience), checkpoint.seen_max_size,
+        checkpoint.tabu_size, float(checkpoint.current_cost), float(checkpoint.best_cost),
+        math.nan if gauss_next is None else gauss_next,
+        integer, checkpoint.avoid_revisits, 2 if checkpoint.vectorized is None else checkpoint.vectorized,
+        checkpoint.seen is not None, checkpoint.optimizer_memo is not None)
+
+    pairs = [pair for pair, _ in checkpoint.tabu_expires]
+    stamps = [stamp for _, stamp in checkpoint.tabu_expires]
+    memo = checkpoint.optimizer_memo or []
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        scalars,
+        _array(np.frombuffer(",".join(checkpoint.operators).encode(), dtype=np.uint8), np.uint8),
+        _routes(checkpoint.current_solution),
+        _routes(checkpoint.best_solution),
+        _array(np.array(pairs, dtype="<u4").reshape(-1, 2), "<u4"),
+        _array(stamps, "<i8"),
+        _array(np.array(words, dtype=np.uint64), "<u4"),
+        _array(checkpoint.seen or [], "<u8"),
+        _routes([order for order, _, _ in memo]),
+        _array([cost for _, cost, _ in memo], "<i8"),
+        _array([exact for _, _, exact in memo], np.uint8),
+    ]
+    payload = b"".join(parts)
+    return payload + struct.pack("<I", zlib.crc32(payload))
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def take(self, size):
+        if self.offset + size > len(self.data):
+            raise ValueError("Truncated checkpoint")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def array(self, dtype):
+        size = struct.unpack("<Q", self.take(8))[0]
+        return np.frombuffer(self.take(size), dtype=dtype)
+
+    def routes(self):
+        offsets = self.array("<u4")
+        nodes = self.array("<u4").tolist()
+        return [nodes[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+
+
+def decode(data):
+    """
+    The checkpoint encoded in data.
+
+    Raises:
+        ValueError: if data is not a checkpoint of this version or is corrupted
+    """
+    if len(data) < HEADER.size + SCALARS.size + 4:
+        raise ValueError("Truncated checkpoint")
+    payload, checksum = data[:-4], struct.unpack("<I", data[-4:])[0]
+    if zlib.crc32(payload) != checksum:
+        raise ValueError("Checkpoint checksum mismatch")
+    reader = _Reader(payload)
+    magic, version = HEADER.unpack(reader.take(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("Not a tabu search checkpoint")
+    if version != VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version}")
+    (iteration, last_improvement, revisits, max_iterations, patience, seen_max_size, tabu_size, current_cost,
+     best_cost, gauss_next, integer, avoid_revisits, vectorized, has_seen, has_memo) = \
+        SCALARS.unpack(reader.take(SCALARS.size))
+
+    operators = tuple(name for name in reader.array(np.uint8).tobytes().decode().split(",") if name)
+    current_solution = reader.routes()
+    best_solution = reader.routes()
+    pairs = reader.array("<u4").reshape(-1, 2).tolist()
+    stamps = reader.array("<i8").tolist()
+    words = tuple(reader.array("<u4").tolist())
+    if len(words) != MT_STATE_SIZE:
+        raise ValueError("Corrupted random generator state in checkpoint")
+    seen = reader.array("<u8").tolist()
+    orders = reader.routes()
+    costs = reader.array("<i8").tolist()
+    exact = reader.array(np.uint8).tolist()
+
+    return TabuCheckpoint(
+        iteration=iteration, last_improvement=last_improvement, revisits=revisits,
+        current_solution=current_solution, current_cost=_cost(current_cost, integer),
+        best_solution=best_solution, best_cost=_cost(best_cost, integer),
+        tabu_size=tabu_size, max_iterations=None if max_iterations < 0 else max_iterations,
+        patience=None if patience < 0 else patience, operators=operators, avoid_revisits=bool(avoid_revisits),
+        vectorized=None if vectorized == 2 else bool(vectorized),
+        tabu_expires=[(tuple(pair), stamp) for pair, stamp in zip(pairs, stamps)],
+        rng_state=(3, words, None if math.isnan(gauss_next) else gauss_next),
+        seen=seen if has_seen else None, seen_max_size=seen_max_size,
+        optimizer_memo=[(tuple(order), cost, bool(flag)) for order, cost, flag in zip(orders, costs, exact)]
+        if has_memo else None,
+    )
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Write a checkpoint atomically: to a temporary file that is flushed to disk and then renamed over path.
+    """
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(encode(checkpoint))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    logger.debug("Checkpoint of iteration %s written to %s", checkpoint.iteration, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint.
+    """
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def main():
+    from Parser import load_model
+    from progress import configure_logging
+    from tabus import resume_tabu_search
+
+    parser = argparse.ArgumentParser(description="Resume a checkpointed tabu search")
+    parser.add_argument("instance")
+    parser.add_argument("checkpoint")
+    parser.add_argument("--time-limit", type=float, default=None)
+    parser.add_argument("--interval", type=int, default=100, help="Iterations between checkpoints")
+    args = parser.parse_args()
+    configure_logging(logging.INFO)
+
+    model = load_model(args.instance)
+    stats = {}
+    solution, cost = resume_tabu_search(args.checkpoint, model, time_limit=args.time_limit,
+                                        checkpoint_interval=args.interval, stats=stats)
+    logger.info("Resumed tabu search: cost %s after %s iterations", cost, stats.get("iterations"))
+
+
+if __name__ == "__main__":
+    main()
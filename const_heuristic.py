@@ -1,92 +1,216 @@
+import logging
+
+import numpy as np
+
 from Parser import *
+from insertion_cache import InsertionCache
+from progress import ProgressReporter, configure_logging
+
+logger = logging.getLogger(__name__)
 
 class Fcvrp:
-    def __init__(self, filename, truck_capacity=400, max_trucks=3):
+    def __init__(self, filename, truck_capacity=None, max_trucks=None, model=None):
         self.filename = filename
         self.costs = []
         self.group_demands = {}
-        self.group_sizes = [9, 9, 10, 4, 5, 8, 6, 11, 4, 13]
-        self.group_unit_demands = [13, 14, 17, 13, 14, 18, 11, 16, 13, 16]
-        self.visited_group_sizes = [12, 9, 10, 5, 5, 8, 6, 17, 5, 23]
+        self.group_sizes = []  # Required visits per family (Model.fam_req)
+        self.group_unit_demands = []  # Demand of a single member per family (Model.fam_dem)
         self.visited = []
-        self.model = None
-        self.TRUCK_CAPACITY = truck_capacity
-        self.MAX_TRUCKS = max_trucks
+        self.model = model  # An already parsed Model can be shared instead of re-reading the file
+        self.TRUCK_CAPACITY = truck_capacity  # Defaults to Model.capacity
+        self.MAX_TRUCKS = max_trucks  # Defaults to Model.vehicles
         self.trucks_used = 0
         self.current_truck_capacity = 0
-        self.truck_routes = [[] for _ in range(self.MAX_TRUCKS)]
-        self.solution = []  
+        self.truck_routes = []
+        self.solution = []
+        self.placed_trace = []  # Per-node DEBUG lines of the current truck, logged as one record per truck
+        self.placed = 0
+        self.progress = None  # Rate-limited progress reports (progress.ProgressReporter)
 
         self.load_model()
         self.load_costs()
+        self.load_fleet()
         self.calculate_group_demands()
         self.initialize_visited()
 
     def load_model(self):
-        self.model = load_model(self.filename)
+        if self.model is None:
+            self.model = load_model(self.filename)
 
     def load_costs(self):
-        with open(self.filename, "r", encoding="utf-8") as file:
-            lines = file.readlines()
-        data_lines = lines[4:104]
+        # Share the model's cost matrix instead of parsing the file a second time
+        self.costs = self.model.cost_matrix
 
-        for line in data_lines:
-            row = list(map(int, line.strip().split()))
-            self.costs.append(row)
+    def load_fleet(self):
+        if self.TRUCK_CAPACITY is None:
+            self.TRUCK_CAPACITY = self.model.capacity
+        if self.MAX_TRUCKS is None:
+            self.MAX_TRUCKS = self.model.vehicles
 
     def calculate_group_demands(self):
+        self.group_sizes = list(self.model.fam_req)
+        self.group_unit_demands = list(self.model.fam_dem)
+
         for group_id, (size, unit_demand) in enumerate(zip(self.group_sizes, self.group_unit_demands)):
             self.group_demands[group_id] = size * unit_demand
 
         self.group_demands = {k: v for k, v in sorted(self.group_demands.items(), key=lambda item: item[1], reverse=True)}
 
     def initialize_visited(self):
-        self.visited = [[False for _ in range(100)] for size in self.visited_group_sizes]
+        # One flag per node id; the per-node family and demand come from the model
+        self.visited = np.zeros(self.model.num_nodes + 1, dtype=bool)
+        self.node_family = np.array([-1] + [node.family for node in self.model.customers])
+        self.node_demand = np.array([node.demand for node in self.model.nodes])
+        self.trucks_used = 0
+        self.current_truck_capacity = 0
+        self.truck_routes = [[] for _ in range(self.MAX_TRUCKS)]
+        self.placed_trace = []
+        self.placed = 0
+
+    def visit_nodes(self, method="nearest"):
+        """
+        Build the initial solution.
+
+        With method="nearest" every truck starts at the depot and repeatedly
+        drives to the nearest unvisited node whose family still needs visits
+        and whose demand fits in the remaining capacity. When nothing fits
+        the next truck starts.
+
+        With method="insertion" all trucks are filled at once: every step
+        inserts the node with the cheapest feasible insertion over all routes
+        and positions, taken from an InsertionCache that only updates the
+        route that changed.
+
+        If the routes leave families unserved (tight capacity), the families
+        are packed by total demand instead, still taking the nearest member
+        of each family.
+        """
+        if method not in ("nearest", "insertion"):
+            raise ValueError(f"Unknown construction method: {method}")
+        logger.debug("--- Visiting Nodes by Truck ---")
+        self.progress = ProgressReporter("construction")
+        visit = self.visit_nearest_nodes if method == "nearest" else self.visit_cheapest_insertion
+        if not visit():
+            self.flush_trace()
+            logger.info("Constructed routes leave families unserved, packing families by demand instead.")
+            self.initialize_visited()
+            self.visit_packed_groups()
+
+        self.flush_trace()
+        self.build_solution()
+        self.progress.finish(placed=self.placed, trucks=len(self.solution))
+
+    def nearest_node(self, current, remaining, free_capacity, group_id=None):
+        # Masked argmin over the cost row of the current node: O(n) per placed node
+        eligible = (~self.visited) & (self.node_demand <= free_capacity)
+        if group_id is None:
+            eligible &= np.append(False, remaining[self.node_family[1:]] > 0)
+        else:
+            eligible &= self.node_family == group_id
+        eligible[0] = False
+
+        candidates = np.flatnonzero(eligible)
+        if candidates.size == 0:
+            return None
+        return int(candidates[np.argmin(self.costs[current][candidates])])
+
+    def place_node(self, node_id, remaining):
+        self.visited[node_id] = True
+        self.placed += 1
+        remaining[self.node_family[node_id]] -= 1
+        self.current_truck_capacity += int(self.node_demand[node_id])
+        self.truck_routes[self.trucks_used].append(node_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            self.placed_trace.append(f"  ✅ Node {node_id} visited (Truck {self.trucks_used}, Load: {self.current_truck_capacity}/{self.TRUCK_CAPACITY})")
+        if self.progress is not None:
+            self.progress.update(placed=self.placed, truck=self.trucks_used)
+
+    def flush_trace(self):
+        # One log record per truck instead of one write per placed node
+        if self.placed_trace:
+            logger.debug("\n".join(self.placed_trace))
+            self.placed_trace = []
+
+    def visit_nearest_nodes(self):
+        remaining = np.array(self.group_sizes)
+
+        while self.trucks_used < self.MAX_TRUCKS:
+            current = 0
+            while True:
+                node_id = self.nearest_node(current, remaining, self.TRUCK_CAPACITY - self.current_truck_capacity)
+                if node_id is None:
+                    break
+                self.place_node(node_id, remaining)
+                current = node_id
 
-    def visit_nodes(self):
-        print("\n--- Visiting Nodes by Truck ---")
-        for group_id in self.group_demands:
-            print()
-            demand_per_node = self.group_unit_demands[group_id]
-            max_to_visit = self.group_sizes[group_id]
-            visited_count = 0
+            if not remaining.any():
+                return True
+            self.switch_truck()
 
-            print(f"\nGroup {self.model.families[group_id].id} (Visit {max_to_visit} nodes, Demand per node = {demand_per_node}):")
+        return False
 
-            for node_index in range(len(self.visited[group_id])):
-                if visited_count >= max_to_visit:
-                    break
+    def visit_cheapest_insertion(self):
+        remaining = np.array(self.group_sizes)
+        cache = InsertionCache(self.costs, self.truck_routes, self.node_demand, self.TRUCK_CAPACITY)
 
-                while True:
-                    if self.trucks_used >= self.MAX_TRUCKS:
-                        print("❌ No more trucks available. Ending route planning.")
-                        self.build_solution()  
-                        return
+        while remaining.any():
+            eligible = np.flatnonzero((~self.visited) & np.append(False, remaining[self.node_family[1:]] > 0))
+            costs, routes = cache.cheapest()
+            if eligible.size == 0 or not np.isfinite(costs[eligible]).any():
+                return False
 
-                    if self.current_truck_capacity + demand_per_node <= self.TRUCK_CAPACITY:
-                        self.current_truck_capacity += demand_per_node
-                        print()
-                        node_id = int(self.model.families[group_id].nodes[node_index].id)
-                        self.visited[int(self.model.families[group_id].id)][node_id] = True
-                        visited_count += 1
-                        self.truck_routes[self.trucks_used].append(node_id)
-                        print(f"  ✅ Node {node_id} visited (Truck {self.trucks_used}, Load: {self.current_truck_capacity}/{self.TRUCK_CAPACITY})")
-                        break
+            node_id = int(eligible[np.argmin(costs[eligible])])
+            route_index = int(routes[node_id])
+            position = cache.position(route_index, node_id)
+            self.truck_routes[route_index].insert(position, node_id)
+            cache.insert(route_index, position, node_id)
 
-                    self.switch_truck(group_id, node_index)
+            self.visited[node_id] = True
+            self.placed += 1
+            remaining[self.node_family[node_id]] -= 1
+            if logger.isEnabledFor(logging.DEBUG):
+                self.placed_trace.append(f"  ✅ Node {node_id} inserted (Truck {route_index}, Position {position}, Load: {cache.loads[route_index]}/{self.TRUCK_CAPACITY})")
+            self.progress.update(placed=self.placed, truck=route_index)
 
-                    if self.trucks_used >= self.MAX_TRUCKS:
-                        break
+        self.trucks_used = sum(1 for route in self.truck_routes if route)
+        return True
 
-        self.build_solution()  
+    def visit_packed_groups(self):
+        remaining = np.array(self.group_sizes)
+        current = 0
 
-    def switch_truck(self, group_id, node_index):
+        for group_id in self.group_demands:
+            demand_per_node = self.group_unit_demands[group_id]
+            logger.debug("Group %s (Visit %s nodes, Demand per node = %s):",
+                         self.model.families[group_id].id, self.group_sizes[group_id], demand_per_node)
+
+            while remaining[group_id] > 0:
+                if self.trucks_used >= self.MAX_TRUCKS:
+                    logger.warning("No more trucks available. Ending route planning.")
+                    return False
+
+                if self.current_truck_capacity + demand_per_node <= self.TRUCK_CAPACITY:
+                    node_id = self.nearest_node(current, remaining, self.TRUCK_CAPACITY - self.current_truck_capacity, group_id)
+                    if node_id is None:
+                        logger.warning("Group %s has too few members. Ending route planning.", group_id)
+                        return False
+                    self.place_node(node_id, remaining)
+                    current = node_id
+                    continue
+
+                self.switch_truck()
+                current = 0
+
+        return True
+
+    def switch_truck(self):
+        self.flush_trace()
         self.trucks_used += 1
         if self.trucks_used >= self.MAX_TRUCKS:
-            print(f"  🚫 Node {self.model.families[group_id].nodes[node_index].id} cannot be visited (no trucks left)")
+            logger.debug("  🚫 No trucks left")
             return
         self.current_truck_capacity = 0
-        print(f"  🔁 Switching to Truck {self.trucks_used} for Node {self.model.families[group_id].nodes[node_index].id}...")
+        logger.debug("  🔁 Switching to Truck %s...", self.trucks_used)
 
     def build_solution(self):
         self.solution = [route for route in self.truck_routes if route]
@@ -94,6 +218,6 @@ class Fcvrp:
 
 
 if __name__ == "__main__":
+    configure_logging(logging.DEBUG)
     fcvrp_instance = Fcvrp("fcvrp_P-n101-k4_10_3_3.txt")
     fcvrp_instance.visit_nodes()
-    
\ No newline at end of file
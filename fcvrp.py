@@ -1,28 +1,26 @@
 # -*- coding: utf-8 -*-
 import random
+import contextlib
+import logging
+import time
+import instrumentation
+from bounds import gap
+from bounds import lower_bound as compute_lower_bound
+from polish import RoutePool, polish
+from route_tsp import RouteOptimizer
+from solution_io import SolutionWriter
+from Parser import load_model
+from progress import ProgressReporter, configure_logging
 from const_heuristic import Fcvrp
-from tabus import tabu_search
+from tabus import calculate_total_cost, tabu_search  # Κοινός υπολογισμός κόστους με το tabus.py
+from solution_state import Solution
+from operators import descend, OPERATORS
+from moves import (best_intra_swap, best_intra_swap_vectorized, apply_intra_swap, uses_vectorized,
+                   best_replace_member, best_replace_member_vectorized)
 
-def calculate_total_cost(solution, costs):
-    """
-    Υπολογίζει το συνολικό κόστος μιας λύσης.
-
-    Args:
-        solution: Μια λίστα με τις διαδρομές των οχημάτων, όπου κάθε διαδρομή είναι μια λίστα με τους κόμβους που επισκέπτεται το όχημα.
-        costs: Ένας πίνακας κόστους όπου costs[i][j] είναι το κόστος μετάβασης από τον κόμβο i στον κόμβο j.
-
-    Returns:
-        Το συνολικό κόστος της λύσης.
-    """
-    total_cost = 0
-    for route in solution:
-        if route:  # Έλεγχος αν η διαδρομή δεν είναι άδεια
-            total_cost += costs[0][route[0]]  # Κόστος από την αποθήκη στον πρώτο κόμβο
-            for i in range(len(route) - 1):
-                total_cost += costs[route[i]][route[i+1]]  # Κόστος μεταξύ των κόμβων της διαδρομής
-            total_cost += costs[route[-1]][0]  # Κόστος από τον τελευταίο κόμβο στην αποθήκη
-    return total_cost
+logger = logging.getLogger(__name__)
 
+@instrumentation.timed("get_neighbors")
 def get_neighbors(solution):
     """
     Δημιουργεί μια λίστα με γειτονικές λύσεις κάνοντας μικρές αλλαγές στην τρέχουσα λύση.
@@ -44,7 +42,8 @@ def get_neighbors(solution):
                     neighbors.append(neighbor)
     return neighbors
 
-def local_search(initial_solution, costs, max_iterations=100):
+def local_search(initial_solution, costs, max_iterations=100, vectorized=None, candidates=None, model=None,
+                 operators=None, time_limit=None, on_improvement=None, stats=None, route_pool=None):
     """
     Εκτελεί την αλγόριθμο τοπικής αναζήτησης για τη βελτιστοποίηση της αρχικής λύσης.
 
@@ -52,37 +51,200 @@ def local_search(initial_solution, costs, max_iterations=100):
         initial_solution: Η αρχική λύση που παρήχθη από το heuristic.
         costs: Ο πίνακας κόστους μεταξύ των κόμβων.
         max_iterations: Ο μέγιστος αριθμός επαναλήψεων της τοπικής αναζήτησης.
+        vectorized: Αν True, όλη η γειτονιά βαθμολογείται με πράξεις πινάκων NumPy.
+                    Αν None, επιλέγεται αυτόματα όταν ο πίνακας κόστους είναι NumPy array.
+        candidates: Προαιρετικές λίστες υποψηφίων (candidates.CandidateLists). Αν δοθούν, εξετάζονται μόνο
+                    τα swaps που δημιουργούν τουλάχιστον ένα τόξο προς κάποιον από τους k κοντινότερους γείτονες.
+        model: Προαιρετικά το μοντέλο του προβλήματος. Αν δοθεί, εξετάζεται και η αντικατάσταση ενός
+               κόμβου από μέλος της ίδιας οικογένειας που δεν επισκέπτεται καμία διαδρομή.
+        operators: Προαιρετικά ονόματα τελεστών από operators.OPERATORS (relocate, or_opt, two_opt, two_opt_star).
+                   Όταν τα swaps δεν βελτιώνουν πλέον τη λύση, εκτελείται κάθοδος με αυτούς τους τελεστές
+                   (με don't-look bits) και, αν βελτιώσει, η αναζήτηση συνεχίζει. Απαιτεί το μοντέλο.
+        time_limit: Προαιρετικό χρονικό όριο σε δευτερόλεπτα (wall clock). Με τη λήξη του επιστρέφεται
+                    η τρέχουσα λύση, που είναι πάντα η καλύτερη μέχρι εκείνη τη στιγμή.
+        on_improvement: Προαιρετική συνάρτηση on_improvement(solution, cost) που καλείται μετά από κάθε
+                        βελτίωση. Αν επιστρέψει True, η αναζήτηση σταματά.
+        stats: Προαιρετικό λεξικό όπου καταγράφεται ο αριθμός των επαναλήψεων ("iterations").
+        route_pool: Προαιρετικό polish.RoutePool όπου προστίθενται οι διαδρομές της αρχικής λύσης και
+                    κάθε βελτιωμένης λύσης.
 
     Returns:
         Η καλύτερη λύση που βρέθηκε και το κόστος της.
     """
-    current_solution = initial_solution
-    best_solution = initial_solution
-    best_cost = calculate_total_cost(initial_solution, costs)
+    vectorize = uses_vectorized(costs, vectorized)
+    find_best_move = best_intra_swap_vectorized if vectorize else best_intra_swap
+    find_best_replace = best_replace_member_vectorized if vectorize else best_replace_member
+
+    if operators and model is None:
+        raise ValueError("local_search: operators require the model")
 
-    for _ in range(max_iterations):
-        neighbors = get_neighbors(current_solution)
-        if not neighbors: # Αν δεν υπάρχουν γείτονες (π.χ. όλες οι διαδρομές έχουν < 2 πελάτες)
+    # Η αναζήτηση δουλεύει πάνω σε αντίγραφο, ώστε η αρχική λύση να μείνει ανέπαφη
+    state = Solution(model, initial_solution, costs) if model is not None else None
+    current_solution = state.routes if state is not None else [list(r) for r in initial_solution]
+    best_cost = calculate_total_cost(current_solution, costs)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    instrumentation.improvement("local", 0, best_cost)
+    if route_pool is not None:
+        route_pool.add_solution(current_solution)
+
+    def improved():
+        # Ενημέρωση του καλούντος· True σημαίνει ότι η αναζήτηση πρέπει να σταματήσει
+        instrumentation.improvement("local", iteration + 1, best_cost)
+        if route_pool is not None:
+            route_pool.add_solution(current_solution)
+        if on_improvement is not None and on_improvement([r[:] for r in current_solution], best_cost):
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    for iteration in range(max_iterations):
+        if deadline is not None and time.perf_counter() >= deadline:
             break
-            
-        current_best_neighbor = None
-        current_best_neighbor_cost = best_cost
-
-        for neighbor in neighbors:
-            neighbor_cost = calculate_total_cost(neighbor, costs)
-            if neighbor_cost < current_best_neighbor_cost:
-                current_best_neighbor_cost = neighbor_cost
-                current_best_neighbor = neighbor
-        
-        if current_best_neighbor and current_best_neighbor_cost < best_cost:
-            best_cost = current_best_neighbor_cost
-            best_solution = [list(r) for r in current_best_neighbor] # Αποθήκευση αντιγράφου
-            current_solution = current_best_neighbor # Μετάβαση στην καλύτερη γειτονική λύση αυτής της επανάληψης
-        else:
-            break  # Τερματισμός αν δεν βρεθεί καλύτερη γειτονική λύση στην τρέχουσα επανάληψη
+        if stats is not None:
+            stats["iterations"] = iteration + 1
+        instrumentation.count("local.iterations")
+        # Κάθε swap αξιολογείται από τα τόξα που αλλάζει (delta κόστος), χωρίς αντιγραφή της λύσης
+        with instrumentation.phase("local.intra_swap"):
+            move = find_best_move(current_solution, costs, candidates=candidates)
+        # Αντικατάσταση μέλους οικογένειας: αλλάζει ποιοι κόμβοι επισκέπτονται, όχι μόνο η σειρά τους
+        with instrumentation.phase("local.replace"):
+            replace = find_best_replace(state, candidates=candidates) if state is not None else None
+        if replace is not None and (move is None or replace[0] < move[0]):
+            delta, route_index, idx, new_node = replace
+            if delta < 0:
+                state.apply_replace_member(route_index, idx, new_node)
+                best_cost += delta
+                if improved():
+                    break
+                continue
+        elif move is not None and move[0] < 0:
+            delta, route_index, i, j = move
+            # Εφαρμόζεται μόνο η καλύτερη κίνηση
+            if state is not None:
+                state.apply_intra_swap(route_index, i, j, delta)
+            else:
+                apply_intra_swap(current_solution, route_index, i, j)
+            best_cost += delta
+            if improved():
+                break
+            continue
 
+        # Τα swaps δεν βελτιώνουν: δοκιμάζονται οι τελεστές relocate / Or-opt / 2-opt / 2-opt*
+        if operators:
+            with instrumentation.phase("local.descend"):
+                delta = descend(state, operators, candidates, deadline=deadline)
+            if delta < 0:
+                best_cost += delta
+                if improved():
+                    break
+                continue
+
+        break  # Τερματισμός αν δεν βρεθεί καλύτερη γειτονική λύση στην τρέχουσα επανάληψη
+
+    best_solution = current_solution
     return best_solution, best_cost
 
+def solve(model, time_limit=None, patience=None, on_improvement=None, tabu_size=50, max_iterations=600,
+          candidates=None, operators=OPERATORS, seed=None, target_gap=None, lower_bound=None, polish_time=None,
+          route_pool=None, route_optimizer=None):
+    """
+    Ολόκληρη η διαδικασία: κατασκευαστικός αλγόριθμος, τοπική αναζήτηση και Tabu Search,
+    με κοινό χρονικό όριο για όλα τα στάδια (anytime).
+
+    Args:
+        model: Το μοντέλο του προβλήματος (Parser.load_model).
+        time_limit: Προαιρετικό συνολικό χρονικό όριο σε δευτερόλεπτα. Ό,τι περισσέψει από την
+                    τοπική αναζήτηση δίνεται στο Tabu Search.
+        patience: Προαιρετικός αριθμός επαναλήψεων του Tabu Search χωρίς βελτίωση πριν τον τερματισμό.
+        on_improvement: Προαιρετική συνάρτηση on_improvement(solution, cost) που καλείται για την αρχική λύση
+                        και για κάθε βελτίωση σε οποιοδήποτε στάδιο. Αν επιστρέψει True, η διαδικασία σταματά
+                        και επιστρέφεται η λύση εκείνης της στιγμής.
+        tabu_size: Η μέση διάρκεια tabu.
+        max_iterations: Ο μέγιστος αριθμός επαναλήψεων του Tabu Search (None για απεριόριστες,
+                        αρκεί να δοθεί time_limit ή patience).
+        candidates: Προαιρετικές λίστες υποψηφίων (candidates.CandidateLists).
+        operators: Οι τελεστές βελτίωσης διαδρομών (operators.OPERATORS).
+        seed: Προαιρετικός σπόρος για την τυχαία διάρκεια tabu.
+        target_gap: Προαιρετική σχετική απόκλιση από το κάτω φράγμα (π.χ. 0.01 για 1%) στην οποία
+                    η διαδικασία σταματά.
+        lower_bound: Προαιρετικό κάτω φράγμα (bounds.lower_bound). Αν δοθεί target_gap χωρίς φράγμα,
+                     υπολογίζεται μετά τον κατασκευαστικό αλγόριθμο.
+        polish_time: Προαιρετικό χρονικό όριο (δευτερόλεπτα) του σταδίου επανασύνθεσης (polish.polish): οι
+                     διαδρομές που επισκέφθηκαν η τοπική αναζήτηση και το Tabu Search συνδυάζονται με
+                     set partitioning. Αν δεν είναι εγκατεστημένο το PuLP ή το OR-Tools, το στάδιο παραλείπεται.
+        route_pool: Προαιρετικό polish.RoutePool για τις διαδρομές (π.χ. κοινό για πολλές εκτελέσεις).
+        route_optimizer: Προαιρετικός route_tsp.RouteOptimizer (ή True για νέο) για τη βέλτιστη σειρά επίσκεψης
+                         των διαδρομών που αλλάζει κάθε κίνηση του Tabu Search.
+
+    Returns:
+        Λεξικό με τη λύση και το κόστος κάθε σταδίου (initial_*, local_*, tabu_*) και την τελική λύση
+        (solution, cost). Όταν υπάρχει κάτω φράγμα, περιέχει και τα lower_bound και gap της τελικής λύσης.
+    """
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    stopped = False
+
+    def report(solution, cost):
+        nonlocal stopped
+        stopped = bool(on_improvement is not None and on_improvement(solution, cost))
+        if target_gap is not None and gap(cost, lower_bound) <= target_gap:
+            logger.info("Το κόστος %s απέχει %.2f%% από το κάτω φράγμα %s", cost, 100 * gap(cost, lower_bound),
+                        lower_bound)
+            stopped = True
+        return stopped
+
+    def remaining():
+        return max(0.0, deadline - time.perf_counter()) if deadline is not None else None
+
+    costs = model.cost_matrix
+    if polish_time is not None and route_pool is None:
+        route_pool = RoutePool(model, costs)
+    if route_optimizer is True:
+        route_optimizer = RouteOptimizer(costs)
+    constructor = Fcvrp(None, truck_capacity=model.capacity, max_trucks=model.vehicles, model=model)
+    constructor.visit_nodes()
+    initial_solution = constructor.solution
+    initial_cost = calculate_total_cost(initial_solution, costs)
+    result = {
+        "initial_solution": initial_solution, "initial_cost": initial_cost,
+        "local_solution": initial_solution, "local_cost": initial_cost,
+        "solution": initial_solution, "cost": initial_cost,
+    }
+    if target_gap is not None and lower_bound is None:
+        lower_bound = compute_lower_bound(model, costs, upper_bound=initial_cost, time_limit=remaining())
+    if lower_bound is not None:
+        result.update(lower_bound=lower_bound, gap=gap(initial_cost, lower_bound))
+    if report([r[:] for r in initial_solution], initial_cost):
+        return result
+
+    local_solution, local_cost = local_search(initial_solution, costs, candidates=candidates, model=model,
+                                              operators=operators, time_limit=remaining(), on_improvement=report,
+                                              route_pool=route_pool)
+    result.update(local_solution=local_solution, local_cost=local_cost, solution=local_solution, cost=local_cost)
+    if lower_bound is not None:
+        result["gap"] = gap(local_cost, lower_bound)
+    if stopped or (deadline is not None and remaining() == 0):
+        return result
+
+    tabu_solution, tabu_cost = tabu_search(local_solution, costs, tabu_size, max_iterations, model=model,
+                                           candidates=candidates, operators=operators, seed=seed,
+                                           time_limit=remaining(), patience=patience, on_improvement=report,
+                                           route_pool=route_pool, route_optimizer=route_optimizer)
+    result.update(tabu_solution=tabu_solution, tabu_cost=tabu_cost, solution=tabu_solution, cost=tabu_cost)
+    if polish_time is not None and not stopped and (deadline is None or remaining() > 0):
+        limit = polish_time if deadline is None else min(polish_time, remaining())
+        try:
+            polished_solution, polished_cost = polish(model, route_pool, tabu_solution, time_limit=limit)
+        except ImportError as error:
+            logger.warning("Η επανασύνθεση παραλείπεται: %s", error)
+        else:
+            result["polish_cost"] = polished_cost
+            if polished_cost < tabu_cost:
+                result.update(solution=polished_solution, cost=polished_cost)
+                report([r[:] for r in polished_solution], polished_cost)
+    if lower_bound is not None:
+        result["gap"] = gap(result["cost"], lower_bound)
+    return result
+
 def format_solution(solution):
     # Μετατρέπει μια λύση από τη μορφή λίστας διαδρομών σε μία ενιαία συμβολοσειρά.
     all_nodes = []
@@ -91,76 +253,107 @@ def format_solution(solution):
             all_nodes.extend(route)
     return "0 " + " ".join(map(str, all_nodes)) + " 0"
 
-def write_solution_to_file(initial_solution, local_solution, tabu_solution, filename="solution.txt"):
+def write_solution_to_file(initial_solution, local_solution, tabu_solution, filename="solution.txt", costs=None,
+                           binary=False, polished_solution=None):
     """
-    Γράφει τη λύση σε ένα αρχείο txt με την καθορισμένη μορφή.
-    Κάθε διαδρομή ξεκινά και τελειώνει με τον κόμβο 0 (αποθήκη).
+    Γράφει τις λύσεις των σταδίων σε αρχείο, μία ενότητα "# solution <στάδιο>" ανά λύση (solution_io).
+    Κάθε διαδρομή γράφεται σε δική της γραμμή, ξεκινά και τελειώνει με τον κόμβο 0 (αποθήκη), ώστε
+    το αρχείο να διαβάζεται από το SolutionValidator.parse_solution_file (επιστρέφει την τελευταία λύση).
 
     Args:
-        solution: Μια λίστα με τις διαδρομές των οχημάτων.
-                  Κάθε διαδρομή είναι μια λίστα με τους κόμβους που επισκέπτεται το όχημα,
-                  μη συμπεριλαμβάνοντας την αρχική και τελική αποθήκη.
+        initial_solution, local_solution, tabu_solution: Οι λύσεις των σταδίων, λίστες διαδρομών
+                  χωρίς την αρχική και τελική αποθήκη (η tabu_solution μπορεί να λείπει).
         filename: Το όνομα του αρχείου εξόδου.
+        costs: Προαιρετικά τα κόστη (initial, local, tabu[, polish]) για τις επικεφαλίδες.
+        binary: Αν True, γράφεται η συμπαγής δυαδική μορφή του solution_io.
+        polished_solution: Προαιρετικά η λύση της επανασύνθεσης (polish), ως τελευταίο στάδιο "polish".
     """
+    stages = [("initial", initial_solution), ("local", local_solution), ("tabu", tabu_solution),
+              ("polish", polished_solution)]
+    costs = list(costs or [])
+    costs += [None] * (len(stages) - len(costs))
     try:
-        with open(filename, 'w') as f:
-            # Γράφουμε την Αρχική Λύση
-            f.write(format_solution(initial_solution) + "\n")
-            
-            # Γράφουμε τη λύση της Τοπικής Αναζήτησης
-            f.write(format_solution(local_solution) + "\n")
-            
-            # Γράφουμε τη λύση της Τabu Αναζήτησης
-            if tabu_solution:
-                f.write(format_solution(tabu_solution) + "\n")
-                
-        print(f"\nΟι λύσεις γράφτηκαν με επιτυχία στο αρχείο: {filename}")
+        with SolutionWriter(filename, binary=binary) as writer:
+            for (label, solution), cost in zip(stages, costs):
+                if solution:
+                    writer.write(solution, cost=cost, label=label, full=True)
+        logger.info("Οι λύσεις γράφτηκαν με επιτυχία στο αρχείο: %s", filename)
     except IOError:
-        print(f"\nΠαρουσιάστηκε σφάλμα κατά την εγγραφή στο αρχείο: {filename}")
+        logger.error("Παρουσιάστηκε σφάλμα κατά την εγγραφή στο αρχείο: %s", filename)
 
 if __name__ == "__main__":
+    # Καταγραφή: INFO δείχνει κόστη και αναφορές προόδου, DEBUG και τις λύσεις / κάθε κόμβο της κατασκευής
+    log_level = logging.INFO
+    json_logs = False  # True: κάθε εγγραφή ως μία γραμμή JSON (για επεξεργασία από εργαλεία)
+    configure_logging(log_level, json_lines=json_logs)
+
     # Φόρτωση δεδομένων
     instance_file = "fcvrp_P-n101-k4_10_3_3.txt"
     random_seed = 4 # [seeds: 4, 8, 15, 16, 23, 42]
     random.seed(random_seed)
-    print(f"Χρησιμοποιείται ο σπόρος (seed): {random_seed}")
+    logger.info("Χρησιμοποιείται ο σπόρος (seed): %s", random_seed)
+    time_limit = None  # Χρονικό όριο σε δευτερόλεπτα για όλη τη διαδικασία (None: χωρίς όριο)
+    patience = None  # Επαναλήψεις του Tabu Search χωρίς βελτίωση πριν τον τερματισμό (None: χωρίς όριο)
+    instrument_run = False  # Χρόνοι ανά φάση, μετρητές κινήσεων και πορεία βελτιώσεων (instrumentation.py)
+    trace_file = None  # π.χ. "fcvrp.trace.json" για chrome://tracing / Perfetto (απαιτεί instrument_run)
+    profile_file = None  # π.χ. "fcvrp.pstats" για ανάλυση με pstats (απαιτεί instrument_run)
+    target_gap = None  # Σχετική απόκλιση από το κάτω φράγμα στην οποία σταματά η αναζήτηση (π.χ. 0.01)
+    polish_time = None  # Δευτερόλεπτα επανασύνθεσης των διαδρομών μετά το Tabu Search (απαιτεί PuLP ή OR-Tools)
+    incumbents_file = None  # π.χ. "incumbents.bin": κάθε νέα καλύτερη λύση προστίθεται (μόνο οι διαδρομές που άλλαξαν)
 
-    # 1. Δημιουργία αρχικής λύσης
-    fcvrp_instance = Fcvrp(instance_file) 
-    fcvrp_instance.visit_nodes() # Υποθέτοντας ότι αυτή η μέθοδος παράγει την αρχική λύση
-    initial_solution = fcvrp_instance.solution
-    costs = fcvrp_instance.costs
+    # 1-3. Αρχική λύση, τοπική αναζήτηση και Tabu Search (ξεκινώντας από τη λύση της τοπικής αναζήτησης)
+    model = load_model(instance_file)
+    lower_bound = compute_lower_bound(model)  # Κάτω φράγμα για την απόκλιση (gap) της λύσης
+    progress = ProgressReporter("search")  # Το πολύ μία αναφορά ανά δευτερόλεπτο
+    incumbents = (SolutionWriter(incumbents_file, binary=incumbents_file.endswith(".bin"), num_nodes=model.num_nodes)
+                  if incumbents_file else None)
+
+    def on_improvement(solution, cost):
+        if incumbents is not None:
+            incumbents.write(solution, cost)
+        return progress(solution, cost)
+
+    with (instrumentation.instrument(trace_file, profile_file) if instrument_run
+          else contextlib.nullcontext()) as probe:
+        result = solve(model, time_limit=time_limit, patience=patience, on_improvement=on_improvement,
+                       tabu_size=50, max_iterations=600, seed=random_seed, target_gap=target_gap,
+                       lower_bound=lower_bound, polish_time=polish_time)
+    progress.finish(cost=result["cost"])
+    if incumbents is not None:
+        incumbents.close()
+    initial_solution = result["initial_solution"]
+    costs = model.cost_matrix
 
     if not initial_solution or not any(initial_solution): # Ελέγχει αν είναι κενή ή περιέχει μόνο κενές διαδρομές
-        print("Η αρχική λύση είναι κενή ή δεν περιέχει έγκυρες διαδρομές. Η τοπική αναζήτηση δεν μπορεί να εκτελεστεί.")
+        logger.error("Η αρχική λύση είναι κενή ή δεν περιέχει έγκυρες διαδρομές. Η τοπική αναζήτηση δεν μπορεί να εκτελεστεί.")
     else:
-        print("\n--- Αρχική Λύση (Κατασκευαστικός Αλγόριθμος) ---")
-        if all(isinstance(r, list) for r in initial_solution):
-            # Φιλτράρισμα κενών διαδρομών από την εκτύπωση, αν υπάρχουν
-            printable_initial_solution = [route for route in initial_solution if route]
-            print("Λύση:", printable_initial_solution)
-            print("Κόστος Αρχικής Λύσης:", calculate_total_cost(initial_solution, costs))
-        else:
-            print("Λύση: Μη έγκυρη μορφή αρχικής λύσης για εκτύπωση.")
+        # Οι λύσεις καταγράφονται μόνο σε DEBUG· φιλτράρισμα κενών διαδρομών, αν υπάρχουν
+        logger.debug("Αρχική Λύση (Κατασκευαστικός Αλγόριθμος): %s", [route for route in initial_solution if route])
+        logger.info("Κόστος Αρχικής Λύσης: %s", result["initial_cost"])
 
+        local_solution = result["local_solution"]
+        logger.debug("Βέλτιστη Λύση (Απλός Τοπικός Αλγόριθμος): %s", [route for route in local_solution if route])
+        logger.info("Κόστος Λύσης Τοπικού Αλγορίθμου: %s", result["local_cost"])
 
-        # 2. Εκτέλεση Απλού Τοπικού Αλγορίθμου Αναζήτησης
-        local_solution, local_cost = local_search(initial_solution, costs, max_iterations=100)
-        print("\n--- Βελτιωμένη Λύση (Απλός Τοπικός Αλγόριθμος) ---")
-        if all(isinstance(r, list) for r in local_solution):
-             # Φιλτράρισμα κενών διαδρομών από την εκτύπωση, αν υπάρχουν
-            printable_local_solution = [route for route in local_solution if route]
-            print("Βέλτιστη Λύση:", printable_local_solution)
-        else:
-            print("Βέλτιστη Λύση: Μη έγκυρη μορφή βέλτιστης λύσης για εκτύπωση.")
-        print("Κόστος Λύσης Τοπικού Αλγορίθμου:", local_cost)
+        # Αν η αναζήτηση σταμάτησε πριν το Tabu Search (π.χ. target_gap), η λύση του σταδίου είναι η τελευταία
+        tabu_solution = result.get("tabu_solution", result["solution"])
+        tabu_cost = result.get("tabu_cost", result["cost"])
+        logger.debug("Λύση (Tabu Search): %s", [route for route in tabu_solution if route])
+        logger.info("Κόστος Λύσης Tabu Search: %s", tabu_cost)
+        polished_solution = None
+        if result["cost"] < tabu_cost:
+            polished_solution = result["solution"]
+            logger.debug("Λύση (Επανασύνθεση): %s", [route for route in polished_solution if route])
+            logger.info("Κόστος Λύσης Επανασύνθεσης (polish): %s", result["cost"])
+        logger.info("Κάτω φράγμα: %s | Απόκλιση (gap): %.2f%%", result["lower_bound"], 100 * result["gap"])
+        # Ο έλεγχος εγκυρότητας προκύπτει από τις cache της κατάστασης, χωρίς νέο πέρασμα του validator
+        tabu_valid, tabu_report = Solution(model, result["solution"], costs).report()
+        logger.info("Έγκυρη λύση: %s | Φορτία: %s", tabu_valid, tabu_report["route_loads"])
 
-        # 3. Εκτέλεση Tabu Search (ξεκινώντας από την αρχική λύση)
-        tabu_solution, tabu_cost = tabu_search(local_solution, costs, tabu_size=50, max_iterations=600) # Πολλές επαναλήψεις [tabu size] για καλύτερη εξερεύνηση
-        print("\n--- Βελτιωμένη Λύση (Tabu Search) ---")
-        printable_tabu_solution = [route for route in tabu_solution if route]
-        print("Λύση:", printable_tabu_solution)
-        print("Κόστος Λύσης Tabu Search:", tabu_cost)
+        if probe is not None:
+            logger.info("--- Instrumentation ---\n%s", instrumentation.format_report(probe.report()))
 
         # 5. Εγγραφή της καλύτερης λύσης στο αρχείο
-        write_solution_to_file(initial_solution, local_solution, tabu_solution)
\ No newline at end of file
+        write_solution_to_file(initial_solution, local_solution, tabu_solution,
+                               costs=(result["initial_cost"], result["local_cost"], tabu_cost, result["cost"]),
+                               polished_solution=polished_solution)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Insertion-cost cache with per-route invalidation.
+
+For every route r and every node v the cache keeps the cheapest and the
+second cheapest position to insert v into r. Position k means between the
+(k-1)-th and the k-th node of the route, the depot standing in at both ends,
+so an insertion at k replaces arc k of the route.
+
+After an insertion into route r only row r changes. Its two new arcs are
+scored for every node in one O(n) array operation and merged with the
+stored best and second best. The stored positions stay valid unless they
+pointed at the arc that was replaced. Nodes that lost their best or second
+best that way are the only ones rescored against the whole route (small
+routes are simply recomputed, see FULL_RECOMPUTE_SIZE). Any other change
+to a route (removals, reordering) marks it stale, and it is recomputed on
+the next lookup.
+
+On top of the rows, the cache keeps the cheapest feasible insertion of
+every node over all routes (cheapest()), given the route loads and the
+vehicle capacity. After an insertion only the nodes whose cheapest route
+was the changed one, and became more expensive, are rescored across routes.
+"""
+import numpy as np
+
+# Routes with at most this many (positions x nodes) entries are recomputed in
+# full after an insertion: below it, NumPy call overhead outweighs the saving
+FULL_RECOMPUTE_SIZE = 8192
+
+
+class InsertionCache:
+    """
+    Best and second-best insertion of every node into every route.
+
+    The owner changes the routes and tells the cache: insert() after adding
+    a node, invalidate() after any other change.
+
+    Attributes:
+        routes: The list of routes the cache describes (node IDs, depot excluded)
+        best_cost, second_cost: (routes x nodes) float arrays of insertion costs
+                                (inf where a route has no second position)
+        best_pos, second_pos: (routes x nodes) positions of those insertions
+        loads: Load of every route
+        stale: Routes to recompute on the next lookup
+        rows_computed: Number of full route recomputations so far
+    """
+
+    def __init__(self, cost_matrix, routes, demands, capacity):
+        self.matrix = np.asarray(cost_matrix)
+        self.routes = routes
+        self.demands = np.asarray(demands, dtype=np.int64)
+        self.capacity = capacity
+        shape = (len(routes), self.matrix.shape[0])
+        self.best_cost = np.full(shape, np.inf)
+        self.second_cost = np.full(shape, np.inf)
+        self.best_pos = np.zeros(shape, dtype=np.intp)
+        self.second_pos = np.zeros(shape, dtype=np.intp)
+        self.loads = np.zeros(len(routes), dtype=np.int64)
+        self.stale = set(range(len(routes)))
+        self.rows_computed = 0
+        self._cheapest = None  # (costs, routes) over all routes, None when it must be rebuilt
+
+    def rebind(self, routes):
+        """
+        Describe another list of routes with the same content, e.g. a copy
+        of the solution the cache was built for.
+        """
+        self.routes = routes
+
+    def invalidate(self, *route_indices):
+        """
+        Mark routes changed in any way other than insert() as stale.
+        """
+        self.stale.update(route_indices)
+        self._cheapest = None
+
+    def refresh(self):
+        """
+        Recompute every stale route.
+        """
+        for route_index in self.stale:
+            self._compute_row(route_index)
+            self.loads[route_index] = self.demands[self.routes[route_index]].sum() if self.routes[route_index] else 0
+        self.stale.clear()
+
+    def _arc_costs(self, route, columns):
+        """
+        Insertion cost of the nodes in columns at every position of route, as (positions x columns).
+        """
+        matrix = self.matrix
+        path = np.array([0] + route + [0], dtype=np.intp)
+        u = path[:-1]
+        v = path[1:]
+        # The (0, 0) arc of an empty route costs nothing (the diagonal is -1)
+        removed = np.where(u == v, 0, matrix[u, v]).astype(np.float64)
+        if columns is None:
+            added = matrix[u].astype(np.float64) + matrix[:, v].T
+        else:
+            added = matrix[u[:, None], columns].astype(np.float64) + matrix[columns, v[:, None]]
+        return added - removed[:, None]
+
+    def _compute_row(self, route_index, columns=None):
+        """
+        Best and second best of one route from scratch, for all nodes or the given columns.
+        """
+        if columns is None:
+            self.rows_computed += 1
+            target = slice(None)
+            size = self.matrix.shape[0]
+        else:
+            target = columns
+            size = columns.size
+        costs = self._arc_costs(self.routes[route_index], columns)
+        if costs.shape[0] == 1:
+            self.best_cost[route_index, target] = costs[0]
+            self.best_pos[route_index, target] = 0
+            self.second_cost[route_index, target] = np.inf
+            self.second_pos[route_index, target] = 0
+            return
+        two = np.argpartition(costs, 1, axis=0)[:2]
+        index = np.arange(size)
+        first = costs[two[0], index]
+        second = costs[two[1], index]
+        swap = second < first
+        self.best_cost[route_index, target] = np.where(swap, second, first)
+        self.best_pos[route_index, target] = np.where(swap, two[1], two[0])
+        self.second_cost[route_index, target] = np.where(swap, first, second)
+        self.second_pos[route_index, target] = np.where(swap, two[0], two[1])
+
+    def insert(self, route_index, position, node):
+        """
+        Update one route after node was inserted at routes[route_index][position].
+        """
+        route = self.routes[route_index]
+        self.loads[route_index] += self.demands[node]
+        if route_index in self.stale:
+            return
+        if len(route) == 1 or (len(route) + 1) * self.matrix.shape[0] <= FULL_RECOMPUTE_SIZE:
+            # The only arc of an empty route was replaced, or the route is small
+            self._compute_row(route_index)
+            self._cheapest_update(route_index)
+            return
+
+        matrix = self.matrix
+        a = route[position - 1] if position > 0 else 0
+        b = route[position + 1] if position + 1 < len(route) else 0
+        via_a = matrix[a].astype(np.float64) + matrix[:, node] - matrix[a, node]
+        via_b = matrix[node].astype(np.float64) + matrix[:, b] - matrix[node, b]
+        a_first = via_a <= via_b
+        new_low = np.where(a_first, via_a, via_b)
+        new_high = np.where(a_first, via_b, via_a)
+        low_pos = np.where(a_first, position, position + 1)
+        high_pos = np.where(a_first, position + 1, position)
+
+        best_cost = self.best_cost[route_index]
+        second_cost = self.second_cost[route_index]
+        best_pos = self.best_pos[route_index]
+        second_pos = self.second_pos[route_index]
+        lost = np.flatnonzero((best_pos == position) | (second_pos == position))
+        # Positions after the insertion point move one place to the right
+        best_pos += best_pos > position
+        second_pos += second_pos > position
+
+        # Merge the sorted pairs (best, second) and (new_low, new_high); the
+        # rows are views, so the updates below write into the cache
+        new_best = new_low < best_cost
+        keep_best = best_cost <= new_high
+        keep_second = second_cost <= new_low
+        second_cost[:] = np.where(new_best, np.where(keep_best, best_cost, new_high),
+                                  np.where(keep_second, second_cost, new_low))
+        second_pos[:] = np.where(new_best, np.where(keep_best, best_pos, high_pos),
+                                 np.where(keep_second, second_pos, low_pos))
+        best_cost[:] = np.where(new_best, new_low, best_cost)
+        best_pos[:] = np.where(new_best, low_pos, best_pos)
+
+        # Nodes whose best or second best used the replaced arc may have a
+        # better third position that was never stored: rescore them exactly,
+        # or the whole route when that is most of it anyway
+        if lost.size * 4 > best_cost.size:
+            self._compute_row(route_index)
+        elif lost.size:
+            self._compute_row(route_index, lost)
+        self._cheapest_update(route_index)
+
+    def feasible_costs(self, columns):
+        """
+        (routes x columns) best insertion costs, inf where the node does not fit in the route.
+        """
+        self.refresh()
+        costs = self.best_cost[:, columns].copy()
+        costs[self.loads[:, None] + self.demands[columns][None, :] > self.capacity] = np.inf
+        return costs
+
+    def cheapest(self):
+        """
+        Cheapest feasible insertion of every node over all routes.
+
+        Returns:
+            costs: costs[node] is the cheapest insertion cost (inf if the node fits nowhere)
+            routes: routes[node] is the route of that insertion
+        """
+        self.refresh()
+        if self._cheapest is None:
+            costs = self.feasible_costs(slice(None))
+            routes = np.argmin(costs, axis=0)
+            self._cheapest = (costs[routes, np.arange(costs.shape[1])], routes)
+        return self._cheapest
+
+    def _cheapest_update(self, route_index):
+        if self._cheapest is None:
+            return
+        costs, routes = self._cheapest
+        row = self.best_cost[route_index].copy()
+        row[self.loads[route_index] + self.demands > self.capacity] = np.inf
+        # Only the nodes for which their cheapest route became more expensive
+        # may now be cheaper elsewhere; every other route is unchanged
+        affected = np.flatnonzero((routes == route_index) & (row > costs))
+        better = row < costs
+        costs[better] = row[better]
+        routes[better] = route_index
+        if affected.size:
+            column_costs = self.feasible_costs(affected)
+            best_routes = np.argmin(column_costs, axis=0)
+            costs[affected] = column_costs[best_routes, np.arange(affected.size)]
+            routes[affected] = best_routes
+
+    def position(self, route_index, node):
+        """
+        Position of the cheapest insertion of node into a route.
+        """
+        if route_index in self.stale:
+            self.refresh()
+        return int(self.best_pos[route_index, node])
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic FCVRP instance generator.
+
+Writes instances in the format read by Parser.load_model:
+    1st line: |N| L V Q K (num_nodes, num_families, num_required, capacity, vehicles)
+    2nd line: List of family members
+    3rd line: List of family visits
+    4th line: List of family demands
+    5th line until end: Cost matrix, -1 on the diagonal
+
+Nodes are random points on a square grid and costs are rounded Euclidean
+distances. The matrix is computed and written in blocks of rows, so a
+10,000 node instance never needs the whole matrix in memory.
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+
+
+def generate_families(num_nodes, num_families, rng, visit_ratio=(0.5, 0.9), demand_range=(5, 20)):
+    """
+    Random family sizes, required visits and demands.
+
+    Args:
+        num_nodes: Number of customers
+        num_families: Number of families
+        rng: numpy.random.Generator
+        visit_ratio: Range of the fraction of members of a family that must be visited
+        demand_range: Range of the demand of a single member (inclusive)
+
+    Returns:
+        fam_members, fam_req, fam_dem as lists of ints
+    """
+    if not 0 < num_families <= num_nodes:
+        raise ValueError(f"Need 1 <= num_families <= num_nodes, got {num_families} families for {num_nodes} nodes")
+
+    # Every family gets at least one member, the rest are spread at random
+    cuts = np.sort(rng.choice(np.arange(1, num_nodes), size=num_families - 1, replace=False))
+    fam_members = np.diff(np.concatenate(([0], cuts, [num_nodes])))
+    ratios = rng.uniform(*visit_ratio, size=num_families)
+    fam_req = np.clip(np.ceil(fam_members * ratios), 1, fam_members).astype(int)
+    fam_dem = rng.integers(demand_range[0], demand_range[1] + 1, size=num_families)
+    return fam_members.tolist(), fam_req.tolist(), fam_dem.tolist()
+
+
+def write_instance(file_name, num_nodes, num_families, seed=0, capacity=400, load_factor=0.9, grid=100,
+                   chunk_rows=256):
+    """
+    Generate an instance and write it to a file.
+
+    The fleet is the smallest one whose total capacity, used up to
+    load_factor, covers the demand of all required visits.
+
+    Args:
+        file_name: Output file
+        num_nodes: Number of customers (the depot is added as node 0)
+        num_families: Number of families
+        seed: Random seed; the same arguments always give the same file
+        capacity: Vehicle capacity
+        load_factor: Target average load of a vehicle as a fraction of capacity
+        grid: Side of the square the nodes are placed in
+        chunk_rows: Rows of the cost matrix computed at a time
+
+    Returns:
+        The file name
+    """
+    rng = np.random.default_rng(seed)
+    fam_members, fam_req, fam_dem = generate_families(num_nodes, num_families, rng)
+    if max(fam_dem) > capacity:
+        raise ValueError(f"Capacity {capacity} is below the largest member demand {max(fam_dem)}")
+    required_demand = sum(req * dem for req, dem in zip(fam_req, fam_dem))
+    vehicles = max(1, math.ceil(required_demand / (capacity * load_factor)))
+
+    points = rng.uniform(0, grid, size=(num_nodes + 1, 2))
+    tmp_name = f"{file_name}.{os.getpid()}.tmp"
+    with open(tmp_name, "w") as f:
+        f.write(f"{num_nodes} {num_families} {sum(fam_req)} {capacity} {vehicles}\n")
+        for values in (fam_members, fam_req, fam_dem):
+            f.write(" ".join(map(str, values)) + "\n")
+        for start in range(0, num_nodes + 1, chunk_rows):
+            block = points[start:start + chunk_rows]
+            rows = np.rint(np.sqrt(((block[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))).astype(np.int64)
+            local = np.arange(block.shape[0])
+            rows[local, start + local] = -1
+            np.savetxt(f, rows, fmt="%d")
+    os.replace(tmp_name, file_name)
+    return file_name
+
+
+def instance_name(num_nodes, num_families, seed=0):
+    """
+    File name used for a generated instance, e.g. gen_n500_f25_s0.txt.
+    """
+    return f"gen_n{num_nodes}_f{num_families}_s{seed}.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic FCVRP instance")
+    parser.add_argument("num_nodes", type=int)
+    parser.add_argument("num_families", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--capacity", type=int, default=400)
+    parser.add_argument("--output", help="Output file (default: gen_n<nodes>_f<families>_s<seed>.txt)")
+    args = parser.parse_args()
+
+    file_name = args.output or instance_name(args.num_nodes, args.num_families, args.seed)
+    write_instance(file_name, args.num_nodes, args.num_families, args.seed, args.capacity)
+    print(file_name)
+
+
+if __name__ == "__main__":
+    main()
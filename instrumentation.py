@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Low-overhead instrumentation for the search loops.
+
+Instrumentation is off unless a block of code runs inside instrument():
+
+    with instrument(trace_file="run.trace.json", profile_file="run.pstats") as probe:
+        tabu_search(...)
+    print(format_report(probe.report()))
+
+While it is off, every hook is a single check of a module global: phase()
+returns a shared no-op context manager and count() / improvement() return
+immediately. While it is on, the hooks collect:
+
+    phases      wall time and number of calls per named phase
+    counters    event counts, e.g. moves evaluated or tabu lookups
+    trajectory  (seconds, stage, iteration, cost) of every new best solution
+
+Optionally the phases are also recorded as a Chrome trace event file
+(chrome://tracing, Perfetto), and the whole block can be run under
+cProfile with the statistics dumped in pstats format.
+"""
+import contextlib
+import cProfile
+import functools
+import json
+import time
+from collections import Counter
+
+# The probe of the innermost instrument() block, or None when instrumentation is off
+_active = None
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Probe:
+    """
+    Counters, phase timers and the improvement trajectory of one instrumented run.
+
+    Attributes:
+        counters: Counter of event name -> count
+        phases: Dictionary of phase name -> [seconds, calls]
+        trajectory: List of (seconds since start, stage, iteration, cost)
+        events: Chrome trace events of every phase, or None if not tracing
+        started: time.perf_counter() at creation
+    """
+
+    def __init__(self, trace=False):
+        self.counters = Counter()
+        self.phases = {}
+        self.trajectory = []
+        self.events = [] if trace else None
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def improvement(self, stage, iteration, cost):
+        self.trajectory.append((time.perf_counter() - self.started, stage, iteration, cost))
+
+    def report(self):
+        """
+        Summary of the run as a JSON-serialisable dictionary.
+
+        Returns:
+            elapsed: Seconds since the probe was created
+            phases: name -> seconds, calls and share of the elapsed time
+            counters: name -> count
+            rates: name -> count per second of elapsed time
+            trajectory: List of {seconds, stage, iteration, cost}
+        """
+        elapsed = time.perf_counter() - self.started
+        return {
+            "elapsed": elapsed,
+            "phases": {name: {"seconds": seconds, "calls": calls,
+                              "share": seconds / elapsed if elapsed > 0 else 0.0}
+                       for name, (seconds, calls) in sorted(self.phases.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "rates": {f"{name}_per_sec": count / elapsed
+                      for name, count in sorted(self.counters.items()) if elapsed > 0},
+            "trajectory": [{"seconds": seconds, "stage": stage, "iteration": iteration, "cost": cost}
+                           for seconds, stage, iteration, cost in self.trajectory],
+        }
+
+    def write_trace(self, file_name):
+        """
+        Write the recorded phases as a Chrome trace event file.
+        """
+        if self.events is None:
+            raise ValueError("write_trace: the probe was created without trace=True")
+        events = list(self.events)
+        events.extend({"name": "best cost", "ph": "C", "pid": 0, "tid": 0, "ts": seconds * 1e6,
+                       "args": {stage: cost}}
+                      for seconds, stage, _, cost in self.trajectory)
+        with open(file_name, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class _Phase:
+    __slots__ = ("probe", "name", "start")
+
+    def __init__(self, probe, name):
+        self.probe = probe
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        probe = self.probe
+        timer = probe.phases.get(self.name)
+        if timer is None:
+            timer = probe.phases[self.name] = [0.0, 0]
+        timer[0] += end - self.start
+        timer[1] += 1
+        if probe.events is not None:
+            probe.events.append({"name": self.name, "ph": "X", "pid": 0, "tid": 0,
+                                 "ts": (self.start - probe.started) * 1e6, "dur": (end - self.start) * 1e6})
+        return False
+
+
+def active():
+    """
+    The probe collecting data right now, or None when instrumentation is off.
+    """
+    return _active
+
+
+def phase(name):
+    """
+    Context manager timing the enclosed block as the named phase.
+    """
+    return _NO_PHASE if _active is None else _Phase(_active, name)
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.counters[name] += n
+
+
+def improvement(stage, iteration, cost):
+    """
+    Record a new best solution of a search stage in the trajectory.
+    """
+    if _active is not None:
+        _active.improvement(stage, iteration, cost)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as the named phase.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with _Phase(_active, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextlib.contextmanager
+def instrument(trace_file=None, profile_file=None):
+    """
+    Turn instrumentation on for the enclosed block.
+
+    Args:
+        trace_file: Optional file for a Chrome trace of the phases, written
+                    when the block ends
+        profile_file: Optional file for cProfile statistics of the block
+                      (load with pstats.Stats or snakeviz)
+
+    Yields:
+        The Probe collecting the data
+    """
+    global _active
+    previous = _active
+    probe = _active = Probe(trace=trace_file is not None)
+    profiler = cProfile.Profile() if profile_file else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield probe
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+        _active = previous
+        if trace_file is not None:
+            probe.write_trace(trace_file)
+
+
+def format_report(report):
+    """
+    Human-readable table of a Probe.report() dictionary.
+    """
+    lines = [f"Elapsed: {report['elapsed']:.3f} s", "", f"{'phase':<28} {'seconds':>9} {'calls':>8} {'share':>7}"]
+    for name, timer in report["phases"].items():
+        lines.append(f"{name:<28} {timer['seconds']:>9.3f} {timer['calls']:>8} {timer['share']:>6.1%}")
+    lines += ["", f"{'counter':<28} {'count':>12} {'per second':>12}"]
+    for name, value in report["counters"].items():
+        lines.append(f"{name:<28} {value:>12} {report['rates'][name + '_per_sec']:>12.1f}")
+    if report["trajectory"]:
+        lines += ["", "Improvements (seconds, stage, iteration, cost):"]
+        lines.extend(f"  {point['seconds']:8.3f} {point['stage']:<6} {point['iteration']:>6} {point['cost']}"
+                     for point in report["trajectory"])
+    return "\n".join(lines)
@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+"""
+Delta-cost evaluation of swap moves.
+
+Routes are lists of customer ids without the depot, exactly as produced by
+const_heuristic.Fcvrp. A move is scored from the handful of arcs it changes
+instead of re-summing every route, and only the chosen move is applied.
+
+Every neighbourhood has a scalar scan (one delta per Python loop step) and a
+vectorised scan that scores the whole neighbourhood as NumPy array
+operations over the cost matrix and returns the argmin. Both scan the moves
+in the same order and break ties the same way.
+"""
+import numpy as np
+
+import instrumentation
+
+# Score given to positions that are not valid moves in a delta matrix
+_MASKED = np.iinfo(np.int64).max
+
+
+def intra_swap_delta(route, i, j, costs):
+    """
+    Cost change of swapping positions i < j inside the same route.
+
+    Args:
+        route: The route (list of node IDs, depot excluded)
+        i, j: Positions to swap, with i < j
+        costs: Cost matrix, costs[a][b] is the cost of going from a to b
+
+    Returns:
+        The new route cost minus the old route cost
+    """
+    a = route[i]
+    b = route[j]
+    prev_a = route[i - 1] if i > 0 else 0
+    next_b = route[j + 1] if j + 1 < len(route) else 0
+
+    # int() per arc, so a narrow (int16) NumPy matrix cannot overflow the sum
+    if j == i + 1:
+        # Adjacent nodes: only three arcs change
+        return (int(costs[prev_a][b]) + int(costs[b][a]) + int(costs[a][next_b])
+                - int(costs[prev_a][a]) - int(costs[a][b]) - int(costs[b][next_b]))
+
+    next_a = route[i + 1]
+    prev_b = route[j - 1]
+    return (int(costs[prev_a][b]) + int(costs[b][next_a]) + int(costs[prev_b][a]) + int(costs[a][next_b])
+            - int(costs[prev_a][a]) - int(costs[a][next_a]) - int(costs[prev_b][b]) - int(costs[b][next_b]))
+
+
+def inter_swap_delta(route1, idx1, route2, idx2, costs):
+    """
+    Cost change of exchanging route1[idx1] with route2[idx2].
+
+    Args:
+        route1, route2: Two different routes
+        idx1, idx2: Positions of the exchanged nodes
+        costs: Cost matrix
+
+    Returns:
+        The change of the summed cost of both routes
+    """
+    a = route1[idx1]
+    b = route2[idx2]
+    prev_a = route1[idx1 - 1] if idx1 > 0 else 0
+    next_a = route1[idx1 + 1] if idx1 + 1 < len(route1) else 0
+    prev_b = route2[idx2 - 1] if idx2 > 0 else 0
+    next_b = route2[idx2 + 1] if idx2 + 1 < len(route2) else 0
+
+    return (int(costs[prev_a][b]) + int(costs[b][next_a]) + int(costs[prev_b][a]) + int(costs[a][next_b])
+            - int(costs[prev_a][a]) - int(costs[a][next_a]) - int(costs[prev_b][b]) - int(costs[b][next_b]))
+
+
+def _neighbours(route):
+    """
+    Predecessor and successor of every position of a route, depot included.
+    """
+    prev = [0] + route[:-1]
+    nxt = route[1:] + [0]
+    return prev, nxt
+
+
+def _intra_swap_arcs(route, i, j):
+    """
+    Arcs created by swapping positions i < j of a route.
+    """
+    a = route[i]
+    b = route[j]
+    prev_a = route[i - 1] if i > 0 else 0
+    next_b = route[j + 1] if j + 1 < len(route) else 0
+    if j == i + 1:
+        return (prev_a, b), (b, a), (a, next_b)
+    return (prev_a, b), (b, route[i + 1]), (route[j - 1], a), (a, next_b)
+
+
+def best_intra_swap(solution, costs, candidates=None):
+    """
+    Find the cheapest swap of two positions inside any single route.
+
+    Positions are scanned in the same order as fcvrp.get_neighbors, so ties
+    are broken the same way as the full-copy search.
+
+    Args:
+        solution: List of routes
+        costs: Cost matrix
+        candidates: Optional candidates.CandidateLists; only swaps creating
+                    at least one candidate arc are considered
+
+    Returns:
+        (delta, route_index, i, j) of the best move, or None if no route has
+        two or more customers
+    """
+    if instrumentation.active() is not None:
+        instrumentation.count("moves.intra_swap", sum(len(route) * (len(route) - 1) // 2 for route in solution))
+    best = None
+    for route_index, route in enumerate(solution):
+        n = len(route)
+        if n < 2:
+            continue
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                delta = intra_swap_delta(route, i, j, costs)
+                if best is None or delta < best[0]:
+                    if candidates is not None and not candidates.any_candidate(*_intra_swap_arcs(route, i, j)):
+                        continue
+                    best = (delta, route_index, i, j)
+    return best
+
+
+def best_inter_swap(solution, costs, is_tabu=None, state=None, candidates=None, aspiration=None):
+    """
+    Find the cheapest exchange of two nodes that belong to different routes.
+
+    Moves are scanned in the same order as tabus.get_neighbors. The tabu test
+    is only called for a move that would become the new best, so its cost is
+    paid a handful of times per scan instead of once per candidate.
+
+    Args:
+        solution: List of routes
+        costs: Cost matrix
+        is_tabu: Optional callable (node_a, node_b) -> bool; moves for which
+                 it returns True are skipped
+        state: Optional solution_state.Solution over the same routes; moves
+               that would overload a vehicle are skipped
+        candidates: Optional candidates.CandidateLists; only exchanges creating
+                    at least one candidate arc are considered
+        aspiration: Optional delta threshold; tabu moves with a delta below it
+                    are allowed anyway
+
+    Returns:
+        (delta, r1, idx1, r2, idx2) of the best allowed move, or None if
+        there is no allowed move
+    """
+    if instrumentation.active() is not None:
+        lengths = [len(route) for route in solution]
+        instrumentation.count("moves.inter_swap", (sum(lengths) ** 2 - sum(n * n for n in lengths)) // 2)
+    best = None
+    best_delta = float("inf")
+    links = [_neighbours(route) for route in solution]
+
+    for r1 in range(len(solution)):
+        route1 = solution[r1]
+        prev1, next1 = links[r1]
+        for r2 in range(r1 + 1, len(solution)):
+            route2 = solution[r2]
+            prev2, next2 = links[r2]
+            for idx1 in range(len(route1)):
+                a = route1[idx1]
+                pa = prev1[idx1]
+                na = next1[idx1]
+                row_pa = costs[pa]
+                row_a = costs[a]
+                removed_a = int(row_pa[a]) + int(row_a[na])
+                for idx2 in range(len(route2)):
+                    b = route2[idx2]
+                    pb = prev2[idx2]
+                    nb = next2[idx2]
+                    delta = (int(row_pa[b]) + int(costs[b][na]) + int(costs[pb][a]) + int(row_a[nb])
+                             - removed_a - int(costs[pb][b]) - int(costs[b][nb]))
+                    if delta < best_delta:
+                        if (is_tabu is not None and (aspiration is None or delta >= aspiration)
+                                and is_tabu(a, b)):
+                            continue
+                        if state is not None and not state.can_inter_swap(r1, idx1, r2, idx2):
+                            continue
+                        if candidates is not None and not candidates.any_candidate(
+                                (pa, b), (b, na), (pb, a), (a, nb)):
+                            continue
+                        best_delta = delta
+                        best = (delta, r1, idx1, r2, idx2)
+    return best
+
+
+def first_inter_swap(solution, costs, state=None):
+    """
+    The first inter-route exchange in scan order, regardless of tabu status.
+
+    Args:
+        solution: List of routes
+        costs: Cost matrix
+        state: Optional solution_state.Solution; if given, the first exchange
+               that keeps both vehicles within capacity
+
+    Returns:
+        (delta, r1, idx1, r2, idx2), or None if there is no such exchange
+    """
+    for r1 in range(len(solution)):
+        for r2 in range(r1 + 1, len(solution)):
+            for idx1 in range(len(solution[r1])):
+                for idx2 in range(len(solution[r2])):
+                    if state is None or state.can_inter_swap(r1, idx1, r2, idx2):
+                        delta = inter_swap_delta(solution[r1], idx1, solution[r2], idx2, costs)
+                        return delta, r1, idx1, r2, idx2
+    return None
+
+
+def apply_intra_swap(solution, route_index, i, j):
+    """
+    Swap positions i and j of one route in place.
+    """
+    route = solution[route_index]
+    route[i], route[j] = route[j], route[i]
+
+
+def apply_inter_swap(solution, r1, idx1, r2, idx2):
+    """
+    Exchange solution[r1][idx1] and solution[r2][idx2] in place.
+    """
+    solution[r1][idx1], solution[r2][idx2] = solution[r2][idx2], solution[r1][idx1]
+
+
+def uses_vectorized(costs, vectorized=None):
+    """
+    Resolve the vectorized flag of a search: None means "vectorise when the
+    cost matrix is a NumPy array", where scalar indexing is slow.
+    """
+    if vectorized is None:
+        return isinstance(costs, np.ndarray)
+    return vectorized
+
+
+def _route_arrays(route):
+    """
+    Node ids of a route with their predecessors and successors as int arrays.
+    """
+    nodes = np.asarray(route, dtype=np.intp)
+    padded = np.zeros(len(route) + 2, dtype=np.intp)
+    padded[1:-1] = nodes
+    return nodes, padded[:-2], padded[2:]
+
+
+def intra_swap_deltas(route, costs, candidates=None):
+    """
+    Delta of every intra-route swap of a route as one matrix.
+
+    Args:
+        route: The route (list of node IDs, depot excluded)
+        costs: Cost matrix as a NumPy array
+        candidates: Optional candidates.CandidateLists; swaps that create no
+                    candidate arc are masked
+
+    Returns:
+        An int64 matrix D where D[i, j] (i < j) is intra_swap_delta(route, i, j);
+        entries on and below the diagonal hold a masking value
+    """
+    n = len(route)
+    nodes, prev, nxt = _route_arrays(route)
+    removed = costs[prev, nodes].astype(np.int64) + costs[nodes, nxt]
+
+    deltas = (costs[prev[:, None], nodes[None, :]].astype(np.int64)
+              + costs[nodes[None, :], nxt[:, None]]
+              + costs[prev[None, :], nodes[:, None]]
+              + costs[nodes[:, None], nxt[None, :]]
+              - removed[:, None] - removed[None, :])
+
+    if n > 1:
+        # Adjacent positions share an arc and need the three-arc formula
+        a = nodes[:-1]
+        b = nodes[1:]
+        i = np.arange(n - 1)
+        deltas[i, i + 1] = (costs[prev[:-1], b].astype(np.int64) + costs[b, a] + costs[a, nxt[1:]]
+                            - costs[prev[:-1], a] - costs[a, b] - costs[b, nxt[1:]])
+
+    if candidates is not None:
+        is_candidate = candidates.is_candidate
+        useful = (is_candidate(prev[:, None], nodes[None, :])
+                  | is_candidate(nodes[None, :], nxt[:, None])
+                  | is_candidate(prev[None, :], nodes[:, None])
+                  | is_candidate(nodes[:, None], nxt[None, :]))
+        if n > 1:
+            useful[i, i + 1] = (is_candidate(prev[:-1], b) | is_candidate(b, a)
+                                | is_candidate(a, nxt[1:]))
+        deltas[~useful] = _MASKED
+
+    deltas[np.tril_indices(n)] = _MASKED
+    return deltas
+
+
+def inter_swap_deltas(route1, route2, costs, candidates=None):
+    """
+    Delta of every exchange between two routes as one matrix.
+
+    Args:
+        route1, route2: Two different routes
+        costs: Cost matrix as a NumPy array
+        candidates: Optional candidates.CandidateLists; exchanges that create
+                    no candidate arc are masked
+
+    Returns:
+        An int64 matrix D where D[idx1, idx2] is
+        inter_swap_delta(route1, idx1, route2, idx2, costs)
+    """
+    nodes1, prev1, next1 = _route_arrays(route1)
+    nodes2, prev2, next2 = _route_arrays(route2)
+    removed1 = costs[prev1, nodes1].astype(np.int64) + costs[nodes1, next1]
+    removed2 = costs[prev2, nodes2].astype(np.int64) + costs[nodes2, next2]
+
+    deltas = (costs[prev1[:, None], nodes2[None, :]].astype(np.int64)
+              + costs[nodes2[None, :], next1[:, None]]
+              + costs[prev2[None, :], nodes1[:, None]]
+              + costs[nodes1[:, None], next2[None, :]]
+              - removed1[:, None] - removed2[None, :])
+
+    if candidates is not None:
+        is_candidate = candidates.is_candidate
+        useful = (is_candidate(prev1[:, None], nodes2[None, :])
+                  | is_candidate(nodes2[None, :], next1[:, None])
+                  | is_candidate(prev2[None, :], nodes1[:, None])
+                  | is_candidate(nodes1[:, None], next2[None, :]))
+        deltas[~useful] = _MASKED
+    return deltas
+
+
+def best_intra_swap_vectorized(solution, costs, candidates=None):
+    """
+    Vectorised counterpart of best_intra_swap.
+
+    Returns:
+        (delta, route_index, i, j) of the best move, or None
+    """
+    best = None
+    for route_index, route in enumerate(solution):
+        n = len(route)
+        if n < 2:
+            continue
+        deltas = intra_swap_deltas(route, costs, candidates)
+        instrumentation.count("moves.intra_swap", n * (n - 1) // 2)
+        flat = int(np.argmin(deltas))
+        delta = int(deltas.flat[flat])
+        if delta == _MASKED:
+            continue  # No swap of this route creates a candidate arc
+        if best is None or delta < best[0]:
+            best = (delta, route_index, flat // n, flat % n)
+    return best
+
+
+def best_inter_swap_vectorized(solution, costs, tabu_pairs=(), state=None, candidates=None, aspiration=None):
+    """
+    Vectorised counterpart of best_inter_swap.
+
+    Args:
+        solution: List of routes
+        costs: Cost matrix as a NumPy array
+        tabu_pairs: Iterable of forbidden (node_a, node_b) exchanges, in either
+                    order
+        state: Optional solution_state.Solution over the same routes; moves
+               that would overload a vehicle are masked out
+        candidates: Optional candidates.CandidateLists; exchanges that create
+                    no candidate arc are masked out
+        aspiration: Optional delta threshold; tabu exchanges with a delta
+                    below it are not masked
+
+    Returns:
+        (delta, r1, idx1, r2, idx2) of the best allowed move, or None
+    """
+    tabu_pairs = list(tabu_pairs)
+    best = None
+    for r1 in range(len(solution)):
+        route1 = solution[r1]
+        if not route1:
+            continue
+        pos1 = {node: idx for idx, node in enumerate(route1)}
+        for r2 in range(r1 + 1, len(solution)):
+            route2 = solution[r2]
+            if not route2:
+                continue
+            deltas = inter_swap_deltas(route1, route2, costs, candidates)
+            instrumentation.count("moves.inter_swap", deltas.size)
+
+            if state is not None:
+                demands = np.asarray(state.demands)
+                diff = demands[route2][None, :] - demands[route1][:, None]
+                capacity = state.model.capacity
+                overloaded = ((state.route_loads[r1] + diff > capacity)
+                              | (state.route_loads[r2] - diff > capacity))
+                deltas[overloaded] = _MASKED
+
+            if tabu_pairs:
+                pos2 = {node: idx for idx, node in enumerate(route2)}
+                for u, v in tabu_pairs:
+                    if u in pos1 and v in pos2:
+                        _mask_tabu(deltas, pos1[u], pos2[v], aspiration)
+                    elif v in pos1 and u in pos2:
+                        _mask_tabu(deltas, pos1[v], pos2[u], aspiration)
+
+            flat = int(np.argmin(deltas))
+            delta = int(deltas.flat[flat])
+            if delta == _MASKED:
+                continue  # Every exchange between these routes is tabu or infeasible
+            if best is None or delta < best[0]:
+                best = (delta, r1, flat // len(route2), r2, flat % len(route2))
+    return best
+
+
+def _mask_tabu(deltas, row, col, aspiration):
+    """
+    Mask one tabu entry of a delta matrix unless it meets the aspiration threshold.
+    """
+    if aspiration is None or deltas[row, col] >= aspiration:
+        deltas[row, col] = _MASKED
+
+
+def replace_member_delta(route, idx, new_node, costs):
+    """
+    Cost change of visiting new_node instead of route[idx].
+
+    Args:
+        route: The route (list of node IDs, depot excluded)
+        idx: Position of the replaced node
+        new_node: Node visited in its place, normally an unvisited member of
+                  the same family
+        costs: Cost matrix
+
+    Returns:
+        The new route cost minus the old route cost
+    """
+    old_node = route[idx]
+    prev_node = route[idx - 1] if idx > 0 else 0
+    next_node = route[idx + 1] if idx + 1 < len(route) else 0
+    return (int(costs[prev_node][new_node]) + int(costs[new_node][next_node])
+            - int(costs[prev_node][old_node]) - int(costs[old_node][next_node]))
+
+
+def best_replace_member(state, is_tabu=None, candidates=None, aspiration=None):
+    """
+    Find the cheapest replacement of a visited node by an unvisited member of
+    its family. Members of a family share the same demand, so the move never
+    changes a route load or a family visit count.
+
+    Args:
+        state: solution_state.Solution holding the routes
+        is_tabu: Optional callable (old_node, new_node) -> bool; moves for
+                 which it returns True are skipped
+        candidates: Optional candidates.CandidateLists; only replacements
+                    creating at least one candidate arc are considered
+        aspiration: Optional delta threshold; tabu moves with a delta below it
+                    are allowed anyway
+
+    Returns:
+        (delta, route_index, idx, new_node) of the best allowed move, or None
+    """
+    costs = state.costs
+    best = None
+    best_delta = float("inf")
+    unvisited = [state.unvisited_members(family.id) for family in state.model.families]
+    if instrumentation.active() is not None:
+        instrumentation.count("moves.replace", sum(len(unvisited[state.node_family[a]])
+                                                   for route in state.routes for a in route))
+
+    for route_index, route in enumerate(state.routes):
+        prev, nxt = _neighbours(route)
+        for idx, a in enumerate(route):
+            p = prev[idx]
+            n = nxt[idx]
+            removed = int(costs[p][a]) + int(costs[a][n])
+            for b in unvisited[state.node_family[a]]:
+                delta = int(costs[p][b]) + int(costs[b][n]) - removed
+                if delta < best_delta:
+                    if (is_tabu is not None and (aspiration is None or delta >= aspiration)
+                            and is_tabu(a, b)):
+                        continue
+                    if candidates is not None and not candidates.any_candidate((p, b), (b, n)):
+                        continue
+                    best_delta = delta
+                    best = (delta, route_index, idx, b)
+    return best
+
+
+def best_replace_member_vectorized(state, tabu_pairs=(), candidates=None, aspiration=None):
+    """
+    Vectorised counterpart of best_replace_member: one delta matrix per
+    family, with the family's visited positions as rows and its unvisited
+    members as columns.
+
+    Args:
+        state: solution_state.Solution holding the routes
+        tabu_pairs: Iterable of forbidden (old_node, new_node) pairs, in either order
+        candidates: Optional candidates.CandidateLists
+        aspiration: Optional delta threshold; tabu moves with a delta below it
+                    are not masked
+
+    Returns:
+        (delta, route_index, idx, new_node) of the best allowed move, or None
+    """
+    costs = state.costs
+    tabu = list(tabu_pairs)
+
+    # Visited positions grouped by family, in scan order
+    positions = {}
+    for route_index, route in enumerate(state.routes):
+        prev, nxt = _neighbours(route)
+        for idx, a in enumerate(route):
+            positions.setdefault(state.node_family[a], []).append((route_index, idx, a, prev[idx], nxt[idx]))
+
+    best = None
+    for family_id, family_positions in positions.items():
+        members = state.unvisited_members(family_id)
+        if not members:
+            continue
+        _, _, nodes, prev, nxt = (np.array(column, dtype=np.intp) for column in zip(*family_positions))
+        members = np.array(members, dtype=np.intp)
+
+        removed = costs[prev, nodes].astype(np.int64) + costs[nodes, nxt]
+        deltas = (costs[prev[:, None], members[None, :]].astype(np.int64)
+                  + costs[members[None, :], nxt[:, None]]
+                  - removed[:, None])
+        instrumentation.count("moves.replace", deltas.size)
+
+        if candidates is not None:
+            is_candidate = candidates.is_candidate
+            deltas[~(is_candidate(prev[:, None], members[None, :])
+                     | is_candidate(members[None, :], nxt[:, None]))] = _MASKED
+        if tabu:
+            rows = {a: row for row, a in enumerate(nodes.tolist())}
+            cols = {b: col for col, b in enumerate(members.tolist())}
+            for u, v in tabu:
+                if u in rows and v in cols:
+                    _mask_tabu(deltas, rows[u], cols[v], aspiration)
+                elif v in rows and u in cols:
+                    _mask_tabu(deltas, rows[v], cols[u], aspiration)
+
+        flat = int(np.argmin(deltas))
+        delta = int(deltas.flat[flat])
+        if delta == _MASKED:
+            continue
+        row, col = divmod(flat, len(members))
+        route_index, idx = family_positions[row][:2]
+        move = (delta, route_index, idx, int(members[col]))
+        # Same tie breaking as the scalar scan: lowest route, then position
+        if best is None or move[:3] < best[:3]:
+            best = move
+    return best
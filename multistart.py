@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel multi-start driver.
+
+Runs the construction -> local search -> tabu search pipeline of fcvrp.py
+once per seed on a process pool and keeps the best valid result. The model
+is parsed once in the parent and handed to every worker when the worker
+starts; the workers only read it. Every worker keeps one RouteCache for all
+its starts, so routes that several starts arrive at are scored once.
+
+With polish_time, every start also collects the routes it visits in a
+polish.RoutePool; the pools of all starts are merged in the parent and
+the best solution is recombined from them by set partitioning. With
+reoptimize, the tabu search re-solves the visiting order of every route a
+move changes (route_tsp.RouteOptimizer), memoised per worker across starts.
+"""
+import argparse
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Parser import load_model
+from const_heuristic import Fcvrp
+from fcvrp import local_search
+from operators import OPERATORS
+from polish import RoutePool, polish
+from progress import configure_logging
+from route_cache import RouteCache
+from route_tsp import RouteOptimizer
+from solution_state import Solution
+from tabus import tabu_search
+
+DEFAULT_SEEDS = [4, 8, 15, 16, 23, 42]
+
+logger = logging.getLogger(__name__)
+
+# Model, route cache and route optimizer shared by every task of a worker process, set by _init_worker
+_worker_model = None
+_worker_route_cache = None
+_worker_route_optimizer = None
+
+
+def _init_worker(model):
+    global _worker_model, _worker_route_cache, _worker_route_optimizer
+    _worker_model = model
+    _worker_route_cache = RouteCache(model)
+    _worker_route_optimizer = RouteOptimizer(model.cost_matrix)
+
+
+def randomized_initial_solution(model, seed):
+    """
+    Construction heuristic solution with the visiting order of every route
+    shuffled by the seed, so each start explores a different region.
+
+    Args:
+        model: The problem model
+        seed: Random seed
+
+    Returns:
+        List of routes (node IDs, depot excluded)
+    """
+    constructor = Fcvrp(None, truck_capacity=model.capacity, max_trucks=model.vehicles, model=model)
+    constructor.visit_nodes()
+
+    rng = random.Random(seed)
+    solution = [list(route) for route in constructor.solution]
+    for route in solution:
+        rng.shuffle(route)
+    return solution
+
+
+def run_seed(model, seed, tabu_size=50, max_iterations=600, candidates=None, route_cache=None, route_pool=None,
+             route_optimizer=None):
+    """
+    One full pipeline run for a single seed.
+
+    Args:
+        model: The problem model
+        seed: Random seed of this start
+        tabu_size: Tabu list size
+        max_iterations: Tabu search iterations
+        candidates: Optional candidates.CandidateLists
+        route_cache: Optional route_cache.RouteCache shared between the starts on the same model
+        route_pool: Optional polish.RoutePool that collects the routes the searches visit
+        route_optimizer: Optional route_tsp.RouteOptimizer for the tabu search
+
+    Returns:
+        Dictionary with the seed, costs of every stage, validity, wall time
+        and the final routes
+    """
+    start = time.perf_counter()
+    costs = model.cost_matrix
+
+    initial_solution = randomized_initial_solution(model, seed)
+    local_solution, local_cost = local_search(initial_solution, costs, candidates=candidates, model=model,
+                                              operators=OPERATORS, route_pool=route_pool)
+    tabu_solution, tabu_cost = tabu_search(local_solution, costs, tabu_size, max_iterations,
+                                           model=model, candidates=candidates, operators=OPERATORS, seed=seed,
+                                           route_cache=route_cache, route_pool=route_pool,
+                                           route_optimizer=route_optimizer)
+    valid, _ = Solution(model, tabu_solution, costs, route_cache).report()
+
+    return {
+        "seed": seed,
+        "initial_cost": Solution(model, initial_solution, costs, route_cache).total_cost,
+        "local_cost": local_cost,
+        "cost": tabu_cost,
+        "valid": valid,
+        "wall_time": time.perf_counter() - start,
+        "solution": tabu_solution,
+    }
+
+
+def _run_seed_in_worker(seed, tabu_size, max_iterations, candidates, collect_routes, reoptimize):
+    route_pool = RoutePool(_worker_model, route_cache=_worker_route_cache) if collect_routes else None
+    route_optimizer = _worker_route_optimizer if reoptimize else None
+    result = run_seed(_worker_model, seed, tabu_size, max_iterations, candidates, _worker_route_cache, route_pool,
+                      route_optimizer)
+    if route_pool is not None:
+        result["routes"] = list(route_pool)
+    return result
+
+
+def run_multistart(model, seeds, workers=None, tabu_size=50, max_iterations=600, candidates=None,
+                   polish_time=None, reoptimize=False):
+    """
+    Run one start per seed on a process pool.
+
+    Args:
+        model: The problem model, shared read-only with the workers
+        seeds: Iterable of random seeds
+        workers: Number of worker processes (default: one per CPU)
+        tabu_size: Tabu list size
+        max_iterations: Tabu search iterations per start
+        candidates: Optional candidates.CandidateLists
+        polish_time: Optional time limit in seconds of a set-partitioning polish over the routes
+                     of all starts (see polish.polish); skipped if no solver is installed
+        reoptimize: Re-solve the visiting order of the routes every tabu move changes
+
+    Returns:
+        best: Result of the cheapest valid start (or cheapest start if none is valid); after a
+              polish, its solution and cost are the polished ones and "polish_cost" is set
+        results: Results of all starts, in seed order
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=min(workers, len(seeds)),
+                             initializer=_init_worker, initargs=(model,)) as executor:
+        futures = [executor.submit(_run_seed_in_worker, seed, tabu_size, max_iterations, candidates,
+                                   polish_time is not None, reoptimize)
+                   for seed in seeds]
+        results = [future.result() for future in futures]
+
+    best = min(results, key=lambda result: (not result["valid"], result["cost"]))
+    if polish_time is not None:
+        route_pool = RoutePool(model)
+        for result in results:
+            route_pool.update(result.pop("routes"))
+        if best["valid"]:
+            try:
+                solution, cost = polish(model, route_pool, best["solution"], time_limit=polish_time)
+            except ImportError as error:
+                logger.warning("Skipping the polish: %s", error)
+            else:
+                best = dict(best, solution=solution, cost=cost, polish_cost=cost, pool_size=len(route_pool))
+    return best, results
+
+
+def print_results(best, results, total_time):
+    print(f"{'seed':>6} {'initial':>8} {'local':>8} {'tabu':>8} {'valid':>6} {'time (s)':>9}")
+    for result in results:
+        print(f"{result['seed']:>6} {result['initial_cost']:>8} {result['local_cost']:>8} "
+              f"{result['cost']:>8} {str(result['valid']):>6} {result['wall_time']:>9.3f}")
+    if "polish_cost" in best:
+        print(f"\nPolish over {best['pool_size']} routes: cost {best['polish_cost']}")
+    print(f"\nBest: seed {best['seed']}, cost {best['cost']} "
+          f"(total wall time {total_time:.3f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-start FCVRP pipeline on a process pool")
+    parser.add_argument("instance", nargs="?", default="fcvrp_P-n101-k4_10_3_3.txt")
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--starts", type=int, help="Use seeds 0..STARTS-1 instead of --seeds")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tabu-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=600)
+    parser.add_argument("--polish-time", type=float, default=None,
+                        help="Recombine the routes of all starts by set partitioning for at most this many seconds")
+    parser.add_argument("--reoptimize", action="store_true",
+                        help="Re-solve the visiting order of every route a tabu move changes")
+    args = parser.parse_args()
+    configure_logging(logging.INFO)
+
+    model = load_model(args.instance)
+    seeds = range(args.starts) if args.starts else args.seeds
+
+    start = time.perf_counter()
+    best, results = run_multistart(model, seeds, args.workers, args.tabu_size, args.iterations,
+                                   polish_time=args.polish_time, reoptimize=args.reoptimize)
+    print_results(best, results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
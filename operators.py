@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Route improvement operators with don't-look bits.
+
+Operators (all evaluated against a solution_state.Solution):
+    relocate      move one node to any other position, in any route
+    or_opt        move a chain of 2 or 3 consecutive nodes to any other position
+    two_opt       reverse a segment of a route
+    two_opt_star  exchange the tails of two routes
+
+Every operator is evaluated for one anchor node at a time. The delta of a
+single move is O(1): it only depends on the arcs the move removes and adds,
+plus prefix sums for segment reversal and route loads. All moves of one
+anchor are scored at once with NumPy over an edge table of the solution, so
+a node is checked against every insertion point in a single array operation.
+
+descend() runs a first-improvement descent over the anchors with don't-look
+bits: a node whose moves do not improve is not looked at again until one of
+its arcs changes. After a move only the edges and node positions of the
+routes it changed are rebuilt.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+import instrumentation
+
+OPERATORS = ("relocate", "or_opt", "two_opt", "two_opt_star")
+
+# Chain lengths moved by each chain operator
+CHAIN_LENGTHS = {"relocate": (1,), "or_opt": (2, 3)}
+
+_MASKED = np.iinfo(np.int64).max
+
+
+class EdgeTable:
+    """
+    All arcs of a solution as flat arrays, depot arcs included.
+
+    Edge k of a route with nodes a_0 .. a_(m-1) goes from a_(k-1) to a_k, with
+    the depot standing in for a_(-1) and a_m; an empty route has the single
+    edge (0, 0) of cost 0.
+
+    Attributes:
+        u, v: Tail and head node of every edge
+        route: Route index of every edge
+        k: Index of the edge within its route
+        cost: Cost of every edge (0 for the (0, 0) edge of an empty route)
+        load_before: Load of the nodes of the route that come before the edge
+        reversal_before: Cost change of reversing the path a_0 .. a_(k-1)
+                         (always 0 for a symmetric matrix)
+        start: start[r] is the index of the first edge of route r
+    """
+
+    FIELDS = ("u", "v", "route", "k", "load_before", "reversal_before", "cost")
+
+    def __init__(self, state):
+        blocks = [_route_edges(state, route_index) for route_index in range(len(state.routes))]
+        for field, parts in zip(self.FIELDS, zip(*blocks)):
+            setattr(self, field, np.concatenate(parts))
+        self.start = np.concatenate(([0], np.cumsum([len(route) + 1 for route in state.routes])[:-1])).tolist()
+
+    def update(self, state, route_indices):
+        """
+        Rebuild the edges of the given routes after they changed; the edges of the other routes are kept.
+        """
+        # From the last route backwards, so the start of every route still to be replaced stays valid
+        for route_index in sorted(set(route_indices), reverse=True):
+            lo = self.start[route_index]
+            hi = self.start[route_index + 1] if route_index + 1 < len(self.start) else self.u.size
+            block = _route_edges(state, route_index)
+            for field, part in zip(self.FIELDS, block):
+                setattr(self, field, np.concatenate((getattr(self, field)[:lo], part, getattr(self, field)[hi:])))
+            shift = block[0].size - (hi - lo)
+            if shift:
+                for later in range(route_index + 1, len(self.start)):
+                    self.start[later] += shift
+
+
+def _route_edges(state, route_index):
+    """
+    Arrays of the EdgeTable fields for the edges of one route.
+    """
+    costs = state.costs
+    demands = state.demands
+    route = state.routes[route_index]
+    path = [0] + route + [0]
+    load_before, reversal_before = [], []
+    load = 0
+    reversal = 0
+    for k in range(len(route) + 1):
+        load_before.append(load)
+        reversal_before.append(reversal)
+        if k < len(route):
+            load += demands[route[k]]
+            if k > 0:
+                reversal += int(costs[route[k]][route[k - 1]]) - int(costs[route[k - 1]][route[k]])
+    u = np.array(path[:-1], dtype=np.intp)
+    v = np.array(path[1:], dtype=np.intp)
+    cost = np.where(u == v, 0, np.asarray(costs)[u, v]).astype(np.int64)
+    return (u, v, np.full(u.size, route_index, dtype=np.intp), np.arange(u.size, dtype=np.intp),
+            np.array(load_before, dtype=np.int64), np.array(reversal_before, dtype=np.int64), cost)
+
+
+def _arc(costs, a, b):
+    """
+    Cost of arc a -> b, where the depot-to-depot arc of an empty route is free.
+    """
+    return 0 if a == b else int(costs[a][b])
+
+
+def _best(deltas):
+    """
+    Index and value of the most improving entry, or None if nothing improves.
+    """
+    if deltas.size == 0:
+        return None
+    idx = int(np.argmin(deltas))
+    delta = int(deltas[idx])
+    if delta >= 0:
+        return None
+    return idx, delta
+
+
+def _chain_move(state, edges, matrix, route_index, i, length, candidates):
+    """
+    Best insertion of the chain route[i .. i+length-1] at another position.
+    """
+    route = state.routes[route_index]
+    if i + length > len(route):
+        return None
+    costs = state.costs
+    s = route[i]
+    e = route[i + length - 1]
+    p = route[i - 1] if i > 0 else 0
+    n = route[i + length] if i + length < len(route) else 0
+    removal_gain = _arc(costs, p, s) + _arc(costs, e, n) - _arc(costs, p, n)
+    chain_demand = sum(state.demands[node] for node in route[i:i + length])
+
+    deltas = matrix[edges.u, s].astype(np.int64) + matrix[e, edges.v] - edges.cost - removal_gain
+    own = edges.route == route_index
+    # Edges touching the chain disappear once it is removed
+    deltas[own & (edges.k >= i) & (edges.k <= i + length)] = _MASKED
+    loads = np.asarray(state.route_loads, dtype=np.int64)[edges.route]
+    deltas[~own & (loads + chain_demand > state.model.capacity)] = _MASKED
+    if candidates is not None:
+        deltas[~(candidates.is_candidate(edges.u, s) | candidates.is_candidate(e, edges.v))] = _MASKED
+
+    found = _best(deltas)
+    if found is None:
+        return None
+    idx, delta = found
+    target = int(edges.route[idx])
+    k = int(edges.k[idx])
+    u = int(edges.u[idx])
+    v = int(edges.v[idx])
+
+    def apply():
+        chain = route[i:i + length]
+        if target == route_index:
+            rest = route[:i] + route[i + length:]
+            at = k if k < i else k - length
+            state.set_route(route_index, rest[:at] + chain + rest[at:])
+            return (route_index,)
+        other = state.routes[target]
+        state.set_route(route_index, route[:i] + route[i + length:])
+        state.set_route(target, other[:k] + chain + other[k:])
+        return route_index, target
+
+    return delta, apply, (p, s, e, n, u, v)
+
+
+def _relocate(state, edges, matrix, route_index, i, candidates):
+    return _chain_move(state, edges, matrix, route_index, i, 1, candidates)
+
+
+def _or_opt(state, edges, matrix, route_index, i, candidates):
+    best = None
+    for length in CHAIN_LENGTHS["or_opt"]:
+        move = _chain_move(state, edges, matrix, route_index, i, length, candidates)
+        if move is not None and (best is None or move[0] < best[0]):
+            best = move
+    return best
+
+
+def _two_opt(state, edges, matrix, route_index, i, candidates):
+    """
+    Best reversal of a segment route[i .. j], j > i.
+    """
+    route = state.routes[route_index]
+    m = len(route)
+    if i + 1 >= m:
+        return None
+    costs = state.costs
+    a = route[i]
+    p = route[i - 1] if i > 0 else 0
+    first = edges.start[route_index]
+    # Edge k = j + 1 runs from route[j] to the node after the segment
+    ks = slice(first + i + 2, first + m + 1)
+    u = edges.u[ks]
+    v = edges.v[ks]
+
+    deltas = (matrix[p, u].astype(np.int64) + matrix[a, v] - _arc(costs, p, a) - edges.cost[ks]
+              + edges.reversal_before[ks] - edges.reversal_before[first + i + 1])
+    if candidates is not None:
+        deltas[~(candidates.is_candidate(p, u) | candidates.is_candidate(a, v))] = _MASKED
+
+    found = _best(deltas)
+    if found is None:
+        return None
+    idx, delta = found
+    j = i + 1 + idx
+
+    def apply():
+        state.set_route(route_index, route[:i] + route[i:j + 1][::-1] + route[j + 1:])
+        return (route_index,)
+
+    return delta, apply, (p, a, route[j], int(v[idx]))
+
+
+def _two_opt_star(state, edges, matrix, route_index, i, candidates):
+    """
+    Best exchange of the tail after route[i] with the tail of another route.
+    """
+    route = state.routes[route_index]
+    costs = state.costs
+    x = route[i]
+    x_next = route[i + 1] if i + 1 < len(route) else 0
+    first = edges.start[route_index]
+    head_load = int(edges.load_before[first + i + 1])
+    tail_load = state.route_loads[route_index] - head_load
+
+    added = matrix[edges.u, x_next].astype(np.int64)
+    if x_next == 0:
+        added[edges.u == 0] = 0  # The other route ends up empty
+    deltas = matrix[x, edges.v] + added - _arc(costs, x, x_next) - edges.cost
+    # Exchanging two empty tails changes nothing
+    if x_next == 0:
+        deltas[edges.v == 0] = _MASKED
+    other_loads = np.asarray(state.route_loads, dtype=np.int64)[edges.route] - edges.load_before
+    capacity = state.model.capacity
+    deltas[(edges.route == route_index)
+           | (head_load + other_loads > capacity)
+           | (edges.load_before + tail_load > capacity)] = _MASKED
+    if candidates is not None:
+        deltas[~(candidates.is_candidate(x, edges.v) | candidates.is_candidate(edges.u, x_next))] = _MASKED
+
+    found = _best(deltas)
+    if found is None:
+        return None
+    idx, delta = found
+    target = int(edges.route[idx])
+    k = int(edges.k[idx])
+
+    def apply():
+        other = state.routes[target]
+        new_route = route[:i + 1] + other[k:]
+        new_other = other[:k] + route[i + 1:]
+        state.set_route(route_index, new_route)
+        state.set_route(target, new_other)
+        return route_index, target
+
+    return delta, apply, (x, x_next, int(edges.u[idx]), int(edges.v[idx]))
+
+
+EVALUATORS = {
+    "relocate": _relocate,
+    "or_opt": _or_opt,
+    "two_opt": _two_opt,
+    "two_opt_star": _two_opt_star,
+}
+
+
+def descend(state, operators=OPERATORS, candidates=None, max_moves=None, deadline=None):
+    """
+    First-improvement descent over the given operators with don't-look bits.
+
+    Anchors are processed from a queue of nodes whose don't-look bit is off.
+    For each anchor the operators are tried in order and the best improving
+    move of the first operator that has one is applied; the nodes at the ends
+    of every changed arc get their bit cleared and are queued again.
+
+    Args:
+        state: solution_state.Solution, changed in place
+        operators: Names from OPERATORS, in the order they are tried
+        candidates: Optional candidates.CandidateLists restricting the moves
+                    to those that create at least one candidate arc
+        max_moves: Optional limit on the number of applied moves
+        deadline: Optional time.perf_counter() value after which the descent
+                  stops, keeping the moves applied so far
+
+    Returns:
+        The change of the total cost (0 or negative)
+    """
+    unknown = set(operators) - set(EVALUATORS)
+    if unknown:
+        raise ValueError(f"Unknown operators: {sorted(unknown)}")
+
+    matrix = np.asarray(state.costs)
+    # Counter names are built once; with instrumentation off count() returns immediately
+    evaluators = [(f"descend.{name}", EVALUATORS[name]) for name in operators]
+    queue = deque(node for route in state.routes for node in route)
+    queued = set(queue)
+    total = 0
+    moves = 0
+    edges = EdgeTable(state)
+    position = _positions(state)
+
+    while queue and (max_moves is None or moves < max_moves):
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        node = queue.popleft()
+        queued.discard(node)
+        if node not in position:
+            continue
+        route_index, i = position[node]
+
+        for counter, evaluate in evaluators:
+            instrumentation.count(counter)
+            move = evaluate(state, edges, matrix, route_index, i, candidates)
+            if move is not None:
+                break
+        else:
+            continue  # Don't-look bit stays on until a neighbouring arc changes
+
+        delta, apply, touched = move
+        changed = apply()
+        total += delta
+        moves += 1
+        with instrumentation.phase("descend.edge_table"):
+            edges.update(state, changed)
+            for route_index in changed:
+                position.update(_route_positions(state, route_index))
+        for other in (node,) + touched:
+            if other != 0 and other not in queued:
+                queue.append(other)
+                queued.add(other)
+
+    return total
+
+
+def _positions(state):
+    position = {}
+    for route_index in range(len(state.routes)):
+        position.update(_route_positions(state, route_index))
+    return position
+
+
+def _route_positions(state, route_index):
+    return {node: (route_index, i) for i, node in enumerate(state.routes[route_index])}
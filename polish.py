@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Set-partitioning polish over a pool of routes.
+
+The searches visit many more good routes than end up in their final
+solution. RoutePool collects every distinct capacity-feasible route that
+local_search and tabu_search pass through (and, merged, those of several
+multi-start runs), and polish() picks the cheapest combination of pooled
+routes by solving
+
+    min   sum_r cost_r x_r
+    s.t.  sum_{r visits v} x_r <= 1                     for every customer v
+          sum_r visits_f(r) x_r >= required_visits_f    for every family f
+          sum_r x_r <= vehicles
+          x_r binary
+
+with an open-source MIP solver: PuLP with its bundled CBC, or the OR-Tools
+CP-SAT solver. Both are optional dependencies (pip install pulp, or pip
+install ortools); without either, polish() raises ImportError and the
+callers keep the unpolished solution.
+"""
+import importlib.util
+import logging
+import time
+
+from route_cache import RouteCache
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("pulp", "ortools")
+
+
+class RoutePool:
+    """
+    Distinct capacity-feasible routes, keyed by their Zobrist route hash.
+
+    Attributes:
+        route_cache: route_cache.RouteCache that hashes and scores the routes
+        routes: Dictionary of route hash -> route (tuple of node IDs, depot excluded)
+        max_routes: Optional bound on the pool size; once it is reached other routes are not added,
+                    but the incumbent's routes are (see set_incumbent)
+        incumbent: Hashes of the routes of the incumbent, which are never evicted
+    """
+
+    def __init__(self, model, costs=None, route_cache=None, max_routes=None):
+        self.route_cache = route_cache if route_cache is not None else RouteCache(model, costs)
+        self.capacity = model.capacity
+        self.max_routes = max_routes
+        self.routes = {}
+        self.incumbent = set()
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __iter__(self):
+        return iter(self.routes.values())
+
+    def add(self, route, route_hash=None, evict=False):
+        """
+        Add one route (list of node IDs, depot excluded) unless it is empty, overloaded or already pooled.
+
+        Args:
+            route: The route
+            route_hash: Zobrist hash of the route if the caller maintains it
+            evict: In a full pool, make room by dropping the oldest route that is not the incumbent's,
+                   or add the route anyway if there is none
+        """
+        if not route:
+            return
+        if route_hash is None:
+            route_hash = self.route_cache.hasher.route_hash(route)
+        if route_hash in self.routes:
+            return
+        if self.max_routes is not None and len(self.routes) >= self.max_routes:
+            if not evict:
+                return
+            victim = next((old for old in self.routes if old not in self.incumbent), None)
+            # A pool holding only incumbent routes grows past max_routes rather than drop one of them
+            if victim is not None:
+                del self.routes[victim]
+        if self.route_cache.lookup(route, route_hash).load <= self.capacity:
+            self.routes[route_hash] = tuple(route)
+
+    def set_incumbent(self, solution):
+        """
+        Make solution the incumbent: its routes are added even to a full pool and are not evicted.
+        """
+        hasher = self.route_cache.hasher
+        self.incumbent = {hasher.route_hash(route) for route in solution if route}
+        for route in solution:
+            self.add(route, evict=True)
+
+    def add_solution(self, solution):
+        for route in solution:
+            self.add(route)
+
+    def update(self, routes):
+        """
+        Add routes from another pool or any iterable of routes, e.g. the pools of other processes.
+        """
+        for route in routes:
+            self.add(list(route))
+
+
+def available_backends():
+    """
+    The installed solver backends, in order of preference.
+    """
+    return [backend for backend in BACKENDS if importlib.util.find_spec(backend) is not None]
+
+
+def _partitioning_data(model, pool):
+    """
+    Routes, costs, node incidence and family visits of the set-partitioning model.
+    """
+    routes = list(pool)
+    infos = [pool.route_cache.lookup(list(route)) for route in routes]
+    node_routes = {}
+    for index, route in enumerate(routes):
+        for node in route:
+            node_routes.setdefault(node, []).append(index)
+    family_routes = [[] for _ in range(model.num_fam)]
+    for index, info in enumerate(infos):
+        for family, visits in info.families:
+            family_routes[family].append((index, visits))
+    return routes, [info.cost for info in infos], node_routes, family_routes
+
+
+def _solve_pulp(model, costs, node_routes, family_routes, incumbent, time_limit):
+    import pulp
+
+    problem = pulp.LpProblem("fcvrp_polish", pulp.LpMinimize)
+    x = [pulp.LpVariable(f"r{index}", cat=pulp.LpBinary) for index in range(len(costs))]
+    problem += pulp.lpSum(cost * var for cost, var in zip(costs, x))
+    for indices in node_routes.values():
+        if len(indices) > 1:
+            problem += pulp.lpSum(x[index] for index in indices) <= 1
+    for family, pairs in enumerate(family_routes):
+        problem += pulp.lpSum(visits * x[index] for index, visits in pairs) >= model.fam_req[family]
+    problem += pulp.lpSum(x) <= model.vehicles
+    for index, var in enumerate(x):
+        var.setInitialValue(1 if index in incumbent else 0)
+
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, warmStart=True)
+    problem.solve(solver)
+    if problem.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        return None
+    return [index for index, var in enumerate(x) if var.value() is not None and var.value() > 0.5]
+
+
+def _solve_ortools(model, costs, node_routes, family_routes, incumbent, time_limit):
+    from ortools.sat.python import cp_model
+
+    problem = cp_model.CpModel()
+    x = [problem.NewBoolVar(f"r{index}") for index in range(len(costs))]
+    problem.Minimize(sum(int(cost) * var for cost, var in zip(costs, x)))
+    for indices in node_routes.values():
+        if len(indices) > 1:
+            problem.Add(sum(x[index] for index in indices) <= 1)
+    for family, pairs in enumerate(family_routes):
+        problem.Add(sum(visits * x[index] for index, visits in pairs) >= model.fam_req[family])
+    problem.Add(sum(x) <= model.vehicles)
+    for index, var in enumerate(x):
+        problem.AddHint(var, index in incumbent)
+
+    solver = cp_model.CpSolver()
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(problem)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return [index for index, var in enumerate(x) if solver.Value(var)]
+
+
+def polish(model, pool, incumbent, time_limit=None, backend=None):
+    """
+    Recombine the pooled routes into the cheapest solution the solver finds.
+
+    Args:
+        model: The problem model
+        pool: RoutePool with the candidate routes; the incumbent's routes are added to it
+        incumbent: Current best solution (list of routes), the warm start of the solver
+        time_limit: Optional time limit of the solver in seconds
+        backend: "pulp" or "ortools" (default: the first installed one of BACKENDS)
+
+    Returns:
+        (solution, cost): The polished solution, or the incumbent if the solver finds nothing cheaper
+
+    Raises:
+        ImportError: if neither PuLP nor OR-Tools is installed
+    """
+    if backend is None:
+        backends = available_backends()
+        if not backends:
+            raise ImportError("polish needs PuLP (pip install pulp) or OR-Tools (pip install ortools)")
+        backend = backends[0]
+    elif backend not in BACKENDS:
+        raise ValueError(f"polish: unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    # The incumbent's routes are the warm start and the fallback, so they are admitted even to a full pool
+    pool.set_incumbent(incumbent)
+    incumbent_cost = pool.route_cache.total_cost(incumbent)
+    routes, costs, node_routes, family_routes = _partitioning_data(model, pool)
+    position = {route_hash: index for index, route_hash in enumerate(pool.routes)}
+    warm_start = {position[route_hash] for route_hash in pool.incumbent if route_hash in position}
+
+    start = time.perf_counter()
+    solve_pool = _solve_pulp if backend == "pulp" else _solve_ortools
+    selected = solve_pool(model, costs, node_routes, family_routes, warm_start, time_limit)
+    logger.info("Polished %s pooled routes with %s in %.2f s", len(routes), backend, time.perf_counter() - start)
+    if selected is None:
+        return [route[:] for route in incumbent], incumbent_cost
+
+    cost = sum(costs[index] for index in selected)
+    if cost >= incumbent_cost:
+        return [route[:] for route in incumbent], incumbent_cost
+    logger.info("Polish improved the cost from %s to %s", incumbent_cost, cost)
+    solution = [list(routes[index]) for index in selected]
+    # Keep the incumbent's number of (possibly empty) vehicle routes
+    solution += [[] for _ in range(len(incumbent) - len(solution))]
+    return solution, cost
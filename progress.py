@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Logging setup and rate-limited, structured progress reports.
+
+The library modules only log through the logging module and never
+configure it, so a program that does not call configure_logging() sees
+warnings and errors only. Per-node trace output of the construction
+heuristic is logged at DEBUG, progress reports at INFO.
+
+Progress reports go to the "fcvrp.progress" logger as one record per
+report. With configure_logging(json_lines=True) every record is written as
+one JSON object per line, with the fields of the report at the top level:
+
+    {"time": 1760750000.1, "level": "INFO", "logger": "fcvrp.progress",
+     "message": "tabu: elapsed=1.52 cost=574 updates=4", "stage": "tabu", "elapsed": 1.52,
+     "cost": 574, "updates": 4}
+"""
+import json
+import logging
+import sys
+import time
+
+PROGRESS_LOGGER = "fcvrp.progress"
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats every record as a single line of JSON.
+
+    Fields passed as extra={"fields": {...}} are merged into the object.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=logging.WARNING, json_lines=False, stream=None):
+    """
+    Send the log records of every module to one stream handler.
+
+    Args:
+        level: Lowest level that is written (logging.DEBUG shows every placed node)
+        json_lines: Write JSON lines instead of plain text
+        stream: Output stream (default: sys.stderr)
+
+    Returns:
+        The installed handler
+    """
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter("%(message)s"))
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress reports of one stage.
+
+    update() may be called as often as the caller likes: it returns at once
+    when INFO is disabled for the progress logger, and otherwise logs at
+    most one report every min_interval seconds. finish() always logs the
+    last state. An instance can be passed directly as the on_improvement
+    callback of the searches.
+
+    Attributes:
+        stage: Name of the stage, e.g. "construction" or "tabu"
+        min_interval: Minimum number of seconds between two reports
+        updates: Number of update() calls so far
+        fields: Fields of the latest update
+    """
+
+    def __init__(self, stage, min_interval=1.0, logger=None):
+        self.stage = stage
+        self.min_interval = min_interval
+        self.logger = logger if logger is not None else logging.getLogger(PROGRESS_LOGGER)
+        self.enabled = self.logger.isEnabledFor(logging.INFO)
+        self.started = time.perf_counter()
+        self.last_report = None
+        self.updates = 0
+        self.fields = {}
+
+    def update(self, **fields):
+        if not self.enabled:
+            return
+        self.updates += 1
+        self.fields = fields
+        now = time.perf_counter()
+        if self.last_report is None or now - self.last_report >= self.min_interval:
+            self._report(now)
+
+    def finish(self, **fields):
+        if not self.enabled:
+            return
+        if fields:
+            self.fields = fields
+        self._report(time.perf_counter(), done=True)
+
+    def __call__(self, solution, cost):
+        # on_improvement callback: never asks the search to stop
+        self.update(cost=cost)
+        return False
+
+    def _report(self, now, done=False):
+        self.last_report = now
+        report = {"stage": self.stage, "elapsed": round(now - self.started, 6), **self.fields,
+                  "updates": self.updates}
+        if done:
+            report["done"] = True
+        summary = " ".join(f"{key}={value}" for key, value in report.items() if key != "stage")
+        self.logger.info("%s: %s", self.stage, summary, extra={"fields": report})
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Canonical route hashing and a bounded route cache.
+
+A route is hashed Zobrist-style as the XOR of one 64-bit key per arc, the
+arcs from and back to the depot included. Changing a route by a move
+replaces a few arcs, so its hash is updated in O(1) by XOR-ing the keys of
+the removed and added arcs out and in. A solution hashes to the XOR of its
+route hashes, which does not depend on the order of the routes: two
+solutions that visit the same sequences hash equally whichever vehicle
+drives which route.
+
+RouteCache memoises the cost, load and family visits of a route by its
+hash in a least recently used dictionary of bounded size. SeenSolutions is
+a bounded set of solution hashes, used by the tabu search to avoid
+returning to solutions it has already visited.
+"""
+import random
+from collections import OrderedDict, namedtuple
+
+MASK = (1 << 64) - 1
+
+RouteInfo = namedtuple("RouteInfo", ["cost", "load", "families"])
+RouteInfo.__doc__ = """
+Cached data of one route.
+
+Attributes:
+    cost: Route cost, depot arcs included
+    load: Sum of the demands
+    families: Tuple of (family_id, visits) pairs, in increasing family id order
+"""
+
+
+def _mix(x):
+    # splitmix64 finalizer: every input bit affects every output bit
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+class ZobristHasher:
+    """
+    64-bit hashes of routes as the XOR of their arc keys.
+
+    Attributes:
+        out_keys, in_keys: Random keys per node; the key of arc (a, b) mixes out_keys[a] and in_keys[b]
+    """
+
+    def __init__(self, num_nodes, seed=0):
+        """
+        Args:
+            num_nodes: Number of customers (node ids 0..num_nodes)
+            seed: Seed of the keys; hashes are comparable only between hashers with the same seed
+        """
+        rng = random.Random(seed)
+        self.out_keys = [rng.getrandbits(64) for _ in range(num_nodes + 1)]
+        self.in_keys = [rng.getrandbits(64) for _ in range(num_nodes + 1)]
+
+    def arc(self, a, b):
+        return _mix(self.out_keys[a] ^ self.in_keys[b])
+
+    def route_hash(self, route):
+        """
+        Hash of a route (node IDs, depot excluded); the empty route hashes to 0.
+        """
+        if not route:
+            return 0
+        arc = self.arc
+        value = arc(0, route[0]) ^ arc(route[-1], 0)
+        for i in range(len(route) - 1):
+            value ^= arc(route[i], route[i + 1])
+        return value
+
+    def solution_hash(self, routes):
+        value = 0
+        for route in routes:
+            value ^= self.route_hash(route)
+        return value
+
+    def replace_delta(self, route, idx, new_node):
+        """
+        XOR that turns the hash of route into the hash of route with route[idx] replaced by new_node.
+        """
+        prev_node = route[idx - 1] if idx > 0 else 0
+        next_node = route[idx + 1] if idx + 1 < len(route) else 0
+        old_node = route[idx]
+        arc = self.arc
+        return (arc(prev_node, old_node) ^ arc(old_node, next_node)
+                ^ arc(prev_node, new_node) ^ arc(new_node, next_node))
+
+    def remove_delta(self, route, idx):
+        """
+        XOR that turns the hash of route into the hash of route without route[idx].
+        """
+        prev_node = route[idx - 1] if idx > 0 else 0
+        next_node = route[idx + 1] if idx + 1 < len(route) else 0
+        node = route[idx]
+        arc = self.arc
+        # A route that becomes empty hashes to 0 and has no depot-to-depot arc
+        bridge = arc(prev_node, next_node) if len(route) > 1 else 0
+        return arc(prev_node, node) ^ arc(node, next_node) ^ bridge
+
+    def insert_delta(self, route, position, node):
+        """
+        XOR that turns the hash of route into the hash of route with node inserted at position.
+        """
+        prev_node = route[position - 1] if position > 0 else 0
+        next_node = route[position] if position < len(route) else 0
+        arc = self.arc
+        bridge = arc(prev_node, next_node) if route else 0
+        return arc(prev_node, node) ^ arc(node, next_node) ^ bridge
+
+
+class RouteCache:
+    """
+    Least recently used cache of route cost, load and family visits, keyed by route hash.
+
+    Attributes:
+        hasher: ZobristHasher of the cache
+        max_routes: Number of routes kept; the least recently used one is dropped first
+        routes: OrderedDict of route hash -> RouteInfo, most recently used last
+        hits, misses: Lookup counts
+    """
+
+    def __init__(self, model, costs=None, max_routes=1 << 16, seed=0):
+        """
+        Args:
+            model: The problem model
+            costs: Cost matrix of the cached costs (default: model.cost_matrix)
+            max_routes: Bound on the number of cached routes
+            seed: Seed of the Zobrist keys
+        """
+        self.costs = model.cost_matrix if costs is None else costs
+        self.demands = [node.demand for node in model.nodes]
+        self.node_family = [node.family for node in model.nodes]
+        self.hasher = ZobristHasher(model.num_nodes, seed)
+        self.max_routes = max_routes
+        self.routes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, route, route_hash=None):
+        """
+        RouteInfo of a route, computed on the first lookup of its hash.
+
+        Args:
+            route: List of node IDs (depot excluded)
+            route_hash: Hash of the route if the caller maintains it; computed otherwise
+        """
+        if route_hash is None:
+            route_hash = self.hasher.route_hash(route)
+        info = self.routes.get(route_hash)
+        if info is not None:
+            self.hits += 1
+            self.routes.move_to_end(route_hash)
+            return info
+        self.misses += 1
+        info = self._compute(route)
+        self.routes[route_hash] = info
+        if len(self.routes) > self.max_routes:
+            self.routes.popitem(last=False)
+        return info
+
+    def _compute(self, route):
+        if not route:
+            return RouteInfo(0, 0, ())
+        costs = self.costs
+        # int() per arc: a memory-mapped matrix may be int16 and overflow when summed
+        cost = int(costs[0][route[0]]) + int(costs[route[-1]][0])
+        for i in range(len(route) - 1):
+            cost += int(costs[route[i]][route[i + 1]])
+        families = {}
+        for node in route:
+            family = self.node_family[node]
+            families[family] = families.get(family, 0) + 1
+        return RouteInfo(cost, sum(self.demands[node] for node in route), tuple(sorted(families.items())))
+
+    def total_cost(self, solution):
+        """
+        Cost of a list of routes from the cached route costs.
+        """
+        return sum(self.lookup(route).cost for route in solution if route)
+
+
+class SeenSolutions:
+    """
+    Bounded set of solution hashes; the oldest hash is forgotten first.
+
+    Attributes:
+        max_size: Number of hashes kept
+    """
+
+    def __init__(self, max_size=1 << 18):
+        self.max_size = max_size
+        self.hashes = OrderedDict()
+
+    def __contains__(self, solution_hash):
+        return solution_hash in self.hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, solution_hash):
+        self.hashes[solution_hash] = None
+        self.hashes.move_to_end(solution_hash)
+        if len(self.hashes) > self.max_size:
+            self.hashes.popitem(last=False)
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Per-route TSP re-optimisation with a memo keyed by the route's node set.
+
+The inter-route moves of the searches decide which nodes a vehicle visits
+but leave the visiting order to whatever the moves produced. RouteOptimizer
+re-solves the order of one route from the depot through its nodes and back:
+
+    up to EXACT_SIZE nodes  exact Held-Karp dynamic programming, vectorised
+                            over the subsets of each size with NumPy
+    longer routes           best-improvement descent over 2-opt and Or-opt
+                            (chains of 1 to 3 nodes, in both orientations),
+                            every neighbourhood scored in one array operation
+
+Results are memoised by frozenset of the nodes in a least recently used
+dictionary, so a node set that comes back in a later iteration, or in
+another start sharing the optimizer, is not solved again. For long routes
+the memo keeps the best order found so far, and a route that arrives
+already cheaper than it replaces the memo entry.
+"""
+import functools
+from collections import OrderedDict
+
+import numpy as np
+
+# Routes with at most this many nodes are solved exactly (2^n * n DP states)
+EXACT_SIZE = 12
+
+# Chain lengths moved by the Or-opt step of the descent
+OR_OPT_LENGTHS = (1, 2, 3)
+
+
+@functools.lru_cache(maxsize=None)
+def _subset_layers(size):
+    """
+    For every subset size, the bit masks of that size over size nodes.
+    """
+    masks = np.arange(1 << size)
+    popcount = np.zeros(masks.size, dtype=np.intp)
+    for bit in range(size):
+        popcount += (masks >> bit) & 1
+    return [masks[popcount == count] for count in range(size + 1)]
+
+
+def path_cost(matrix, route):
+    """
+    Cost of depot -> route -> depot; 0 for an empty route, which uses no vehicle.
+    """
+    if len(route) == 0:
+        return 0
+    path = np.array([0] + list(route) + [0], dtype=np.intp)
+    return int(np.asarray(matrix[path[:-1], path[1:]], dtype=np.int64).sum())
+
+
+def held_karp(matrix, route):
+    """
+    Optimal visiting order of the nodes of a route, by Held-Karp dynamic programming.
+
+    Args:
+        matrix: Cost matrix (any array indexable by node IDs)
+        route: List of node IDs (depot excluded), at most about EXACT_SIZE of them
+
+    Returns:
+        (order, cost): The optimal route and its cost
+    """
+    size = len(route)
+    if size == 0:
+        return [], 0
+    index = np.array([0] + list(route), dtype=np.intp)
+    costs = np.asarray(matrix[np.ix_(index, index)], dtype=np.float64)
+    # dp[mask, j]: cheapest path from the depot through the nodes of mask, ending at node j of mask
+    dp = np.full((1 << size, size), np.inf)
+    parent = np.full((1 << size, size), -1, dtype=np.int8)
+    nodes = np.arange(size)
+    dp[1 << nodes, nodes] = costs[0, 1:]
+    into = costs[1:, 1:]
+
+    for layer in _subset_layers(size)[2:]:
+        for j in range(size):
+            masks = layer[(layer >> j) & 1 == 1]
+            # dp[prev, j] is inf because j is not in prev, so j never precedes itself
+            candidates = dp[masks ^ (1 << j)] + into[:, j]
+            best = candidates.argmin(axis=1)
+            dp[masks, j] = candidates[np.arange(masks.size), best]
+            parent[masks, j] = best
+
+    full = (1 << size) - 1
+    closing = dp[full] + costs[1:, 0]
+    last = int(closing.argmin())
+    cost = int(round(closing[last]))
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(route[last])
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    order.reverse()
+    return order, cost
+
+
+def _best_two_opt(matrix, path):
+    """
+    Best 2-opt move (reversal of path[i..j]) as (delta, i, j), or None for routes too short.
+    """
+    m = len(path)
+    if m < 4:
+        return None
+    forward = matrix[path[:-1], path[1:]]
+    # Reversing a segment also reverses its inner arcs, which matters for asymmetric costs
+    reversal = np.concatenate(([0.0], np.cumsum(matrix[path[1:], path[:-1]] - forward)))
+    i, j = np.triu_indices(m - 2, k=1)
+    i += 1
+    j += 1
+    deltas = (matrix[path[i - 1], path[j]] + matrix[path[i], path[j + 1]]
+              - forward[i - 1] - forward[j] + reversal[j] - reversal[i])
+    best = int(deltas.argmin())
+    return float(deltas[best]), int(i[best]), int(j[best])
+
+
+def _best_or_opt(matrix, path, length):
+    """
+    Best move of a chain of length nodes to another arc, in either orientation,
+    as (delta, start, arc, reverse) or None.
+    """
+    m = len(path)
+    count = m - 2 - length + 1  # Chains path[s .. s+length-1] with 1 <= s
+    if count < 1 or m - 1 - length < 2:
+        return None
+    forward = matrix[path[:-1], path[1:]]
+    starts = np.arange(1, count + 1)
+    ends = starts + length - 1
+    first = path[starts]
+    last = path[ends]
+    removed = forward[starts - 1] + forward[ends] - matrix[path[starts - 1], path[ends + 1]]
+    inner = np.zeros(count)
+    inner_reversed = np.zeros(count)
+    for offset in range(length - 1):
+        a = path[starts + offset]
+        b = path[starts + offset + 1]
+        inner += matrix[a, b]
+        inner_reversed += matrix[b, a]
+
+    arcs = np.arange(m - 1)  # Arc k goes from path[k] to path[k + 1]
+    tails = path[arcs]
+    heads = path[arcs + 1]
+    # Arcs inside the chain or next to it are not insertion points
+    valid = (arcs[None, :] < starts[:, None] - 1) | (arcs[None, :] > ends[:, None])
+    plain = (matrix[tails[None, :], first[:, None]] + matrix[last[:, None], heads[None, :]]
+             - forward[None, :] - removed[:, None])
+    flipped = (matrix[tails[None, :], last[:, None]] + matrix[first[:, None], heads[None, :]]
+               - forward[None, :] - removed[:, None] + (inner_reversed - inner)[:, None])
+    plain = np.where(valid, plain, np.inf)
+    flipped = np.where(valid, flipped, np.inf)
+    best_plain = int(plain.argmin())
+    best_flipped = int(flipped.argmin())
+    if plain.flat[best_plain] <= flipped.flat[best_flipped]:
+        s, k = divmod(best_plain, m - 1)
+        return float(plain.flat[best_plain]), int(starts[s]), k, False
+    s, k = divmod(best_flipped, m - 1)
+    return float(flipped.flat[best_flipped]), int(starts[s]), k, True
+
+
+def improve_route(matrix, route, max_moves=None):
+    """
+    Best-improvement descent over 2-opt and Or-opt moves on one route.
+
+    Args:
+        matrix: Cost matrix (any array indexable by node IDs)
+        route: List of node IDs (depot excluded)
+        max_moves: Optional limit on the number of applied moves
+
+    Returns:
+        (order, cost): The improved route and its cost
+    """
+    # The descent runs on the route's own float matrix, depot first, in local node indices
+    index = np.array([0] + list(route), dtype=np.intp)
+    matrix = np.asarray(matrix[np.ix_(index, index)], dtype=np.float64)
+    path = np.concatenate(([0], np.arange(1, index.size), [0]))
+    moves = 0
+    while max_moves is None or moves < max_moves:
+        best = _best_two_opt(matrix, path)
+        best_kind = "two_opt"
+        for length in OR_OPT_LENGTHS:
+            move = _best_or_opt(matrix, path, length)
+            if move is not None and (best is None or move[0] < best[0]):
+                best, best_kind = move, length
+        if best is None or best[0] > -1e-9:
+            break
+        if best_kind == "two_opt":
+            _, i, j = best
+            path[i:j + 1] = path[i:j + 1][::-1].copy()
+        else:
+            _, start, arc, reverse = best
+            chain = path[start:start + best_kind]
+            if reverse:
+                chain = chain[::-1]
+            rest = np.concatenate((path[:start], path[start + best_kind:]))
+            # Arcs after the chain move back by its length once it is taken out
+            at = arc + 1 if arc < start else arc + 1 - best_kind
+            path = np.concatenate((rest[:at], chain, rest[at:]))
+        moves += 1
+    return index[path[1:-1]].tolist(), path_cost(matrix, path[1:-1])
+
+
+class RouteOptimizer:
+    """
+    Memoised re-optimisation of the visiting order of single routes.
+
+    Attributes:
+        matrix: The cost matrix
+        exact_size: Routes with at most this many nodes are solved by Held-Karp
+        max_sets: Number of node sets kept in the memo; the least recently used one is dropped first
+        memo: OrderedDict of frozenset of nodes -> (order tuple, cost, exact)
+        hits, exact, heuristic: Memo hits and number of exact / heuristic solves
+    """
+
+    def __init__(self, costs, exact_size=EXACT_SIZE, max_sets=1 << 16):
+        self.matrix = np.asarray(costs)
+        self.exact_size = exact_size
+        self.max_sets = max_sets
+        self.memo = OrderedDict()
+        self.hits = 0
+        self.exact = 0
+        self.heuristic = 0
+
+    def _store(self, key, order, cost, exact):
+        self.memo[key] = (tuple(order), cost, exact)
+        self.memo.move_to_end(key)
+        if len(self.memo) > self.max_sets:
+            self.memo.popitem(last=False)
+
+    def optimize(self, route):
+        """
+        Cheapest known visiting order of the nodes of a route.
+
+        Args:
+            route: List of node IDs (depot excluded)
+
+        Returns:
+            (order, cost): A route over the same nodes and its cost; never more expensive than route
+        """
+        cost = path_cost(self.matrix, route)
+        if len(route) < 3:
+            # One order, or two that only differ on an asymmetric matrix
+            if len(route) == 2:
+                reverse_cost = path_cost(self.matrix, route[::-1])
+                if reverse_cost < cost:
+                    return route[::-1], reverse_cost
+            return list(route), cost
+        key = frozenset(route)
+        cached = self.memo.get(key)
+        if cached is not None:
+            self.hits += 1
+            self.memo.move_to_end(key)
+            order, best_cost, exact = cached
+            if best_cost <= cost:
+                return list(order), best_cost
+            # A heuristic entry beaten by the route itself: keep the better order
+            self._store(key, route, cost, exact)
+            return list(route), cost
+
+        if len(route) <= self.exact_size:
+            self.exact += 1
+            order, best_cost = held_karp(self.matrix, route)
+            exact = True
+        else:
+            self.heuristic += 1
+            order, best_cost = improve_route(self.matrix, route)
+            exact = False
+        if best_cost >= cost:
+            order, best_cost = list(route), cost
+        self._store(key, order, best_cost, exact)
+        return order, best_cost
+
+    def restore_memo(self, entries):
+        """
+        Replace the memo by (order, cost, exact) entries, least recently used first, e.g. from a checkpoint.
+        """
+        self.memo.clear()
+        for order, cost, exact in entries:
+            self._store(frozenset(order), order, cost, exact)
+
+    def optimize_route(self, state, route_index):
+        """
+        Re-optimise one route of a solution_state.Solution in place.
+
+        Returns:
+            The change of the total cost (0 or negative)
+        """
+        route = state.routes[route_index]
+        order, cost = self.optimize(route)
+        delta = cost - state.route_costs[route_index]
+        if delta >= 0:
+            return 0
+        state.set_route(route_index, order)
+        return delta
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio solve service.
+
+Serves the fcvrp.solve pipeline over HTTP/1.1, on a TCP port or a local
+Unix socket. A request posts an instance in the load_model format and gets
+back the solution, its cost and the SolutionValidator.validate_solution
+report as JSON:
+
+    POST /solve?deadline=10&seed=4      body: the instance file
+    GET  /health
+
+Query parameters of /solve:
+    deadline        seconds until the response is due (default: --deadline)
+    seed            seed of the tabu search (default 0, so repeated solves agree)
+    tabu_size       average tabu tenure (default 50)
+    max_iterations  tabu search iterations (default 600)
+    patience        tabu iterations without improvement before stopping
+    time_limit      search time limit; capped so the answer meets the deadline
+    target_gap      stop once the cost is this close to the lower bound (e.g. 0.05);
+                    the response then carries lower_bound and gap
+
+Instances are identified by the hash of their contents. A payload is
+written once to the spool directory. Every worker process keeps the models
+it has parsed in an LRU ModelCache keyed by that hash, so a repeated
+instance is parsed once per worker, and large payloads (--mmap-bytes) are
+memory-mapped and shared by all workers through the page cache.
+
+Solves run on a process pool, so the event loop keeps accepting
+connections. Concurrent requests for the same instance and parameters are
+batched: they wait for one shared solve instead of each starting their
+own. Every request waits at most until its own deadline and then gets a
+504; the shared solve goes on for the other requests of its batch.
+
+Example:
+    python service.py --port 8080
+    curl --data-binary @fcvrp_P-n101-k4_10_3_3.txt 'http://127.0.0.1:8080/solve?deadline=5'
+
+    python service.py --unix /tmp/fcvrp.sock
+    curl --unix-socket /tmp/fcvrp.sock --data-binary @fcvrp_P-n101-k4_10_3_3.txt http://localhost/solve
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qsl, urlsplit
+
+from Parser import load_model
+from SolutionValidator import validate_solution
+from fcvrp import solve
+from progress import PROGRESS_LOGGER, configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Query parameters of /solve and their types; every one but deadline is passed on to the solve
+SOLVE_PARAMETERS = {
+    "seed": int,
+    "tabu_size": int,
+    "max_iterations": int,
+    "patience": int,
+    "time_limit": float,
+    "target_gap": float,
+}
+
+# Seed of the tabu search when the request gives none
+DEFAULT_SEED = 0
+
+# Share of the deadline kept back for the pool hand-off, validation and the response
+DEADLINE_MARGIN = 0.1
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 504: "Gateway Timeout"}
+
+# Parsed models of a worker process, set by _init_worker
+_worker_models = None
+
+
+class RequestError(Exception):
+    """
+    A request that cannot be served, with the HTTP status to answer with.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ModelCache:
+    """
+    Least recently used cache of parsed models, keyed by content hash.
+
+    Attributes:
+        max_models: Number of models kept; the least recently used one is dropped first
+        models: OrderedDict of digest -> Model, most recently used last
+        hits, misses: Lookup counts
+    """
+
+    def __init__(self, max_models=8):
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest, file_name, mmap=False):
+        """
+        The model of an instance file, parsed on the first request for its digest.
+        """
+        model = self.models.get(digest)
+        if model is not None:
+            self.hits += 1
+            self.models.move_to_end(digest)
+            return model
+        self.misses += 1
+        model = load_model(file_name, mmap=mmap)
+        self.models[digest] = model
+        if len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+        return model
+
+
+def _init_worker(max_models):
+    global _worker_models
+    _worker_models = ModelCache(max_models)
+    # Progress reports of concurrent solves would interleave in the service log
+    logging.getLogger(PROGRESS_LOGGER).setLevel(logging.WARNING)
+
+
+def solve_instance(digest, file_name, mmap, parameters):
+    """
+    Solve and validate one spooled instance in a worker process.
+
+    Returns:
+        Dictionary with the digest, the routes (depot at both ends), the
+        cost, the validity flag, the validate_solution report and the solve
+        time in seconds
+    """
+    started = time.perf_counter()
+    model = _worker_models.get(digest, file_name, mmap)
+    parameters = dict(parameters)
+    result = solve(model, time_limit=parameters.pop("time_limit", None), patience=parameters.pop("patience", None),
+                   tabu_size=parameters.pop("tabu_size", 50), max_iterations=parameters.pop("max_iterations", 600),
+                   seed=parameters.pop("seed", DEFAULT_SEED), target_gap=parameters.pop("target_gap", None))
+    routes = [[0] + route + [0] for route in result["solution"] if route]
+    valid, report = validate_solution(model, routes)
+    return {
+        "digest": digest,
+        "solution": routes,
+        "cost": result["cost"],
+        "lower_bound": result.get("lower_bound"),
+        "gap": result.get("gap"),
+        "valid": valid,
+        "report": report,
+        "solve_time": round(time.perf_counter() - started, 6),
+    }
+
+
+class SolveService:
+    """
+    Spools instances, batches identical requests and runs solves on a process pool.
+
+    Attributes:
+        spool_dir: Directory of the received instance files
+        spooled: OrderedDict of digest -> instance file, most recently used last
+        pinned: Digest -> number of queued or running solves of it; pinned files are never evicted
+        inflight: (digest, parameters) -> [asyncio.Task of the shared solve, number of requests waiting on it]
+    """
+
+    def __init__(self, workers=None, max_models=8, spool_dir=None, max_spooled=64, mmap_bytes=64 << 20,
+                 default_deadline=60.0):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(max_models,))
+        # Fork the workers now: forked on the first solve, they would inherit the open client
+        # connections and keep them from closing until the worker exits
+        self.executor.submit(os.getpid).result()
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix="fcvrp-spool-")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_spooled = max_spooled
+        self.mmap_bytes = mmap_bytes
+        self.default_deadline = default_deadline
+        self.spooled = OrderedDict()
+        self.pinned = {}
+        self.inflight = {}
+        self.requests = 0
+        self.batched = 0
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def _spool(self, digest, payload):
+        """
+        Instance file of a payload, written once per digest under a temporary name and renamed.
+        """
+        file_name = os.path.join(self.spool_dir, f"{digest}.txt")
+        if not os.path.exists(file_name):
+            tmp_file = f"{file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_file, file_name)
+        return file_name
+
+    def _evict(self):
+        """
+        Forget the least recently used instances beyond max_spooled, skipping pinned ones.
+
+        Returns:
+            The instance files and their parse caches (Parser.cache_path) to delete
+        """
+        evicted = []
+        for digest in list(self.spooled):
+            if len(self.spooled) <= self.max_spooled:
+                break
+            if self.pinned.get(digest):
+                continue  # A queued or running solve still has to open it
+            old_file = self.spooled.pop(digest)
+            evicted.extend(glob.glob(glob.escape(old_file) + "*"))
+        return evicted
+
+    async def _run(self, digest, payload, parameters):
+        loop = asyncio.get_running_loop()
+        # The spool bookkeeping runs on the event loop; only the file I/O goes to threads
+        self.pinned[digest] = self.pinned.get(digest, 0) + 1
+        try:
+            file_name = self.spooled.get(digest)
+            if file_name is None or not os.path.exists(file_name):
+                file_name = await loop.run_in_executor(None, self._spool, digest, payload)
+            self.spooled[digest] = file_name
+            self.spooled.move_to_end(digest)
+            # Removed right away, so a later request for an evicted digest spools it again
+            _remove_files(self._evict())
+            return await loop.run_in_executor(self.executor, solve_instance, digest, file_name,
+                                              len(payload) >= self.mmap_bytes, parameters)
+        finally:
+            self.pinned[digest] -= 1
+            if not self.pinned[digest]:
+                del self.pinned[digest]
+                _remove_files(self._evict())
+
+    async def solve(self, payload, parameters, deadline=None):
+        """
+        Solve an instance, sharing the solve with concurrent identical requests.
+
+        Args:
+            payload: Contents of the instance file
+            parameters: Solve parameters (names from SOLVE_PARAMETERS)
+            deadline: Seconds until the answer is due (default: default_deadline)
+
+        Returns:
+            The result of solve_instance plus the number of requests that shared the solve
+
+        Raises:
+            RequestError: 504 when the deadline passes first
+        """
+        started = time.perf_counter()
+        deadline = self.default_deadline if deadline is None else deadline
+        loop = asyncio.get_running_loop()
+        if len(payload) >= self.mmap_bytes:
+            digest = await loop.run_in_executor(None, _digest, payload)
+        else:
+            digest = _digest(payload)
+
+        self.requests += 1
+        key = (digest, tuple(sorted(parameters.items())))
+        entry = self.inflight.get(key)
+        if entry is None:
+            # The first request of a batch bounds the search by its own deadline
+            budget = max(0.0, deadline * (1 - DEADLINE_MARGIN))
+            run_parameters = dict(parameters)
+            run_parameters["time_limit"] = min(parameters.get("time_limit", budget), budget)
+            task = asyncio.ensure_future(self._run(digest, payload, run_parameters))
+            entry = self.inflight[key] = [task, 0]
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.batched += 1
+        entry[1] += 1
+
+        remaining = deadline - (time.perf_counter() - started)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(entry[0]), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise RequestError(504, f"No solution within the deadline of {deadline} s") from None
+        except BrokenProcessPool:
+            raise RequestError(500, "The worker pool has failed") from None
+        except (ValueError, IndexError) as error:
+            raise RequestError(400, f"Unreadable instance: {error}") from None
+        return dict(result, batch_size=entry[1])
+
+    def _finished(self, key, task):
+        self.inflight.pop(key, None)
+        # Every waiter may have hit its deadline: retrieve the error so it is not reported as unhandled
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Solve of %s failed: %s", key[0], task.exception())
+
+    def health(self):
+        return {"status": "ok", "requests": self.requests, "batched": self.batched,
+                "inflight": len(self.inflight), "spooled": len(self.spooled), "pinned": len(self.pinned)}
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _digest(payload):
+    # Same hash as Parser uses for its sidecar caches
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _parse_query(query):
+    parameters = {}
+    deadline = None
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name == "deadline":
+            converter = float
+        elif name in SOLVE_PARAMETERS:
+            converter = SOLVE_PARAMETERS[name]
+        else:
+            raise RequestError(400, f"Unknown parameter: {name}")
+        try:
+            converted = converter(value)
+        except ValueError:
+            raise RequestError(400, f"Invalid value for {name}: {value!r}") from None
+        if converted < 0:
+            raise RequestError(400, f"{name} must not be negative")
+        if name == "deadline":
+            deadline = converted
+        else:
+            parameters[name] = converted
+    return parameters, deadline
+
+
+async def _read_request(reader, max_body_bytes):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError:
+        raise RequestError(400, f"Malformed request line: {request_line!r}") from None
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise RequestError(400, "Invalid Content-Length") from None
+    if length > max_body_bytes:
+        raise RequestError(413, f"Instance larger than {max_body_bytes} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, body
+
+
+def _response(status, content):
+    body = json.dumps(content).encode()
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def handle(service, reader, writer, max_body_bytes):
+    """
+    Serve one HTTP request on a connection.
+    """
+    started = time.perf_counter()
+    status, content, target = 500, {"error": "Internal error"}, "?"
+    try:
+        request = await _read_request(reader, max_body_bytes)
+        if request is None:
+            return
+        method, target, body = request
+        url = urlsplit(target)
+        if url.path == "/health":
+            status, content = 200, service.health()
+        elif url.path != "/solve":
+            raise RequestError(404, f"Unknown path: {url.path}")
+        elif method != "POST":
+            raise RequestError(405, "Use POST with the instance as the request body")
+        elif not body.strip():
+            raise RequestError(400, "Empty instance")
+        else:
+            parameters, deadline = _parse_query(url.query)
+            status, content = 200, await service.solve(body, parameters, deadline)
+    except RequestError as error:
+        status, content = error.status, {"error": str(error)}
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+    except Exception:
+        logger.exception("Request %s failed", target)
+    try:
+        writer.write(_response(status, content))
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+    logger.info("%s %s %d %.3fs", target, content.get("digest", "-"), status, time.perf_counter() - started,
+                extra={"fields": {"target": target, "status": status, "cost": content.get("cost"),
+                                  "batch_size": content.get("batch_size"),
+                                  "elapsed": round(time.perf_counter() - started, 6)}})
+
+
+async def serve(service, host="127.0.0.1", port=8080, unix_path=None, max_body_bytes=1 << 30):
+    """
+    Accept connections until cancelled; on a Unix socket if unix_path is given, else on host:port.
+    """
+    def connected(reader, writer):
+        return handle(service, reader, writer, max_body_bytes)
+
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(connected, path=unix_path)
+        logger.info("Serving on unix:%s", unix_path)
+    else:
+        server = await asyncio.start_server(connected, host, port)
+        logger.info("Serving on http://%s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio FCVRP solve service (HTTP over TCP or a Unix socket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of a TCP port")
+    parser.add_argument("--workers", type=int, default=None, help="Solver processes (default: one per CPU)")
+    parser.add_argument("--max-models", type=int, default=8, help="Parsed models kept per worker")
+    parser.add_argument("--spool-dir", help="Directory for received instances (default: a new temporary one)")
+    parser.add_argument("--mmap-bytes", type=int, default=64 << 20,
+                        help="Memory-map the cost matrix of instances at least this large")
+    parser.add_argument("--max-body-bytes", type=int, default=1 << 30)
+    parser.add_argument("--deadline", type=float, default=60.0, help="Default per-request deadline in seconds")
+    parser.add_argument("--json-logs", action="store_true", help="Log one JSON object per line")
+    args = parser.parse_args()
+    configure_logging(logging.INFO, json_lines=args.json_logs)
+
+    service = SolveService(args.workers, args.max_models, args.spool_dir, mmap_bytes=args.mmap_bytes,
+                           default_deadline=args.deadline)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix, args.max_body_bytes))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
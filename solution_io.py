@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Route-preserving solution files, in a text and a compact binary format.
+
+A solution file is a stream of records. The first record holds a whole
+solution; every later one either holds a whole solution again or only the
+routes that changed since the previous record, so appending an incumbent
+during a long run costs O(changed routes). Reading replays the records in
+order; iter_solutions() yields every state lazily, so a caller can validate
+only the states it needs (read_solution() returns the last one).
+
+Text format, one route per line with the depot at both ends:
+
+    # solution tabu cost=574
+    0 15 2 7 0
+    0 41 9 0
+    # update 12 cost=568
+    1: 0 41 33 9 0
+
+A "# solution" header starts a whole solution. A "# update" header is
+followed by "index: route" lines that replace (or, past the end, add) the
+route with that index; an index with no nodes after the colon empties the
+route. Empty routes of a whole solution are written as "0 0", so the route
+indices of later updates stay aligned. The text after the keyword is a
+label, then key=value fields. A file without headers is one solution with
+one route per line, the format SolutionValidator.parse_solution_file has
+always read.
+
+Binary format: an 8-byte file header (MAGIC, a version byte, the node size
+in bytes, 2 for uint16 node IDs or 4 for uint32, and two reserved bytes),
+then one record per solution or update:
+
+    record size  uint64   bytes of the record after this field
+    kind         uint8    0 whole solution, 1 update
+    (padding)    3 bytes
+    count        uint32   routes stored in the record
+    total        uint32   routes of the solution after the record
+    stamp        int64    caller-defined, e.g. the iteration (-1 if none)
+    cost         float64  (NaN if not given)
+    indices      uint32[count]      route index of every stored route
+    offsets      uint32[count + 1]  route k is nodes[offsets[k]:offsets[k + 1]]
+    nodes        uint16/uint32[offsets[count]]  node IDs, depot excluded
+
+Routes are stored without the depot; readers return them with the depot at
+both ends, as SolutionValidator.validate_solution expects.
+"""
+import math
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b"FCVS"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sBBxx")
+RECORD_HEADER = struct.Struct("<QBxxxIIqd")
+
+FULL = 0
+UPDATE = 1
+
+SolutionRecord = namedtuple("SolutionRecord", ["label", "cost", "stamp", "routes"])
+SolutionRecord.__doc__ = """
+One solution state of a solution file.
+
+Attributes:
+    label: Label of the record (text format) or "" (binary format)
+    cost: Cost written with the record, or None
+    stamp: Stamp written with the record (e.g. the iteration), or None
+    routes: Non-empty routes with the depot at both ends
+"""
+
+
+def is_binary(path):
+    """
+    True if the file starts with the binary format's MAGIC.
+    """
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _depot_routes(routes):
+    return [[0] + route + [0] for route in routes if route]
+
+
+def _strip_depot(values):
+    # Both "0 5 3 0" and "5 3" denote the route visiting 5 and 3
+    start = 1 if values and values[0] == 0 else 0
+    end = len(values) - 1 if len(values) > start and values[-1] == 0 else len(values)
+    return values[start:end]
+
+
+def _header_fields(text):
+    """
+    Label, cost and stamp of a header line's text after the keyword.
+    """
+    label = []
+    cost = stamp = None
+    for word in text.split():
+        key, sep, value = word.partition("=")
+        if not sep:
+            label.append(word)
+        elif key == "cost":
+            cost = float(value)
+            cost = int(cost) if cost.is_integer() else cost
+        elif key == "stamp":
+            stamp = int(value)
+    return " ".join(label), cost, stamp
+
+
+def _set_route(routes, index, route):
+    if index >= len(routes):
+        routes.extend([] for _ in range(index + 1 - len(routes)))
+    routes[index] = route
+
+
+def iter_text_solutions(lines):
+    """
+    Replay a text solution stream.
+
+    Args:
+        lines: Iterable of lines, e.g. an open text file
+
+    Yields:
+        SolutionRecord of every solution and update, in file order
+    """
+    for label, cost, stamp, routes in _replay_text(lines):
+        yield SolutionRecord(label, cost, stamp, _depot_routes(routes))
+
+
+def _replay_text(lines):
+    # Yields (label, cost, stamp, routes) with the routes by index, empty ones included
+    routes = None
+    label, cost, stamp = "", None, None
+    headered = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            if routes is not None and headered:
+                yield label, cost, stamp, routes
+            keyword, _, rest = line[1:].strip().partition(" ")
+            if keyword == "solution":
+                routes = []
+            elif keyword == "update":
+                if routes is None:
+                    raise ValueError("Solution update before the first solution")
+            else:
+                raise ValueError(f"Unknown solution header: {line!r}")
+            label, cost, stamp = _header_fields(rest)
+            headered = True
+            continue
+        if routes is None:
+            routes = []  # A file without headers: one solution, one route per line
+        index, colon, nodes = line.partition(":")
+        if colon:
+            _set_route(routes, int(index), _strip_depot([int(value) for value in nodes.split()]))
+        else:
+            routes.append(_strip_depot([int(value) for value in line.split()]))
+    if routes is not None:
+        yield label, cost, stamp, routes
+
+
+def iter_binary_solutions(path):
+    """
+    Replay a binary solution file.
+
+    Yields:
+        SolutionRecord of every record, in file order
+    """
+    for label, cost, stamp, routes in _replay_binary(path):
+        yield SolutionRecord(label, cost, stamp, _depot_routes(routes))
+
+
+def _replay_binary(path):
+    with open(path, "rb") as f:
+        magic, version, node_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary solution file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported solution format version {version}")
+        node_dtype = np.dtype(f"<u{node_size}")
+        routes = []
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                raise ValueError(f"{path}: truncated record")
+            size, kind, count, total, stamp, cost = RECORD_HEADER.unpack(header)
+            body = f.read(size - (RECORD_HEADER.size - 8))
+            if len(body) < size - (RECORD_HEADER.size - 8):
+                raise ValueError(f"{path}: truncated record")
+            indices = np.frombuffer(body, dtype="<u4", count=count)
+            offsets = np.frombuffer(body, dtype="<u4", count=count + 1, offset=4 * count)
+            nodes = np.frombuffer(body, dtype=node_dtype, count=int(offsets[-1]), offset=4 * (2 * count + 1))
+            if kind == FULL:
+                routes = [[] for _ in range(total)]
+            del routes[total:]
+            routes.extend([] for _ in range(total - len(routes)))
+            for k, index in enumerate(indices.tolist()):
+                routes[index] = nodes[offsets[k]:offsets[k + 1]].tolist()
+            if math.isnan(cost):
+                cost = None
+            elif cost.is_integer():
+                cost = int(cost)
+            yield "", cost, None if stamp < 0 else stamp, routes
+
+
+def iter_solutions(path):
+    """
+    Every solution state of a text or binary solution file, read lazily.
+    """
+    if is_binary(path):
+        yield from iter_binary_solutions(path)
+        return
+    with open(path) as f:
+        yield from iter_text_solutions(f)
+
+
+def read_solution(path):
+    """
+    The last solution state of a text or binary solution file (None for an empty file).
+    """
+    last = None
+    for last in iter_solutions(path):
+        pass
+    return last
+
+
+class SolutionWriter:
+    """
+    Appends solutions to a text or binary solution file, storing only the routes that changed.
+
+    The writer can be passed as the on_improvement callback of the searches,
+    which makes every new incumbent an appended record.
+
+    Attributes:
+        path: The solution file
+        binary: Binary instead of text format
+        records: Records written through this writer
+    """
+
+    def __init__(self, path, binary=False, num_nodes=None, append=False):
+        """
+        Args:
+            path: The solution file
+            binary: Write the binary format
+            num_nodes: Largest node ID; node IDs are stored as uint16 when it fits, uint32 otherwise
+            append: Continue an existing file (in its own format) instead of truncating it
+        """
+        self.path = path
+        self.binary = binary
+        self.records = 0
+        self.node_size = 2 if num_nodes is not None and num_nodes <= np.iinfo(np.uint16).max else 4
+        self.last = None  # Routes (depot excluded) of the last record in the file
+
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            self.binary = is_binary(path)
+            if self.binary:
+                with open(path, "rb") as f:
+                    self.node_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))[2]
+            if self.binary:
+                replay = _replay_binary(path)
+            else:
+                with open(path) as f:
+                    replay = list(_replay_text(f))
+            for _, _, _, routes in replay:
+                self.last = routes
+            self.file = open(path, "ab" if self.binary else "a")
+        else:
+            self.file = open(path, "wb" if self.binary else "w")
+            if self.binary:
+                self.file.write(FILE_HEADER.pack(MAGIC, VERSION, self.node_size))
+                self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __call__(self, solution, cost):
+        self.write(solution, cost)
+        return False
+
+    def write(self, solution, cost=None, label="", stamp=None, changed=None, full=False):
+        """
+        Append one solution.
+
+        Args:
+            solution: List of routes (node IDs, depot excluded); empty routes keep their index
+            cost: Optional cost stored with the record
+            label: Label of the record (text format only)
+            stamp: Optional non-negative integer stored with the record, e.g. the iteration
+            changed: Optional indices of the routes that changed since the last write; compared otherwise
+            full: Write the whole solution even if an update would do
+        """
+        routes = [list(route) for route in solution]
+        if full or self.last is None:
+            kind = FULL
+            indices = range(len(routes))
+        else:
+            kind = UPDATE
+            if changed is None:
+                last = self.last
+                changed = [index for index, route in enumerate(routes)
+                           if index >= len(last) or route != last[index]]
+            indices = sorted(changed)
+        if self.binary:
+            self._write_binary(kind, routes, indices, cost, stamp)
+        else:
+            self._write_text(kind, routes, indices, cost, label, stamp)
+        self.file.flush()
+        self.last = routes
+        self.records += 1
+
+    def _write_text(self, kind, routes, indices, cost, label, stamp):
+        fields = [label] if label else []
+        if cost is not None:
+            fields.append(f"cost={cost}")
+        if stamp is not None:
+            fields.append(f"stamp={stamp}")
+        lines = [" ".join(["# solution" if kind == FULL else "# update"] + fields)]
+        if kind == FULL:
+            lines.extend(" ".join(map(str, [0] + routes[index] + [0])) for index in indices)
+        else:
+            lines.extend(f"{index}: " + " ".join(map(str, [0] + routes[index] + [0])) if routes[index]
+                         else f"{index}:" for index in indices)
+            if len(routes) < len(self.last):
+                # Routes past the new end are emptied
+                lines.extend(f"{index}:" for index in range(len(routes), len(self.last)))
+        self.file.write("\n".join(lines) + "\n")
+
+    def _write_binary(self, kind, routes, indices, cost, stamp):
+        indices = list(indices)
+        lengths = [len(routes[index]) for index in indices]
+        offsets = np.zeros(len(indices) + 1, dtype="<u4")
+        np.cumsum(lengths, out=offsets[1:])
+        nodes = np.fromiter((node for index in indices for node in routes[index]),
+                            dtype=f"<u{self.node_size}", count=int(offsets[-1]))
+        payload = np.asarray(indices, dtype="<u4").tobytes() + offsets.tobytes() + nodes.tobytes()
+        header = RECORD_HEADER.pack(RECORD_HEADER.size - 8 + len(payload), kind, len(indices), len(routes),
+                                    -1 if stamp is None else stamp, math.nan if cost is None else float(cost))
+        self.file.write(header + payload)
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental solution state for the search algorithms.
+
+A Solution wraps the bare list-of-routes representation used throughout the
+search code (routes without the depot) and caches per-route cost, per-route
+load and per-family visit counts. Every move goes through the state so the
+caches stay correct without re-walking the solution.
+
+Given a route_cache.RouteCache, the state also keeps the Zobrist hash of
+every route, updated in O(1) per move, and takes the cost, load and family
+visits of new routes from the cache.
+"""
+
+
+class Solution:
+    """
+    Routes plus cached costs, loads and family visit counts.
+
+    Attributes:
+        model: The problem model
+        costs: Cost matrix used for the route costs
+        demands: demands[node_id] is the demand of that node
+        node_family: node_family[node_id] is the family of that node (None for the depot)
+        in_solution: in_solution[node_id] is True if the node is visited by some route;
+                     together with model.families this gives the visited and
+                     unvisited members of every family
+        routes: List of routes (node IDs, depot excluded)
+        route_costs: Cost of each route, depot arcs included
+        route_loads: Load of each route
+        family_visits: family_visits[family_id] is the number of visited members
+        total_cost: Sum of route_costs
+        route_cache: Optional route_cache.RouteCache over the same cost matrix
+        route_hashes: Zobrist hash of each route (None without a route_cache)
+    """
+
+    __slots__ = ("model", "costs", "demands", "node_family", "in_solution", "routes", "route_costs",
+                 "route_loads", "family_visits", "total_cost", "route_cache", "route_hashes")
+
+    def __init__(self, model, routes, costs=None, route_cache=None):
+        self.model = model
+        self.costs = model.cost_matrix if costs is None else costs
+        self.demands = [node.demand for node in model.nodes]
+        self.node_family = [node.family for node in model.nodes]
+        self.routes = [list(route) for route in routes]
+        self.route_cache = route_cache
+        self.in_solution = [False] * len(model.nodes)
+        for route in self.routes:
+            for node in route:
+                self.in_solution[node] = True
+        self.family_visits = [0] * len(model.families)
+        if route_cache is not None:
+            self.route_hashes = [route_cache.hasher.route_hash(route) for route in self.routes]
+            infos = [route_cache.lookup(route, route_hash) for route, route_hash in zip(self.routes, self.route_hashes)]
+            self.route_costs = [info.cost for info in infos]
+            self.route_loads = [info.load for info in infos]
+            for info in infos:
+                for family_id, visits in info.families:
+                    self.family_visits[family_id] += visits
+        else:
+            self.route_hashes = None
+            self.route_costs = [self.route_cost(route) for route in self.routes]
+            self.route_loads = [sum(self.demands[node] for node in route) for route in self.routes]
+            for route in self.routes:
+                for node in route:
+                    self.family_visits[self.node_family[node]] += 1
+        self.total_cost = sum(self.route_costs)
+
+    def route_cost(self, route):
+        """
+        Cost of a single route, including the arcs from and to the depot.
+        """
+        if not route:
+            return 0
+        costs = self.costs
+        # int() per arc: a memory-mapped matrix may be int16 and overflow when summed
+        cost = int(costs[0][route[0]]) + int(costs[route[-1]][0])
+        for i in range(len(route) - 1):
+            cost += int(costs[route[i]][route[i + 1]])
+        return cost
+
+    def copy(self):
+        """
+        Independent copy of the state; the model and matrices are shared.
+        """
+        clone = Solution.__new__(Solution)
+        clone.model = self.model
+        clone.costs = self.costs
+        clone.demands = self.demands
+        clone.node_family = self.node_family
+        clone.in_solution = self.in_solution[:]
+        clone.routes = [route[:] for route in self.routes]
+        clone.route_costs = self.route_costs[:]
+        clone.route_loads = self.route_loads[:]
+        clone.family_visits = self.family_visits[:]
+        clone.total_cost = self.total_cost
+        clone.route_cache = self.route_cache
+        clone.route_hashes = self.route_hashes[:] if self.route_hashes is not None else None
+        return clone
+
+    def solution_hash(self):
+        """
+        Zobrist hash of the whole solution, independent of the order of the routes (needs a route_cache).
+        """
+        value = 0
+        for route_hash in self.route_hashes:
+            value ^= route_hash
+        return value
+
+    def inter_swap_hash(self, r1, idx1, r2, idx2):
+        """
+        Solution hash after exchanging routes[r1][idx1] and routes[r2][idx2], without applying the move.
+        """
+        hasher = self.route_cache.hasher
+        a = self.routes[r1][idx1]
+        b = self.routes[r2][idx2]
+        return (self.solution_hash() ^ hasher.replace_delta(self.routes[r1], idx1, b)
+                ^ hasher.replace_delta(self.routes[r2], idx2, a))
+
+    def replace_member_hash(self, route_index, idx, new_node):
+        """
+        Solution hash after visiting new_node instead of routes[route_index][idx], without applying the move.
+        """
+        return self.solution_hash() ^ self.route_cache.hasher.replace_delta(self.routes[route_index], idx, new_node)
+
+    def _replace_delta(self, route_index, idx, new_node):
+        """
+        Cost change of one route when the node at idx is replaced by new_node.
+        """
+        route = self.routes[route_index]
+        costs = self.costs
+        old_node = route[idx]
+        prev_node = route[idx - 1] if idx > 0 else 0
+        next_node = route[idx + 1] if idx + 1 < len(route) else 0
+        return (int(costs[prev_node][new_node]) + int(costs[new_node][next_node])
+                - int(costs[prev_node][old_node]) - int(costs[old_node][next_node]))
+
+    def can_inter_swap(self, r1, idx1, r2, idx2):
+        """
+        O(1) capacity check for exchanging routes[r1][idx1] and routes[r2][idx2].
+        """
+        diff = self.demands[self.routes[r2][idx2]] - self.demands[self.routes[r1][idx1]]
+        capacity = self.model.capacity
+        return (self.route_loads[r1] + diff <= capacity
+                and self.route_loads[r2] - diff <= capacity)
+
+    def apply_intra_swap(self, route_index, i, j, delta):
+        """
+        Swap positions i and j of one route; delta is the route cost change.
+        """
+        route = self.routes[route_index]
+        a, b = route[i], route[j]
+        if self.route_hashes is not None:
+            # Two replacements in a row; each delta is exact for the route it is applied to
+            hasher = self.route_cache.hasher
+            change = hasher.replace_delta(route, i, b)
+            route[i] = b
+            change ^= hasher.replace_delta(route, j, a)
+            route[i] = a
+            self.route_hashes[route_index] ^= change
+        route[i], route[j] = b, a
+        self.route_costs[route_index] += delta
+        self.total_cost += delta
+
+    def apply_inter_swap(self, r1, idx1, r2, idx2):
+        """
+        Exchange routes[r1][idx1] and routes[r2][idx2] and update every cache.
+
+        Returns:
+            The change of the total cost
+        """
+        a = self.routes[r1][idx1]
+        b = self.routes[r2][idx2]
+        delta1 = self._replace_delta(r1, idx1, b)
+        delta2 = self._replace_delta(r2, idx2, a)
+        if self.route_hashes is not None:
+            hasher = self.route_cache.hasher
+            self.route_hashes[r1] ^= hasher.replace_delta(self.routes[r1], idx1, b)
+            self.route_hashes[r2] ^= hasher.replace_delta(self.routes[r2], idx2, a)
+        self.routes[r1][idx1] = b
+        self.routes[r2][idx2] = a
+
+        diff = self.demands[b] - self.demands[a]
+        self.route_loads[r1] += diff
+        self.route_loads[r2] -= diff
+        self.route_costs[r1] += delta1
+        self.route_costs[r2] += delta2
+        self.total_cost += delta1 + delta2
+        return delta1 + delta2
+
+    def unvisited_members(self, family_id):
+        """
+        Members of a family that no route visits, in increasing id order.
+        """
+        in_solution = self.in_solution
+        return [node.id for node in self.model.families[family_id].nodes if not in_solution[node.id]]
+
+    def apply_replace_member(self, route_index, idx, new_node):
+        """
+        Visit new_node instead of routes[route_index][idx]. new_node must be an
+        unvisited member of the same family, so family visit counts do not change.
+
+        Returns:
+            The change of the total cost
+        """
+        old_node = self.routes[route_index][idx]
+        delta = self._replace_delta(route_index, idx, new_node)
+        if self.route_hashes is not None:
+            self.route_hashes[route_index] ^= self.route_cache.hasher.replace_delta(self.routes[route_index], idx,
+                                                                                    new_node)
+        self.routes[route_index][idx] = new_node
+        self.in_solution[old_node] = False
+        self.in_solution[new_node] = True
+
+        self.route_loads[route_index] += self.demands[new_node] - self.demands[old_node]
+        self.route_costs[route_index] += delta
+        self.total_cost += delta
+        return delta
+
+    def _arc(self, a, b):
+        # The depot-to-depot arc of an empty route costs nothing (the matrix diagonal is -1)
+        return 0 if a == b else int(self.costs[a][b])
+
+    def remove_node(self, route_index, idx):
+        """
+        Stop visiting routes[route_index][idx]; its family loses one visit.
+
+        Returns:
+            The change of the total cost
+        """
+        route = self.routes[route_index]
+        node = route[idx]
+        prev_node = route[idx - 1] if idx > 0 else 0
+        next_node = route[idx + 1] if idx + 1 < len(route) else 0
+        delta = self._arc(prev_node, next_node) - int(self.costs[prev_node][node]) - int(self.costs[node][next_node])
+        if self.route_hashes is not None:
+            self.route_hashes[route_index] ^= self.route_cache.hasher.remove_delta(route, idx)
+        del route[idx]
+        self.in_solution[node] = False
+        self.family_visits[self.node_family[node]] -= 1
+        self.route_loads[route_index] -= self.demands[node]
+        self.route_costs[route_index] += delta
+        self.total_cost += delta
+        return delta
+
+    def insert_node(self, route_index, position, node):
+        """
+        Visit an unvisited node at the given position of a route; its family gains one visit.
+
+        Returns:
+            The change of the total cost
+        """
+        route = self.routes[route_index]
+        prev_node = route[position - 1] if position > 0 else 0
+        next_node = route[position] if position < len(route) else 0
+        delta = int(self.costs[prev_node][node]) + int(self.costs[node][next_node]) - self._arc(prev_node, next_node)
+        if self.route_hashes is not None:
+            self.route_hashes[route_index] ^= self.route_cache.hasher.insert_delta(route, position, node)
+        route.insert(position, node)
+        self.in_solution[node] = True
+        self.family_visits[self.node_family[node]] += 1
+        self.route_loads[route_index] += self.demands[node]
+        self.route_costs[route_index] += delta
+        self.total_cost += delta
+        return delta
+
+    def set_route(self, route_index, route):
+        """
+        Replace a whole route by a new visiting sequence of (a subset of) the
+        same nodes, or by nodes moved from another route, and update its
+        cost and load. Family visit counts and visited flags are unchanged,
+        so the set of visited nodes over all routes must stay the same.
+        """
+        self.routes[route_index][:] = route
+        if self.route_hashes is not None:
+            route_hash = self.route_cache.hasher.route_hash(route)
+            info = self.route_cache.lookup(route, route_hash)
+            self.route_hashes[route_index] = route_hash
+            cost, load = info.cost, info.load
+        else:
+            cost = self.route_cost(self.routes[route_index])
+            load = sum(self.demands[node] for node in route)
+        self.total_cost += cost - self.route_costs[route_index]
+        self.route_costs[route_index] = cost
+        self.route_loads[route_index] = load
+
+    def is_feasible(self):
+        """
+        Capacity, fleet size and family requirements, checked from the caches.
+        """
+        capacity = self.model.capacity
+        return (sum(1 for route in self.routes if route) <= self.model.vehicles
+                and all(load <= capacity for load in self.route_loads)
+                and all(visits >= family.required_visits
+                        for visits, family in zip(self.family_visits, self.model.families)))
+
+    def depot_routes(self):
+        """
+        Non-empty routes with the depot added at both ends, as expected by
+        SolutionValidator.validate_solution.
+        """
+        return [[0] + route + [0] for route in self.routes if route]
+
+    def report(self):
+        """
+        Validation result built from the caches, in the same format as
+        SolutionValidator.validate_solution.
+
+        The state assumes every node appears at most once, which holds for
+        solutions built by the construction heuristic and changed only
+        through the moves of this class.
+
+        Returns:
+            valid: Boolean indicating if the solution is valid
+            validation_report: Dictionary containing validation details and errors if any
+        """
+        model = self.model
+        used = [i for i, route in enumerate(self.routes) if route]
+        validation_report = {
+            "valid": True,
+            "total_cost": self.total_cost,
+            "errors": [],
+            "route_loads": [self.route_loads[i] for i in used],
+            "route_costs": [self.route_costs[i] for i in used],
+            "family_visits": {family.id: self.family_visits[family.id] for family in model.families},
+        }
+
+        if len(used) > model.vehicles:
+            validation_report["valid"] = False
+            validation_report["errors"].append(f"Too many vehicles used: {len(used)} > {model.vehicles}")
+
+        for route_idx, i in enumerate(used):
+            if self.route_loads[i] > model.capacity:
+                validation_report["valid"] = False
+                validation_report["errors"].append(
+                    f"Route {route_idx} exceeds capacity: {self.route_loads[i]} > {model.capacity}")
+
+        for family in model.families:
+            if self.family_visits[family.id] < family.required_visits:
+                validation_report["valid"] = False
+                validation_report["errors"].append(
+                    f"Family {family.id} has insufficient visits: "
+                    f"{self.family_visits[family.id]} < {family.required_visits}"
+                )
+
+        return validation_report["valid"], validation_report
@@ -1,29 +1,47 @@
 # -*- coding: utf-8 -*-
+import itertools
 import random
-from collections import deque
+import time
+import instrumentation
 from const_heuristic import Fcvrp  # Χρειάζεται μια αρχική λύση
+from moves import (best_inter_swap, best_inter_swap_vectorized, first_inter_swap,
+                   apply_inter_swap, uses_vectorized, best_replace_member, best_replace_member_vectorized)
+from solution_state import Solution
+from operators import descend
+from route_cache import RouteCache, SeenSolutions
+from route_tsp import RouteOptimizer
+from checkpoint import TabuCheckpoint, save_checkpoint, load_checkpoint
 
-def calculate_total_cost(solution, costs):
+# Πόσες φορές ξαναγίνεται η σάρωση όταν η καλύτερη κίνηση οδηγεί σε λύση που έχει ήδη επισκεφθεί
+REVISIT_RETRIES = 3
+
+@instrumentation.timed("calculate_total_cost")
+def calculate_total_cost(solution, costs, route_cache=None):
     """
-    Υπολογίζει το συνολικό κόστος μιας διαδρομής.
+    Υπολογίζει το συνολικό κόστος μιας λύσης.
 
     Args:
         solution: Μια λίστα που περιέχει τις διαδρομές των οχημάτων, όπου κάθε διαδρομή είναι λίστα κόμβων.
         costs: Ο πίνακας κόστους. Το costs[i,j] είναι το κόστος μετάβασης από τον κόμβο i στον κόμβο j.
+        route_cache: Προαιρετική route_cache.RouteCache με τον ίδιο πίνακα κόστους· οι διαδρομές που έχουν
+                     ήδη αποτιμηθεί δεν ξαναϋπολογίζονται.
 
     Returns:
         Το συνολικό κόστος της λύσης, δηλαδή το άθροισμα των αποστάσεων για όλες τις διαδρομές.
     """
+    if route_cache is not None:
+        return route_cache.total_cost(solution)
     total_cost = 0
     for route in solution:
         if route:
-            total_cost += costs[0][route[0]]  # Από αποθήκη στον πρώτο κόμβο
+            total_cost += int(costs[0][route[0]])  # Από αποθήκη στον πρώτο κόμβο
             for i in range(len(route) - 1):
-                total_cost += costs[route[i]][route[i + 1]]  # Κόστος μεταξύ κόμβων στη διαδρομή
-            total_cost += costs[route[-1]][0]  # Από τον τελευταίο κόμβο πίσω στην αποθήκη
+                total_cost += int(costs[route[i]][route[i + 1]])  # Κόστος μεταξύ κόμβων στη διαδρομή
+            total_cost += int(costs[route[-1]][0])  # Από τον τελευταίο κόμβο πίσω στην αποθήκη
     return total_cost
 
 
+@instrumentation.timed("get_neighbors")
 def get_neighbors(solution):
     """
     Δημιουργεί μία λίστα από γειτονικές λύσεις κάνοντας ανταλλαγές κόμβων μεταξύ διαφορετικών routes.
@@ -51,62 +69,378 @@ def get_neighbors(solution):
     return neighbors, moves
 
 
-def tabu_search(local_solution, costs, tabu_size, max_iterations):
+class TabuMemory:
     """
-    Εκτελεί τον αλγόριθμο Tabu Search για να βρει βελτιωμένη λύση στο πρόβλημα.
+    Μνήμη tabu με σφραγίδα επανάληψης ανά ζεύγος κόμβων.
 
-    Args:
-        local_solution: Η λύση από τον Local Search.
-        costs: Ο πίνακας κόστους του προβλήματος.
-        tabu_size: Το μέγεθος της λίστας tabu, δηλαδή πόσες κινήσεις θυμόμαστε ώστε να μην τις επαναλάβουμε.
-        max_iterations: Ο μέγιστος αριθμός επαναλήψεων που θα εκτελέσει ο αλγόριθμος.
+    Για κάθε ζεύγος κόμβων που ανταλλάχθηκε (ή αντικαταστάθηκε) κρατείται σε λεξικό η επανάληψη μέχρι την
+    οποία η κίνηση είναι απαγορευμένη, οπότε ο έλεγχος tabu είναι O(1) ανεξάρτητα από το μέγεθος της μνήμης.
+    Η διάρκεια (tenure) κάθε κίνησης επιλέγεται τυχαία γύρω από το tabu_size ώστε η αναζήτηση να μην
+    εγκλωβίζεται σε κύκλους σταθερού μήκους.
 
-    Returns:
-        best_solution: Η καλύτερη λύση που βρέθηκε κατά την εκτέλεση του αλγορίθμου.
-        best_cost: Το κόστος της καλύτερης λύσης.
+    Attributes:
+        iteration: Η τρέχουσα επανάληψη της αναζήτησης.
+        expires: Λεξικό (κόμβος_α, κόμβος_β) -> επανάληψη λήξης, με το ζεύγος ταξινομημένο.
+        min_tenure, max_tenure: Τα όρια της τυχαίας διάρκειας.
     """
-    current_solution = local_solution
-    current_cost = calculate_total_cost(current_solution, costs)
 
-    best_solution = current_solution
-    best_cost = current_cost
+    def __init__(self, tabu_size, rng=None, spread=0.25):
+        """
+        Args:
+            tabu_size: Η μέση διάρκεια (σε επαναλήψεις) που μια κίνηση μένει απαγορευμένη.
+            rng: Γεννήτρια random.Random για την τυχαία διάρκεια.
+            spread: Το σχετικό εύρος της διάρκειας γύρω από το tabu_size (0 για σταθερή διάρκεια).
+        """
+        self.iteration = 0
+        self.expires = {}
+        self.rng = rng if rng is not None else random.Random()
+        width = int(tabu_size * spread)
+        self.min_tenure = max(1, tabu_size - width)
+        self.max_tenure = max(1, tabu_size + width)
+
+    def is_tabu(self, a, b):
+        key = (a, b) if a < b else (b, a)
+        return self.expires.get(key, -1) > self.iteration
+
+    def add(self, a, b):
+        """
+        Απαγορεύει το ζεύγος (a, b) για τυχαίο αριθμό επόμενων επαναλήψεων.
+        """
+        key = (a, b) if a < b else (b, a)
+        self.expires[key] = self.iteration + self.rng.randint(self.min_tenure, self.max_tenure)
+        # Οι ληγμένες εγγραφές αφαιρούνται σπάνια, ώστε το κόστος να μοιράζεται στις επαναλήψεις
+        if len(self.expires) > 2 * self.max_tenure:
+            self.expires = {pair: stamp for pair, stamp in self.expires.items() if stamp > self.iteration}
 
-    tabu_list = deque(maxlen=tabu_size)  # Λίστα απαγορευμένων κινήσεων
+    def active_pairs(self):
+        """
+        Τα ζεύγη που είναι ακόμη απαγορευμένα (για τις διανυσματικές σαρώσεις).
+        """
+        iteration = self.iteration
+        return [pair for pair, stamp in self.expires.items() if stamp > iteration]
 
-    for iteration in range(max_iterations):
-        neighbors, moves = get_neighbors(current_solution)
 
-        best_neighbor = None
-        best_neighbor_cost = float("inf")
-        best_move = None
+def iter_tabu_search(local_solution, costs, tabu_size, max_iterations=None, vectorized=None, model=None,
+                     candidates=None, operators=None, seed=None, time_limit=None, patience=None, stats=None,
+                     avoid_revisits=True, route_cache=None, route_pool=None, route_optimizer=None,
+                     checkpoint_file=None, checkpoint_interval=100, resume=None):
+    """
+    Tabu Search ως γεννήτρια (anytime): παράγει την αρχική λύση και κάθε νέα καλύτερη λύση μόλις βρεθεί.
+
+    Ο καλών μπορεί να σταματήσει την αναζήτηση οποιαδήποτε στιγμή απλώς σταματώντας να ζητά τιμές
+    (break ή close() στη γεννήτρια). Τα ορίσματα είναι ίδια με της tabu_search. Με resume (checkpoint.TabuCheckpoint)
+    η αναζήτηση συνεχίζει από την αποθηκευμένη κατάσταση και η πρώτη τιμή είναι η καλύτερη λύση του checkpoint.
 
-        for neighbor, move in zip(neighbors, moves):
-            move_nodes = tuple(sorted(move[0]))  # Κανονικοποίηση της κίνησης (ανεξαρτήτως σειράς)
+    Yields:
+        (solution, cost): Αντίγραφο της τρέχουσας καλύτερης λύσης και το κόστος της.
+    """
+    if operators and model is None:
+        raise ValueError("tabu_search: operators require the model")
+    if route_optimizer is not None and model is None:
+        raise ValueError("tabu_search: route_optimizer requires the model")
+    if max_iterations is None and time_limit is None and patience is None:
+        raise ValueError("tabu_search: max_iterations, time_limit or patience is required")
 
-            if move_nodes in tabu_list:
-                continue  # Αν είναι tabu η κίνηση, την προσπερνάμε
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    if resume is not None:
+        local_solution = resume.current_solution
+        if route_optimizer is not None and resume.optimizer_memo is not None:
+            # Η σειρά της μνήμης (LRU) επηρεάζει τις επόμενες λύσεις, άρα αποκαθίσταται όπως ήταν
+            route_optimizer.restore_memo(resume.optimizer_memo)
 
-            cost = calculate_total_cost(neighbor, costs)
-            if cost < best_neighbor_cost:
-                best_neighbor = neighbor
-                best_neighbor_cost = cost
-                best_move = move_nodes
+    # Κατάσταση με φορτία/κόστη ανά διαδρομή για O(1) έλεγχο χωρητικότητας (μόνο αν δοθεί μοντέλο).
+    # Για την αποφυγή επαναλήψεων η κατάσταση κρατά και το Zobrist hash κάθε διαδρομής.
+    seen = None
+    if model is not None and avoid_revisits:
+        if route_cache is None:
+            route_cache = RouteCache(model, costs)
+        state = Solution(model, local_solution, costs, route_cache)
+        if resume is not None and resume.seen is not None:
+            seen = SeenSolutions(resume.seen_max_size)
+            for solution_hash in resume.seen:
+                seen.add(solution_hash)
+        else:
+            seen = SeenSolutions()
+            seen.add(state.solution_hash())
+    elif model is not None:
+        state = Solution(model, local_solution, costs)
+    else:
+        state = None
 
-        # Αν όλες οι κινήσεις ήταν tabu, κάνε μια παρόμοια εναλλακτική (aspiration criterion)
-        if not best_neighbor:
-            best_neighbor = neighbors[0]
-            best_neighbor_cost = calculate_total_cost(best_neighbor, costs)
-            best_move = tuple(sorted(moves[0][0]))
+    if state is not None:
+        current_solution = state.routes  # Οι κινήσεις περνούν από το state ώστε να ενημερώνονται οι cache
+        current_cost = state.total_cost
+    else:
+        current_solution = [r[:] for r in local_solution]  # Αντίγραφο, οι κινήσεις εφαρμόζονται επί τόπου
+        current_cost = calculate_total_cost(current_solution, costs)
+
+    tabu_memory = TabuMemory(tabu_size, random.Random(seed))  # Απαγορευμένες κινήσεις με σφραγίδα επανάληψης
+    start = 0
+    last_improvement = 0
+    revisits = 0
+    if resume is not None:
+        # Τα κόστη αποκαθίστανται όπως ήταν (και όχι από την άθροιση των διαδρομών), για ίδια αριθμητική
+        current_cost = resume.current_cost
+        best_cost = resume.best_cost
+        best_solution = [list(r) for r in resume.best_solution]
+        tabu_memory.expires = dict(resume.tabu_expires)
+        tabu_memory.rng.setstate(resume.rng_state)
+        start, last_improvement, revisits = resume.iteration, resume.last_improvement, resume.revisits
+    else:
+        best_cost = current_cost
+        best_solution = [r[:] for r in current_solution]
+    if route_pool is not None:
+        route_pool.add_solution(current_solution)
+    yield [r[:] for r in best_solution], best_cost
+
+    vectorize = uses_vectorized(costs, vectorized)
+    iterations = itertools.count(start) if max_iterations is None else range(start, max_iterations)
+    next_iteration = start
+
+    def save(iteration):
+        # Η κατάσταση στην αρχή της επανάληψης iteration, ώστε η συνέχιση να την εκτελέσει πρώτη
+        save_checkpoint(checkpoint_file, TabuCheckpoint(
+            iteration=iteration, last_improvement=last_improvement, revisits=revisits,
+            current_solution=current_solution, current_cost=current_cost,
+            best_solution=best_solution, best_cost=best_cost,
+            tabu_size=tabu_size, max_iterations=max_iterations, patience=patience,
+            operators=tuple(operators or ()), avoid_revisits=avoid_revisits, vectorized=vectorized,
+            tabu_expires=list(tabu_memory.expires.items()), rng_state=tabu_memory.rng.getstate(),
+            seen=list(seen.hashes) if seen is not None else None,
+            seen_max_size=seen.max_size if seen is not None else 0,
+            optimizer_memo=list(route_optimizer.memo.values()) if route_optimizer is not None else None))
+
+    # Με ενεργή καταγραφή (instrumentation.instrument) μετρώνται και οι έλεγχοι tabu
+    probe = instrumentation.active()
+    is_tabu = tabu_memory.is_tabu
+    if probe is not None:
+        def is_tabu(a, b):
+            probe.count("tabu.lookups")
+            return tabu_memory.is_tabu(a, b)
+
+    def scan():
+        # Η καλύτερη ανταλλαγή και η καλύτερη αντικατάσταση μέλους για την τρέχουσα λύση και το τρέχον aspiration
+        # Οι ανταλλαγές αξιολογούνται με delta κόστος από τα τόξα που αλλάζουν·
+        # ο έλεγχος tabu γίνεται μόνο για κινήσεις που θα γίνονταν οι καλύτερες
+        with instrumentation.phase("tabu.inter_swap"):
+            if vectorize:
+                tabu_pairs = tabu_memory.active_pairs()
+                move = best_inter_swap_vectorized(current_solution, costs, tabu_pairs=tabu_pairs, state=state,
+                                                  candidates=candidates, aspiration=aspiration)
+            else:
+                move = best_inter_swap(current_solution, costs, is_tabu=is_tabu, state=state,
+                                       candidates=candidates, aspiration=aspiration)
+
+        # Αντικατάσταση κόμβου από μη επισκεπτόμενο μέλος της οικογένειάς του (μόνο αν δοθεί μοντέλο)
+        replace = None
+        if state is not None:
+            with instrumentation.phase("tabu.replace"):
+                if vectorize:
+                    replace = best_replace_member_vectorized(state, tabu_pairs=tabu_pairs, candidates=candidates,
+                                                             aspiration=aspiration)
+                else:
+                    replace = best_replace_member(state, is_tabu=is_tabu, candidates=candidates,
+                                                  aspiration=aspiration)
+        return move, replace
+
+    for iteration in iterations:
+        next_iteration = iteration
+        if checkpoint_file is not None and iteration != start and iteration % checkpoint_interval == 0:
+            with instrumentation.phase("tabu.checkpoint"):
+                save(iteration)
+
+        # Κριτήρια τερματισμού: χρονικό όριο και αριθμός επαναλήψεων χωρίς βελτίωση (patience)
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if patience is not None and iteration - last_improvement >= patience:
+            break
+
+        tabu_memory.iteration = iteration
+        if stats is not None:
+            stats["iterations"] = iteration + 1
+            stats["revisits"] = revisits
+        instrumentation.count("tabu.iterations")
+        # Aspiration criterion: μια tabu κίνηση επιτρέπεται αν οδηγεί σε λύση καλύτερη από την best_cost
+        aspiration = best_cost - current_cost
+
+        move, replace = scan()
+        # Αν η καλύτερη κίνηση επιστρέφει σε λύση που έχει ήδη επισκεφθεί, η κίνηση γίνεται tabu και η σάρωση
+        # επαναλαμβάνεται. Μια τέτοια λύση δεν είναι καλύτερη από την best_cost, άρα το aspiration δεν την επιτρέπει.
+        for _ in range(REVISIT_RETRIES if seen is not None else 0):
+            if move is None and replace is None:
+                break
+            if _prefers_replace(move, replace):
+                _, route_index, idx, new_node = replace
+                pair = (current_solution[route_index][idx], new_node)
+                new_hash = state.replace_member_hash(route_index, idx, new_node)
+            else:
+                _, r1, idx1, r2, idx2 = move
+                pair = (current_solution[r1][idx1], current_solution[r2][idx2])
+                new_hash = state.inter_swap_hash(r1, idx1, r2, idx2)
+            if new_hash not in seen:
+                break
+            revisits += 1
+            instrumentation.count("tabu.revisits")
+            tabu_memory.add(*pair)
+            move, replace = scan()
+
+        # Αν όλες οι κινήσεις ήταν tabu και καμία δεν ικανοποιεί το aspiration, κάνε την πρώτη εφικτή ανταλλαγή
+        fallback = move is None and replace is None
+        if fallback:
+            instrumentation.count("tabu.fallback")
+            move = first_inter_swap(current_solution, costs, state=state)
+            if move is None:
+                break  # Δεν υπάρχει (εφικτή) ανταλλαγή μεταξύ δύο διαδρομών
 
         # Ενημέρωση τρέχουσας λύσης και προσθήκη της κίνησης στη tabu λίστα
-        current_solution = best_neighbor
-        current_cost = best_neighbor_cost
-        tabu_list.append(best_move)
+        with instrumentation.phase("tabu.accept"):
+            if _prefers_replace(move, replace):
+                delta, route_index, idx, new_node = replace
+                best_move = (current_solution[route_index][idx], new_node)
+                current_cost += state.apply_replace_member(route_index, idx, new_node)
+                changed = (route_index,)
+            else:
+                delta, r1, idx1, r2, idx2 = move
+                best_move = (current_solution[r1][idx1], current_solution[r2][idx2])
+                if state is not None:
+                    current_cost += state.apply_inter_swap(r1, idx1, r2, idx2)
+                else:
+                    apply_inter_swap(current_solution, r1, idx1, r2, idx2)
+                    current_cost += delta
+                changed = (r1, r2)
+            if route_optimizer is not None:
+                # Βέλτιστη (ή βελτιωμένη) σειρά επίσκεψης των διαδρομών που άλλαξαν
+                with instrumentation.phase("tabu.reoptimize"):
+                    for route_index in changed:
+                        current_cost += route_optimizer.optimize_route(state, route_index)
+            if probe is not None and not fallback and tabu_memory.is_tabu(*best_move):
+                probe.count("tabu.aspiration")  # Tabu κίνηση που έγινε δεκτή επειδή βελτιώνει την best_cost
+            tabu_memory.add(*best_move)
+            if seen is not None:
+                seen.add(state.solution_hash())
+            if route_pool is not None:
+                for route_index in changed:
+                    route_pool.add(current_solution[route_index])
 
         # Αν η νέα λύση είναι καλύτερη από τη συνολικά καλύτερη, την αποθηκεύουμε
         if current_cost < best_cost:
-            best_solution = current_solution
+            if operators:
+                # Εντατικοποίηση γύρω από τη νέα καλύτερη
+                with instrumentation.phase("tabu.descend"):
+                    current_cost += descend(state, operators, candidates, deadline=deadline)
+                if seen is not None:
+                    seen.add(state.solution_hash())
+                if route_pool is not None:
+                    route_pool.add_solution(current_solution)
             best_cost = current_cost
+            last_improvement = iteration
+            instrumentation.improvement("tabu", iteration + 1, best_cost)
+            with instrumentation.phase("tabu.copy"):
+                best_solution = [r[:] for r in current_solution]
+            try:
+                yield best_solution, best_cost
+            except GeneratorExit:
+                # Ο καλών σταμάτησε την αναζήτηση: η επανάληψη έχει ολοκληρωθεί
+                if checkpoint_file is not None:
+                    save(iteration + 1)
+                raise
+        next_iteration = iteration + 1
+
+    if checkpoint_file is not None:
+        save(next_iteration)
 
 
+def _prefers_replace(move, replace):
+    # Η αντικατάσταση μέλους προτιμάται μόνο αν είναι φθηνότερη από την καλύτερη ανταλλαγή
+    return replace is not None and (move is None or replace[0] < move[0])
+
+
+def tabu_search(local_solution, costs, tabu_size, max_iterations, vectorized=None, model=None,
+                candidates=None, operators=None, seed=None, time_limit=None, patience=None, on_improvement=None,
+                stats=None, avoid_revisits=True, route_cache=None, route_pool=None, route_optimizer=None,
+                checkpoint_file=None, checkpoint_interval=100, resume=None):
+    """
+    Εκτελεί τον αλγόριθμο Tabu Search για να βρει βελτιωμένη λύση στο πρόβλημα.
+
+    Args:
+        local_solution: Η λύση από τον Local Search.
+        costs: Ο πίνακας κόστους του προβλήματος.
+        tabu_size: Η μέση διάρκεια tabu, δηλαδή για πόσες επαναλήψεις μια κίνηση δεν επαναλαμβάνεται
+                   (η πραγματική διάρκεια κάθε κίνησης επιλέγεται τυχαία γύρω από αυτή την τιμή).
+        max_iterations: Ο μέγιστος αριθμός επαναλήψεων που θα εκτελέσει ο αλγόριθμος
+                        (None για απεριόριστες, αρκεί να δοθεί time_limit ή patience).
+        vectorized: Αν True, οι ανταλλαγές βαθμολογούνται ανά ζεύγος routes με πράξεις πινάκων NumPy.
+                    Αν None, επιλέγεται αυτόματα όταν ο πίνακας κόστους είναι NumPy array.
+        model: Προαιρετικά το μοντέλο του προβλήματος. Αν δοθεί, η λύση κρατείται σε solution_state.Solution
+               και απορρίπτονται οι ανταλλαγές που υπερβαίνουν τη χωρητικότητα των οχημάτων. Εξετάζεται επίσης
+               η αντικατάσταση ενός κόμβου από μη επισκεπτόμενο μέλος της ίδιας οικογένειας.
+        candidates: Προαιρετικές λίστες υποψηφίων (candidates.CandidateLists) για granular tabu search:
+                    εξετάζονται μόνο ανταλλαγές που δημιουργούν τουλάχιστον ένα υποψήφιο τόξο.
+        operators: Προαιρετικά ονόματα τελεστών από operators.OPERATORS. Κάθε νέα καλύτερη λύση βελτιώνεται
+                   περαιτέρω με κάθοδο relocate / Or-opt / 2-opt / 2-opt* (με don't-look bits). Απαιτεί το μοντέλο.
+        seed: Προαιρετικός σπόρος για την τυχαία διάρκεια tabu, για επαναλήψιμες εκτελέσεις.
+        time_limit: Προαιρετικό χρονικό όριο σε δευτερόλεπτα (wall clock).
+        patience: Προαιρετικός μέγιστος αριθμός διαδοχικών επαναλήψεων χωρίς νέα καλύτερη λύση.
+        on_improvement: Προαιρετική συνάρτηση on_improvement(solution, cost) που καλείται για κάθε νέα
+                        καλύτερη λύση. Αν επιστρέψει True, η αναζήτηση σταματά.
+        stats: Προαιρετικό λεξικό όπου καταγράφεται ο αριθμός των επαναλήψεων ("iterations") και των κινήσεων
+               που απορρίφθηκαν επειδή οδηγούσαν σε λύση που είχε ήδη επισκεφθεί ("revisits").
+        avoid_revisits: Αν True (και δοθεί μοντέλο), κάθε λύση που επισκέπτεται η αναζήτηση καταγράφεται με το
+                        Zobrist hash της και οι κινήσεις που επιστρέφουν σε αυτήν γίνονται tabu, ώστε να
+                        αποφεύγονται κύκλοι μεγαλύτεροι από τη διάρκεια tabu.
+        route_cache: Προαιρετική route_cache.RouteCache, κοινή π.χ. για πολλές εκτελέσεις στο ίδιο μοντέλο·
+                     αλλιώς δημιουργείται μία για την αναζήτηση (αν avoid_revisits).
+        route_pool: Προαιρετικό polish.RoutePool όπου προστίθεται κάθε διαδρομή που επισκέπτεται η αναζήτηση,
+                    για τη μετέπειτα επανασύνθεση (polish.polish).
+        route_optimizer: Προαιρετικός route_tsp.RouteOptimizer. Μετά από κάθε κίνηση οι διαδρομές που άλλαξαν
+                         αποκτούν τη βέλτιστη σειρά επίσκεψης (Held-Karp έως 12 κόμβους, αλλιώς 2-opt / Or-opt),
+                         με απομνημόνευση ανά σύνολο κόμβων. Απαιτεί το μοντέλο.
+        checkpoint_file: Προαιρετικό αρχείο όπου αποθηκεύεται (ατομικά) όλη η κατάσταση της αναζήτησης κάθε
+                         checkpoint_interval επαναλήψεις και στο τέλος της (βλ. checkpoint.py).
+        checkpoint_interval: Οι επαναλήψεις μεταξύ δύο checkpoints.
+        resume: Προαιρετικό checkpoint.TabuCheckpoint από το οποίο συνεχίζει η αναζήτηση (βλ. resume_tabu_search).
+
+    Returns:
+        best_solution: Η καλύτερη λύση που βρέθηκε κατά την εκτέλεση του αλγορίθμου.
+        best_cost: Το κόστος της καλύτερης λύσης.
+    """
+    search = iter_tabu_search(local_solution, costs, tabu_size, max_iterations, vectorized, model, candidates,
+                              operators, seed, time_limit, patience, stats, avoid_revisits, route_cache,
+                              route_pool, route_optimizer, checkpoint_file, checkpoint_interval, resume)
+    best_solution, best_cost = next(search)  # Η αρχική λύση δεν αναφέρεται στο on_improvement
+    for best_solution, best_cost in search:
+        if on_improvement is not None and on_improvement(best_solution, best_cost):
+            search.close()
+            break
     return best_solution, best_cost
+
+
+def resume_tabu_search(checkpoint_file, model, costs=None, candidates=None, time_limit=None, on_improvement=None,
+                       stats=None, route_cache=None, route_pool=None, checkpoint_interval=100, save_to=None):
+    """
+    Συνεχίζει μια Tabu Search από το checkpoint της, με τις ρυθμίσεις που αποθηκεύτηκαν σε αυτό.
+
+    Η συνέχιση δίνει ακριβώς το ίδιο αποτέλεσμα με την αδιάκοπη εκτέλεση, εφόσον δοθούν τα ίδια costs και
+    candidates και η αναζήτηση δεν περιορίζεται από χρονικό όριο.
+
+    Args:
+        checkpoint_file: Το αρχείο checkpoint (checkpoint.save_checkpoint).
+        model: Το μοντέλο του προβλήματος.
+        costs: Ο πίνακας κόστους (προεπιλογή: model.cost_matrix).
+        candidates, time_limit, on_improvement, stats, route_cache, route_pool: Όπως στην tabu_search.
+        checkpoint_interval: Οι επαναλήψεις μεταξύ δύο νέων checkpoints.
+        save_to: Το αρχείο των νέων checkpoints (προεπιλογή: το ίδιο το checkpoint_file).
+
+    Returns:
+        best_solution: Η καλύτερη λύση που βρέθηκε κατά την εκτέλεση του αλγορίθμου.
+        best_cost: Το κόστος της καλύτερης λύσης.
+    """
+    resume = load_checkpoint(checkpoint_file)
+    costs = model.cost_matrix if costs is None else costs
+    route_optimizer = None
+    if resume.optimizer_memo is not None:
+        route_optimizer = RouteOptimizer(costs)
+    return tabu_search(resume.current_solution, costs, resume.tabu_size, resume.max_iterations, resume.vectorized,
+                       model, candidates, list(resume.operators), None, time_limit, resume.patience,
+                       on_improvement, stats, resume.avoid_revisits, route_cache, route_pool, route_optimizer,
+                       save_to if save_to is not None else checkpoint_file, checkpoint_interval, resume)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Parser import load_model  # noqa: E402
+from const_heuristic import Fcvrp  # noqa: E402
+from instance_generator import write_instance  # noqa: E402
+
+INSTANCE = "fcvrp_P-n101-k4_10_3_3.txt"
+HEADER_FIELDS = ("num_nodes", "num_fam", "num_req", "capacity", "vehicles", "fam_members", "fam_req", "fam_dem")
+
+
+@pytest.fixture(scope="session")
+def instance_file(tmp_path_factory):
+    """
+    A copy of the bundled instance, so the parse caches are written outside the repository.
+    """
+    path = tmp_path_factory.mktemp("instance") / INSTANCE
+    shutil.copy(os.path.join(ROOT, INSTANCE), path)
+    return str(path)
+
+
+def reference_parse(file_name):
+    """
+    Line-by-line parse of an instance file: header fields and the matrix as lists.
+    """
+    with open(file_name) as f:
+        lines = [line.split() for line in f if line.strip()]
+    num_nodes, num_fam, num_req, capacity, vehicles = map(int, lines[0])
+    header = (num_nodes, num_fam, num_req, capacity, vehicles,
+              list(map(int, lines[1])), list(map(int, lines[2])), list(map(int, lines[3])))
+    return header, [list(map(int, line)) for line in lines[4:4 + num_nodes + 1]]
+
+
+def assert_same_model(model, file_name):
+    header, matrix = reference_parse(file_name)
+    assert tuple(getattr(model, name) for name in HEADER_FIELDS) == header
+    assert model.cost_matrix.tolist() == matrix
+    assert [node.id for node in model.nodes] == list(range(len(matrix)))
+    assert sum(len(family.nodes) for family in model.families) == model.num_nodes
+    for family in model.families:
+        assert len(family.nodes) == model.fam_members[family.id]
+        for node in family.nodes:
+            assert node.family == family.id and node.demand == family.demand
+            assert np.shares_memory(node.costs, model.cost_matrix)
+
+
+@pytest.fixture
+def fresh_instance(instance_file, tmp_path):
+    """
+    A private copy of the bundled instance that a test may edit and cache next to.
+    """
+    path = tmp_path / os.path.basename(instance_file)
+    shutil.copy(instance_file, path)
+    return str(path)
+
+
+def set_cost(file_name, column, value):
+    """
+    Overwrite one entry of the depot's row of the cost matrix in an instance file.
+    """
+    with open(file_name) as f:
+        lines = f.read().split("\n")
+    costs = lines[4].split()
+    costs[column] = str(value)
+    lines[4] = " ".join(costs)
+    with open(file_name, "w") as f:
+        f.write("\n".join(lines))
+
+
+@pytest.fixture(scope="session")
+def model(instance_file):
+    return load_model(instance_file)
+
+
+@pytest.fixture(scope="session")
+def small_model(tmp_path_factory):
+    """
+    A generated 40-customer instance.
+    """
+    path = tmp_path_factory.mktemp("generated") / "gen_n40_f6_s1.txt"
+    write_instance(str(path), 40, 6, seed=1)
+    return load_model(str(path), use_cache=False)
+
+
+def construct(model):
+    constructor = Fcvrp(None, truck_capacity=model.capacity, max_trucks=model.vehicles, model=model)
+    constructor.visit_nodes()
+    return [list(route) for route in constructor.solution]
+
+
+@pytest.fixture(scope="session")
+def constructed(model):
+    """
+    The construction heuristic's solution of the bundled instance (routes without the depot).
+    """
+    return construct(model)
+
+
+def shuffled(solution, seed):
+    """
+    Copy of a solution with the order of every route shuffled.
+    """
+    rng = random.Random(seed)
+    routes = [list(route) for route in solution]
+    for route in routes:
+        rng.shuffle(route)
+    return routes
+
+
+def route_cost(costs, route):
+    """
+    Reference cost of a route (depot excluded), summed arc by arc; 0 for an empty route.
+    """
+    if not route:
+        return 0
+    path = [0] + list(route) + [0]
+    return sum(int(costs[a][b]) for a, b in zip(path, path[1:]))
+
+
+def solution_cost(costs, solution):
+    return sum(route_cost(costs, route) for route in solution)
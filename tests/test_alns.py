@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+import pytest
+
+from alns import DESTROY, REPAIR_OPERATORS, _candidates, alns_search, repair
+from conftest import route_cost, solution_cost
+from insertion_cache import InsertionCache
+from solution_state import Solution
+
+
+def make_state(model, constructed):
+    routes = [list(route) for route in constructed] + [[] for _ in range(model.vehicles - len(constructed))]
+    return Solution(model, routes)
+
+
+def context(model, state):
+    matrix = np.asarray(model.cost_matrix)
+    return {"matrix": matrix, "max_cost": matrix.max(),
+            "families": np.array([-1] + state.node_family[1:], dtype=np.intp)}
+
+
+def assert_matches_recompute(state):
+    fresh = Solution(state.model, state.routes, state.costs)
+    for name in ("route_costs", "route_loads", "family_visits", "in_solution", "total_cost"):
+        assert getattr(state, name) == getattr(fresh, name), name
+
+
+@pytest.mark.parametrize("name", sorted(DESTROY))
+@pytest.mark.parametrize("seed", range(3))
+def test_destroy_removes_what_it_reports(model, constructed, name, seed):
+    state = make_state(model, constructed)
+    before = {node for route in state.routes for node in route}
+    removed = DESTROY[name](state, 10, random.Random(seed), context(model, state))
+    after = {node for route in state.routes for node in route}
+    assert len(set(removed)) == len(removed) == len(before - after)
+    assert set(removed) == before - after
+    if name == "family":
+        family = state.node_family[removed[0]]
+        assert all(state.node_family[node] == family for node in removed)
+        assert state.family_visits[family] == 0
+    else:
+        assert len(removed) == 10
+    assert_matches_recompute(state)
+
+
+@pytest.mark.parametrize("name", REPAIR_OPERATORS)
+@pytest.mark.parametrize("destroy", sorted(DESTROY))
+def test_repair_restores_a_feasible_solution(model, constructed, name, destroy):
+    state = make_state(model, constructed)
+    DESTROY[destroy](state, 15, random.Random(1), context(model, state))
+    cache = InsertionCache(model.cost_matrix, state.routes, state.demands, model.capacity)
+    assert repair(state, cache, context(model, state), {"greedy": 1, "regret2": 2, "regret3": 3}[name])
+    assert_matches_recompute(state)
+    assert state.is_feasible()
+    assert _candidates(state).size == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_repair_takes_the_cheapest_insertion(model, constructed, seed):
+    state = make_state(model, constructed)
+    DESTROY["random"](state, 1, random.Random(seed), context(model, state))
+    expected = min(
+        route_cost(state.costs, route[:k] + [node] + route[k:]) - route_cost(state.costs, route)
+        for node in _candidates(state).tolist()
+        for route_index, route in enumerate(state.routes)
+        if state.route_loads[route_index] + state.demands[node] <= model.capacity
+        for k in range(len(route) + 1))
+    before = state.total_cost
+    cache = InsertionCache(model.cost_matrix, state.routes, state.demands, model.capacity)
+    assert repair(state, cache, context(model, state))
+    assert state.total_cost - before == expected
+
+
+def test_search_result_is_feasible_and_reproducible(model, constructed):
+    stats = {}
+    solution, cost = alns_search(constructed, model, max_iterations=150, seed=4, stats=stats)
+    assert cost == solution_cost(model.cost_matrix, solution)
+    assert Solution(model, solution).is_feasible()
+    assert cost <= solution_cost(model.cost_matrix, constructed)
+    assert stats["iterations"] == 150
+    assert alns_search(constructed, model, max_iterations=150, seed=4) == (solution, cost)
+
+
+def test_improvements_are_streamed_and_can_stop_the_search(model, constructed):
+    reported = []
+
+    def on_improvement(solution, cost):
+        assert cost == solution_cost(model.cost_matrix, solution)
+        reported.append(cost)
+        return len(reported) == 3
+
+    solution, cost = alns_search(constructed, model, max_iterations=1000, seed=4, on_improvement=on_improvement)
+    assert len(reported) == 3 and reported == sorted(reported, reverse=True)
+    assert cost == reported[-1]
+
+
+def test_invalid_arguments_are_rejected(model, constructed):
+    with pytest.raises(ValueError):
+        alns_search(constructed, model, max_iterations=None)
+    with pytest.raises(ValueError):
+        alns_search(constructed, model, destroy_operators=("cluster",))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+import instrumentation
+from conftest import solution_cost
+from fcvrp import local_search, solve
+from tabus import tabu_search
+
+
+@pytest.fixture(scope="module")
+def local(model, constructed):
+    return local_search(constructed, model.cost_matrix, model=model)[0]
+
+
+def test_solve_streams_strictly_better_incumbents(model):
+    reported = []
+
+    def on_improvement(solution, cost):
+        assert cost == solution_cost(model.cost_matrix, solution)
+        reported.append(cost)
+
+    result = solve(model, max_iterations=150, seed=4, on_improvement=on_improvement)
+    assert reported[0] == result["initial_cost"]
+    assert reported == sorted(set(reported), reverse=True)
+    assert reported[-1] == result["cost"] == solution_cost(model.cost_matrix, result["solution"])
+    assert result["cost"] <= result["local_cost"] <= result["initial_cost"]
+
+
+@pytest.mark.parametrize("stop_after", [1, 3, 8])
+def test_callback_stops_the_pipeline(model, stop_after):
+    reported = []
+
+    def on_improvement(solution, cost):
+        reported.append((solution, cost))
+        return len(reported) == stop_after
+
+    result = solve(model, max_iterations=150, seed=4, on_improvement=on_improvement)
+    assert len(reported) == stop_after
+    assert (result["solution"], result["cost"]) == reported[-1]
+
+
+def test_callback_stops_the_tabu_search(model, local):
+    reported = []
+    solution, cost = tabu_search(local, model.cost_matrix, 20, 500, model=model, seed=4,
+                                 on_improvement=lambda solution, cost: reported.append(cost) or len(reported) == 2)
+    assert len(reported) == 2 and cost == reported[-1]
+    assert cost == solution_cost(model.cost_matrix, solution)
+
+
+@pytest.mark.parametrize("time_limit", [0.05, 0.3])
+def test_time_limit_bounds_an_unlimited_search(model, local, time_limit):
+    start = time.perf_counter()
+    solution, cost = tabu_search(local, model.cost_matrix, 20, None, model=model, seed=4, time_limit=time_limit)
+    assert time.perf_counter() - start < time_limit + 0.5
+    assert cost == solution_cost(model.cost_matrix, solution)
+
+
+def test_time_limit_bounds_the_pipeline(model):
+    start = time.perf_counter()
+    result = solve(model, time_limit=0.3, max_iterations=None, seed=4)
+    assert time.perf_counter() - start < 0.8
+    assert result["cost"] == solution_cost(model.cost_matrix, result["solution"])
+
+
+@pytest.mark.parametrize("patience", [5, 20])
+def test_patience_stops_after_iterations_without_improvement(model, local, patience):
+    with instrumentation.instrument() as probe:
+        full = tabu_search(local, model.cost_matrix, 20, 400, model=model, seed=4)
+    improvements = [iteration - 1 for _, stage, iteration, _ in probe.trajectory if stage == "tabu"]
+
+    # The first iteration at least `patience` past the last improvement before it
+    last = 0
+    for iteration in range(400):
+        if iteration - last >= patience:
+            break
+        if iteration in improvements:
+            last = iteration
+    stats = {}
+    solution, cost = tabu_search(local, model.cost_matrix, 20, None, model=model, seed=4, patience=patience,
+                                 stats=stats)
+    assert improvements and iteration < 400
+    assert stats["iterations"] == iteration
+    expected = [c for _, stage, it, c in probe.trajectory if stage == "tabu" and it - 1 < iteration]
+    assert cost == (expected[-1] if expected else solution_cost(model.cost_matrix, local))
+    assert cost >= full[1]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+import random
+
+import pytest
+
+from SolutionValidator import validate_solution
+from batch_validate import (ModelArrays, split_routes, validate_batch, validate_line, validate_routes, write_csv,
+                            write_json_lines)
+from conftest import shuffled
+
+
+def reference(model, routes):
+    valid, report = validate_solution(model, routes)
+    report["family_visits"] = [report["family_visits"][family.id] for family in model.families]
+    return valid, report
+
+
+def with_depot(solution):
+    return [[0] + route + [0] for route in solution]
+
+
+def variants(model, constructed):
+    """
+    Valid, infeasible and malformed solutions of the bundled instance.
+    """
+    rng = random.Random(0)
+    solution = with_depot(constructed)
+    yield solution
+    yield with_depot(shuffled(constructed, 1))
+    yield with_depot([constructed[0] + constructed[1]] + constructed[2:])  # Over capacity
+    yield with_depot([route[:-2] for route in constructed])  # Missing family visits
+    yield with_depot([route[:1] for route in constructed] + [route[1:] for route in constructed])  # Fleet
+    yield solution[:1] + [[0, 0]] + solution[1:]  # Route without customers
+    yield [solution[0][:-1]] + solution[1:]  # No depot at the end
+    yield [solution[0][1:]] + solution[1:]  # No depot at the start
+    yield [solution[0][:3] + [0] + solution[0][3:]] + solution[1:]  # Depot inside a route
+    yield [solution[0][:3] + [0, 0] + solution[0][3:]] + solution[1:]
+    yield [solution[0] + solution[1]] + solution[2:]  # Two routes joined through the depot
+    yield [solution[0][:2] + [model.num_nodes + 1] + solution[0][2:]] + solution[1:]  # Unknown node
+    yield [solution[0][:2] + [solution[1][1]] + solution[0][2:]] + solution[1:]  # Visited twice
+    yield []
+    for _ in range(20):
+        nodes = rng.sample(range(1, model.num_nodes + 1), rng.randint(1, model.num_nodes))
+        cuts = sorted(rng.sample(range(1, len(nodes)), min(len(nodes) - 1, rng.randint(0, 5))))
+        yield [[0] + nodes[a:b] + [0] for a, b in zip([0] + cuts, cuts + [len(nodes)])]
+
+
+def test_vectorised_validation_equals_reference(model, constructed):
+    arrays = ModelArrays(model)
+    outcomes = set()
+    for routes in variants(model, constructed):
+        expected = reference(model, routes)
+        assert validate_routes(arrays, routes) == expected, routes
+        outcomes.add(expected[0])
+    assert outcomes == {True, False}
+
+
+def test_split_routes_round_trip(constructed):
+    routes = with_depot(constructed)
+    line = [0] + [node for route in constructed for node in route + [0]]
+    assert split_routes(line) == routes
+    assert split_routes([5, 3, 0, 0, 7, 2]) == [[0, 5, 3, 0], [0, 7, 2, 0]]
+    assert split_routes([0, 0]) == []
+
+
+def write_solution(path, routes):
+    with open(path, "w") as f:
+        for route in routes:
+            f.write(" ".join(map(str, route)) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_of_files_keeps_input_order(tmp_path, model, constructed, workers):
+    solutions = list(variants(model, constructed))
+    files = [write_solution(tmp_path / f"s{i}.txt", routes) for i, routes in enumerate(solutions)]
+    files.append(str(tmp_path / "missing.txt"))
+    summaries = list(validate_batch(model, iter(files), workers=workers, batch_size=4, chunksize=2))
+
+    assert [summary["solution"] for summary in summaries] == files
+    for summary, routes in zip(summaries, solutions):
+        valid, report = reference(model, [route for route in routes if route])
+        assert (summary["valid"], summary["cost"], summary["errors"]) == (valid, report["total_cost"],
+                                                                        report["errors"])
+    assert not summaries[-1]["valid"] and summaries[-1]["errors"][0].startswith("Unreadable solution")
+
+
+def test_batch_of_lines(model, constructed):
+    line = " ".join(map(str, [0] + [node for route in constructed for node in route + [0]]))
+    items = [("a", line), ("b", line + " x")]
+    first, second = validate_batch(model, items, task=validate_line, workers=1)
+    assert first["valid"] and first["cost"] == reference(model, with_depot(constructed))[1]["total_cost"]
+    assert not second["valid"] and second["cost"] is None
+
+
+def test_csv_and_json_round_trip(model, constructed):
+    summaries = list(validate_batch(model, [("a", "0 1 2 0"), ("b", " ".join(
+        map(str, [0] + [node for route in constructed for node in route + [0]])))],
+        task=validate_line, workers=1))
+
+    stream = io.StringIO()
+    assert list(write_json_lines(summaries, stream)) == summaries
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == summaries
+
+    stream = io.StringIO()
+    assert list(write_csv(summaries, stream)) == summaries
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    for row, summary in zip(rows, summaries):
+        assert row["valid"] == str(summary["valid"]) and row["cost"] == str(summary["cost"])
+        assert [int(value) for value in row["route_costs"].split()] == summary["route_costs"]
+        assert row["errors"].split("; ") == (summary["errors"] or [""])
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from Parser import load_model
+from benchmark import _parse_size, run_suite
+from instance_generator import generate_families, instance_name, write_instance
+
+
+@pytest.mark.parametrize("num_nodes, num_families, seed", [(10, 1, 0), (40, 6, 1), (300, 20, 2)])
+def test_instance_matches_its_points(tmp_path, num_nodes, num_families, seed):
+    path = str(tmp_path / instance_name(num_nodes, num_families, seed))
+    write_instance(path, num_nodes, num_families, seed, chunk_rows=7)
+    model = load_model(path, use_cache=False)
+
+    rng = np.random.default_rng(seed)
+    fam_members, fam_req, fam_dem = generate_families(num_nodes, num_families, rng)
+    points = rng.uniform(0, 100, size=(num_nodes + 1, 2))
+    expected = np.rint(np.linalg.norm(points[:, None] - points[None, :], axis=2)).astype(np.int64)
+    np.fill_diagonal(expected, -1)
+
+    assert (model.fam_members, model.fam_req, model.fam_dem) == (fam_members, fam_req, fam_dem)
+    assert np.array_equal(model.cost_matrix, expected)
+    assert model.num_nodes == sum(fam_members) == num_nodes
+    assert model.num_req == sum(fam_req)
+    assert all(1 <= req <= members for req, members in zip(fam_req, fam_members))
+    assert all(5 <= demand <= 20 for demand in fam_dem)
+    required = sum(req * dem for req, dem in zip(fam_req, fam_dem))
+    assert model.vehicles == max(1, math.ceil(required / (400 * 0.9)))
+
+
+def test_same_arguments_give_the_same_file(tmp_path):
+    first = write_instance(str(tmp_path / "a.txt"), 50, 5, seed=3, chunk_rows=256)
+    second = write_instance(str(tmp_path / "b.txt"), 50, 5, seed=3, chunk_rows=4)
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_invalid_arguments_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_instance(str(tmp_path / "x.txt"), 5, 6)
+    with pytest.raises(ValueError):
+        write_instance(str(tmp_path / "x.txt"), 20, 3, capacity=10)
+    assert not os.listdir(tmp_path)
+
+
+def test_suite_results_are_valid_json(tmp_path):
+    suite = run_suite([(30, 4)], seed=1, directory=str(tmp_path), max_iterations=50, trace_memory=True)
+    assert json.loads(json.dumps(suite)) == suite
+    (result,) = suite["results"]
+    assert result["valid"] and not result["errors"]
+    assert result["cost"] == result["tabu_search"]["cost"]
+    assert result["cost"] <= result["local_search"]["cost"] <= result["construction"]["cost"]
+    assert result["lower_bound"] <= result["cost"]
+    assert result["gap"] >= 0
+    assert result["tabu_search"]["iterations"] == 50
+    for stage in ("load", "construction", "local_search", "tabu_search"):
+        assert result[stage]["peak_memory"] > 0
+
+    model = load_model(str(tmp_path / result["instance"]), use_cache=False)
+    assert (model.num_req, model.vehicles) == (result["num_required"], result["vehicles"])
+
+
+def test_suite_reuses_generated_instances(tmp_path):
+    run_suite([(20, 3)], directory=str(tmp_path), max_iterations=5, trace_memory=False)
+    (name,) = [name for name in os.listdir(tmp_path) if name.endswith(".txt")]
+    path = str(tmp_path / name)
+    os.utime(path, (0, 0))
+    suite = run_suite([(20, 3)], directory=str(tmp_path), max_iterations=5, trace_memory=False)
+    assert os.stat(path).st_mtime == 0
+    assert suite["results"][0]["load"]["peak_memory"] is None
+
+
+def test_parse_size():
+    assert _parse_size("500:25") == (500, 25)
+    with pytest.raises(argparse.ArgumentTypeError):
+        _parse_size("500")
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import math
+
+import pytest
+
+import bounds
+from Parser import load_model
+from bounds import GapStopper, assignment_bound, gap, lower_bound, selection_bound
+from conftest import solution_cost
+from instance_generator import write_instance
+
+
+def optimum(model):
+    """
+    Exact optimum of a tiny instance: the cheapest tour of every set of customers,
+    then the cheapest split of a visited set into at most model.vehicles routes.
+    """
+    costs = model.cost_matrix.tolist()
+    n = model.num_nodes
+    demand = [model.nodes[node].demand for node in range(n + 1)]
+    family = [model.nodes[node].family for node in range(n + 1)]
+    full = 1 << n
+
+    # Held-Karp from the depot: path[mask][last] is the cheapest path 0 -> ... -> last over mask
+    path = [[float("inf")] * (n + 1) for _ in range(full)]
+    for node in range(1, n + 1):
+        path[1 << (node - 1)][node] = costs[0][node]
+    for mask in range(1, full):
+        for last in range(1, n + 1):
+            value = path[mask][last]
+            if value == float("inf"):
+                continue
+            for node in range(1, n + 1):
+                bit = 1 << (node - 1)
+                if not mask & bit and value + costs[last][node] < path[mask | bit][node]:
+                    path[mask | bit][node] = value + costs[last][node]
+    members = [[node for node in range(1, n + 1) if mask >> (node - 1) & 1] for mask in range(full)]
+    tour = [min(path[mask][last] + costs[last][0] for last in members[mask]) if mask else 0 for mask in range(full)]
+    route = [tour[mask] if sum(demand[node] for node in members[mask]) <= model.capacity else float("inf")
+             for mask in range(full)]
+
+    split = route[:]
+    split[0] = 0
+    for _ in range(model.vehicles - 1):
+        merged = split[:]
+        for mask in range(1, full):
+            sub = mask
+            while sub:
+                merged[mask] = min(merged[mask], route[sub] + split[mask ^ sub])
+                sub = (sub - 1) & mask
+        split = merged
+
+    def feasible(mask):
+        visits = [0] * model.num_fam
+        for node in members[mask]:
+            visits[family[node]] += 1
+        return all(visit >= required for visit, required in zip(visits, model.fam_req))
+
+    return min(split[mask] for mask in range(1, full) if feasible(mask))
+
+
+@pytest.fixture(scope="module", params=[(7, 2, 0), (8, 3, 1), (8, 2, 2), (9, 3, 3)])
+def tiny_model(request, tmp_path_factory):
+    num_nodes, num_families, seed = request.param
+    path = tmp_path_factory.mktemp("tiny") / f"gen_n{num_nodes}_f{num_families}_s{seed}.txt"
+    write_instance(str(path), num_nodes, num_families, seed=seed, capacity=40)
+    return load_model(str(path), use_cache=False)
+
+
+def test_bounds_do_not_exceed_optimum(tiny_model):
+    best = optimum(tiny_model)
+    assert tiny_model.vehicles > 1
+    assert selection_bound(tiny_model) <= best
+    assert assignment_bound(tiny_model) <= best
+    assert assignment_bound(tiny_model, upper_bound=best) <= best
+    assert lower_bound(tiny_model, upper_bound=best) <= best
+
+
+def test_bounds_below_known_solution(model, constructed):
+    cost = solution_cost(model.cost_matrix, constructed)
+    stats = {}
+    bound = assignment_bound(model, upper_bound=cost, stats=stats)
+    assert isinstance(bound, int)
+    assert 0 < bound <= cost
+    assert 1 <= stats["iterations"] <= 100
+    assert bound == math.ceil(stats["bound"] - 1e-6)
+    assert selection_bound(model) <= lower_bound(model, upper_bound=cost) <= cost
+
+
+def test_chunked_minima_equal_whole_matrix(model, monkeypatch):
+    selection = selection_bound(model)
+    assignment = assignment_bound(model, iterations=20)
+    monkeypatch.setattr(bounds, "CHUNK_ROWS", 7)
+    assert selection_bound(model) == selection
+    assert assignment_bound(model, iterations=20) == assignment
+
+
+def test_gap():
+    assert gap(100, 90) == pytest.approx(0.1)
+    assert gap(100, 100) == 0
+    assert gap(90, 100) == 0
+    assert gap(0, 0) == 0
+
+
+def test_gap_stopper():
+    calls = []
+
+    def on_improvement(solution, cost):
+        calls.append(cost)
+        return cost == 150
+
+    stopper = GapStopper(90, 0.1, on_improvement)
+    assert stopper.gap is None
+    assert stopper([], 200) is False
+    assert stopper.gap == pytest.approx(0.55)
+    assert stopper([], 150) is True
+    assert stopper([], 100) is True
+    assert stopper.gap == pytest.approx(0.1)
+    assert calls == [200, 150, 100]
+    assert GapStopper(90, 0.1)([], 200) is False
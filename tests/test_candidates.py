@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from candidates import CandidateLists, build_candidate_lists
+from conftest import shuffled
+from moves import (_intra_swap_arcs, best_inter_swap, best_inter_swap_vectorized, best_intra_swap,
+                   best_intra_swap_vectorized, intra_swap_delta)
+
+
+@pytest.mark.parametrize("k", [1, 5, 10])
+def test_neighbours_are_the_k_nearest(model, k):
+    costs = np.asarray(model.cost_matrix, dtype=np.int64)
+    lists = CandidateLists(costs, k)
+    for u in range(costs.shape[0]):
+        row = np.delete(costs[u], u)
+        assert sorted(costs[u, lists.neighbours[u]]) == sorted(row)[:k]
+        assert u not in lists.neighbours[u]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1024])
+def test_is_candidate_equals_dense_matrix(model, chunk_rows):
+    costs = np.asarray(model.cost_matrix)
+    lists = CandidateLists(costs, 5, chunk_rows=chunk_rows)
+    assert np.array_equal(lists.neighbours, CandidateLists(costs, 5).neighbours)
+    n = costs.shape[0]
+    dense = np.zeros((n, n), dtype=bool)
+    dense[np.repeat(np.arange(n), lists.k), lists.neighbours.ravel()] = True
+    dense |= dense.T
+    u, v = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    assert np.array_equal(lists.is_candidate(u, v), dense)
+    assert lists.arc_keys.size == int(dense.sum())
+
+
+def test_any_candidate_agrees_with_is_candidate(model):
+    lists = build_candidate_lists(model, 5)
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        arcs = [tuple(int(x) for x in rng.integers(0, lists.size, 2)) for _ in range(3)]
+        assert lists.any_candidate(*arcs) == any(bool(lists.is_candidate(u, v)) for u, v in arcs)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_granular_intra_scan_is_the_filtered_minimum(model, constructed, seed):
+    lists = build_candidate_lists(model, 5)
+    solution = shuffled(constructed, seed)
+    costs = model.cost_matrix
+    expected = min(intra_swap_delta(route, i, j, costs)
+                   for route in solution for i in range(len(route)) for j in range(i + 1, len(route))
+                   if lists.any_candidate(*_intra_swap_arcs(route, i, j)))
+    best = best_intra_swap(solution, costs, candidates=lists)
+    assert best[0] == expected
+    route = solution[best[1]]
+    assert lists.any_candidate(*_intra_swap_arcs(route, best[2], best[3]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_granular_vectorised_scans_equal_scalar_scans(model, constructed, seed):
+    lists = build_candidate_lists(model, 5)
+    solution = shuffled(constructed, seed)
+    costs = np.asarray(model.cost_matrix)
+    assert (best_intra_swap_vectorized(solution, costs, candidates=lists)[0]
+            == best_intra_swap(solution, costs, candidates=lists)[0])
+    assert (best_inter_swap_vectorized(solution, costs, candidates=lists)[0]
+            == best_inter_swap(solution, costs, candidates=lists)[0])
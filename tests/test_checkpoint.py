@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+import pytest
+
+import checkpoint
+import tabus
+from checkpoint import TabuCheckpoint, decode, encode, load_checkpoint, save_checkpoint
+from fcvrp import OPERATORS, local_search
+from route_tsp import RouteOptimizer
+from tabus import iter_tabu_search, resume_tabu_search, tabu_search
+
+
+class Killed(BaseException):
+    pass
+
+
+def sample_checkpoint(**changes):
+    rng = random.Random(5)
+    rng.gauss(0, 1)
+    fields = dict(
+        iteration=120, last_improvement=97, revisits=4,
+        current_solution=[[5, 3, 9], [], [70000, 1]], current_cost=612,
+        best_solution=[[3, 5, 9], [1, 70000]], best_cost=598,
+        tabu_size=50, max_iterations=600, patience=None, operators=("relocate", "two_opt"),
+        avoid_revisits=True, vectorized=None,
+        tabu_expires=[((3, 9), 131), ((1, 5), 140)], rng_state=rng.getstate(),
+        seen=[0, 1 << 63, (1 << 64) - 1], seen_max_size=1 << 18,
+        optimizer_memo=[((5, 3, 9), 210, True), ((1, 70000, 2, 4), 388, False)],
+    )
+    fields.update(changes)
+    return TabuCheckpoint(**fields)
+
+
+@pytest.fixture(scope="module")
+def local_solution(model, constructed):
+    return local_search(constructed, model.cost_matrix, model=model, operators=OPERATORS)[0]
+
+
+@pytest.mark.parametrize("changes", [
+    {},
+    dict(patience=30, max_iterations=None, vectorized=False, seen=None, optimizer_memo=None, operators=()),
+    dict(current_cost=612.5, best_cost=598.25, rng_state=random.Random(1).getstate(), avoid_revisits=False),
+])
+def test_encode_then_decode_round_trips(changes):
+    original = sample_checkpoint(**changes)
+    restored = decode(encode(original))
+    assert restored == original
+    assert type(restored.best_cost) is type(original.best_cost)
+
+
+def test_corrupted_checkpoints_are_rejected():
+    data = encode(sample_checkpoint())
+    flipped = bytearray(data)
+    flipped[len(data) // 2] ^= 0xFF
+    for broken in (bytes(flipped), data[:-1], data[:10], b""):
+        with pytest.raises(ValueError):
+            decode(broken)
+
+
+def test_save_then_load_round_trips(tmp_path, monkeypatch):
+    path = str(tmp_path / "search.ckpt")
+    first = sample_checkpoint()
+    save_checkpoint(path, first)
+    assert load_checkpoint(path) == first
+
+    # A save that fails half way leaves the previous checkpoint and no temporary file
+    def failing_encode(ckpt):
+        raise Killed
+
+    monkeypatch.setattr(checkpoint, "encode", failing_encode)
+    with pytest.raises(Killed):
+        save_checkpoint(path, sample_checkpoint(iteration=220))
+    assert load_checkpoint(path) == first
+    assert os.listdir(tmp_path) == ["search.ckpt"]
+
+
+@pytest.mark.parametrize("kill_at", [50, 150])
+@pytest.mark.parametrize("reoptimize", [False, True])
+def test_resume_equals_uninterrupted_run(model, local_solution, tmp_path, monkeypatch, kill_at, reoptimize):
+    costs = model.cost_matrix
+
+    def run(**kwargs):
+        optimizer = RouteOptimizer(costs) if reoptimize else None
+        return tabu_search(local_solution, costs, 50, 200, model=model, operators=OPERATORS, seed=7,
+                           route_optimizer=optimizer, checkpoint_interval=50, **kwargs)
+
+    reference = str(tmp_path / "reference.ckpt")
+    expected = run(checkpoint_file=reference)
+
+    def killing_save(path, ckpt):
+        save_checkpoint(path, ckpt)
+        if ckpt.iteration == kill_at:
+            raise Killed
+
+    path = str(tmp_path / "killed.ckpt")
+    monkeypatch.setattr(tabus, "save_checkpoint", killing_save)
+    with pytest.raises(Killed):
+        run(checkpoint_file=path)
+    monkeypatch.setattr(tabus, "save_checkpoint", save_checkpoint)
+    assert load_checkpoint(path).iteration == kill_at
+
+    stats = {}
+    assert resume_tabu_search(path, model, stats=stats, checkpoint_interval=50) == expected
+    # The final state of the resumed run is the uninterrupted run's, byte for byte
+    with open(path, "rb") as resumed, open(reference, "rb") as uninterrupted:
+        assert resumed.read() == uninterrupted.read()
+
+
+def test_closing_the_generator_saves_a_checkpoint(model, local_solution, tmp_path):
+    path = str(tmp_path / "search.ckpt")
+    search = iter_tabu_search(local_solution, model.cost_matrix, 50, 200, model=model, operators=OPERATORS, seed=7,
+                              checkpoint_file=path)
+    first = next(search)
+    next(search)
+    search.close()
+    saved = load_checkpoint(path)
+    assert 0 < saved.iteration < 200
+    assert saved.best_cost < first[1]
+    assert saved.current_solution and saved.best_solution
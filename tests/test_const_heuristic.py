@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import copy
+
+import numpy as np
+import pytest
+
+from Parser import load_model
+from SolutionValidator import validate_solution
+from const_heuristic import Fcvrp
+from conftest import route_cost
+from instance_generator import write_instance
+
+
+def build(model, **kwargs):
+    constructor = Fcvrp(None, model=model, **kwargs)
+    constructor.visit_nodes()
+    return constructor
+
+
+def assert_feasible(model, solution):
+    valid, report = validate_solution(model, [[0] + route + [0] for route in solution])
+    assert valid, report["errors"]
+    for family in model.families:
+        assert report["family_visits"][family.id] == family.required_visits
+
+
+def replay_nearest(model, solution, capacity):
+    """
+    Check every route is the nearest-feasible-neighbour walk from the depot.
+    """
+    costs = np.asarray(model.cost_matrix)
+    remaining = list(model.fam_req)
+    visited = {0}
+    for route in solution:
+        current, load = 0, 0
+        for node in route:
+            eligible = [other.id for other in model.customers
+                        if other.id not in visited and remaining[other.family] > 0
+                        and load + other.demand <= capacity]
+            assert costs[current, node] == min(costs[current, eligible])
+            visited.add(node)
+            remaining[model.nodes[node].family] -= 1
+            load += model.nodes[node].demand
+            current = node
+
+
+@pytest.fixture(scope="module", params=[(30, 4, 0), (60, 8, 1), (120, 12, 2)])
+def generated(request, tmp_path_factory):
+    num_nodes, num_families, seed = request.param
+    path = tmp_path_factory.mktemp("construction") / f"gen_{num_nodes}_{num_families}_{seed}.txt"
+    write_instance(str(path), num_nodes, num_families, seed=seed)
+    return load_model(str(path), use_cache=False)
+
+
+def test_bundled_instance(model):
+    constructor = build(model)
+    assert_feasible(model, constructor.solution)
+    replay_nearest(model, constructor.solution, model.capacity)
+    assert sum(route_cost(model.cost_matrix, route) for route in constructor.solution) == 714
+
+
+def test_generated_instances_follow_their_model(generated):
+    constructor = build(generated)
+    assert constructor.TRUCK_CAPACITY == generated.capacity
+    assert constructor.MAX_TRUCKS == generated.vehicles
+    assert constructor.group_sizes == generated.fam_req
+    assert constructor.group_unit_demands == generated.fam_dem
+    assert_feasible(generated, constructor.solution)
+
+
+def test_nearest_routes_are_greedy(generated):
+    constructor = Fcvrp(None, model=generated)
+    assert constructor.visit_nearest_nodes()
+    constructor.build_solution()
+    replay_nearest(generated, constructor.solution, generated.capacity)
+
+
+def test_explicit_fleet_overrides_model(model):
+    capacity = model.capacity // 2
+    max_trucks = model.vehicles * 3
+    constructor = build(model, truck_capacity=capacity, max_trucks=max_trucks)
+    fleet = copy.copy(model)
+    fleet.capacity, fleet.vehicles = capacity, max_trucks
+    assert_feasible(fleet, constructor.solution)
+    replay_nearest(model, constructor.solution, capacity)
+
+
+def test_packing_fallback_serves_every_family(model, monkeypatch):
+    monkeypatch.setattr(Fcvrp, "visit_nearest_nodes", lambda self: False)
+    constructor = build(model)
+    assert_feasible(model, constructor.solution)
+    demands = [model.fam_req[family] * model.fam_dem[family] for family in range(model.num_fam)]
+    order = [model.nodes[node].family for route in constructor.solution for node in route]
+    first_seen = list(dict.fromkeys(order))
+    assert [demands[family] for family in first_seen] == sorted(demands, reverse=True)
+
+
+def test_unknown_method_is_rejected(model):
+    with pytest.raises(ValueError):
+        Fcvrp(None, model=model).visit_nodes(method="random")
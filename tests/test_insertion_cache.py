@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+import pytest
+
+import insertion_cache
+from SolutionValidator import validate_solution
+from const_heuristic import Fcvrp
+from insertion_cache import InsertionCache
+
+
+def insertion_costs(costs, route, node):
+    """
+    Cost of inserting node at every position of route, from the arcs.
+    """
+    path = [0] + route + [0]
+    return [int(costs[u][node]) + int(costs[node][v]) - (0 if u == v else int(costs[u][v]))
+            for u, v in zip(path, path[1:])]
+
+
+def assert_matches_brute_force(cache, costs, demands, capacity, columns):
+    cache.refresh()
+    for route_index, route in enumerate(cache.routes):
+        for node in columns:
+            expected = sorted(insertion_costs(costs, route, node))
+            assert cache.best_cost[route_index, node] == expected[0]
+            assert cache.second_cost[route_index, node] == (expected[1] if len(expected) > 1 else np.inf)
+            positions = insertion_costs(costs, route, node)
+            assert positions[cache.best_pos[route_index, node]] == expected[0]
+            if len(expected) > 1:
+                assert positions[cache.second_pos[route_index, node]] == expected[1]
+                assert cache.second_pos[route_index, node] != cache.best_pos[route_index, node]
+        assert cache.loads[route_index] == sum(demands[node] for node in route)
+
+    feasible, routes = cache.cheapest()
+    for node in columns:
+        options = [min(insertion_costs(costs, route, node)) for route_index, route in enumerate(cache.routes)
+                   if cache.loads[route_index] + demands[node] <= capacity]
+        assert feasible[node] == (min(options) if options else np.inf)
+        if options:
+            assert cache.best_cost[routes[node], node] == feasible[node]
+
+
+@pytest.mark.parametrize("full_recompute_size", [0, insertion_cache.FULL_RECOMPUTE_SIZE, 1 << 30])
+@pytest.mark.parametrize("seed", range(3))
+def test_cache_follows_inserts_and_removals(model, constructed, monkeypatch, full_recompute_size, seed):
+    monkeypatch.setattr(insertion_cache, "FULL_RECOMPUTE_SIZE", full_recompute_size)
+    rng = random.Random(seed)
+    costs = np.asarray(model.cost_matrix)
+    demands = [node.demand for node in model.nodes]
+    capacity = model.capacity * 2
+    visited = {node for route in constructed for node in route}
+    outside = [node for node in range(1, model.num_nodes + 1) if node not in visited]
+    routes = [route[:len(route) // 2] for route in constructed] + [[]]
+    outside += [node for route in constructed for node in route[len(route) // 2:]]
+    rng.shuffle(outside)
+
+    cache = InsertionCache(costs, routes, demands, capacity)
+    columns = rng.sample(range(1, model.num_nodes + 1), 15)
+    cache.cheapest()
+    for step in range(60):
+        action = rng.random()
+        if action < 0.7 and outside:
+            node = outside.pop()
+            route_index = rng.randrange(len(routes))
+            position = cache.position(route_index, node) if rng.random() < 0.5 else rng.randint(
+                0, len(routes[route_index]))
+            routes[route_index].insert(position, node)
+            cache.insert(route_index, position, node)
+        elif action < 0.85:
+            route_index = rng.randrange(len(routes))
+            if routes[route_index]:
+                outside.append(routes[route_index].pop(rng.randrange(len(routes[route_index]))))
+                cache.invalidate(route_index)
+        else:
+            # The owner switches to an equal copy of the routes
+            routes = [route[:] for route in routes]
+            cache.rebind(routes)
+        if step % 5 == 0:
+            assert_matches_brute_force(cache, costs, demands, capacity, columns + outside[-5:])
+    assert_matches_brute_force(cache, costs, demands, capacity, range(1, model.num_nodes + 1))
+
+
+def test_feasible_costs_respect_capacity(model, constructed):
+    costs = np.asarray(model.cost_matrix)
+    demands = np.array([node.demand for node in model.nodes])
+    routes = [list(route) for route in constructed]
+    cache = InsertionCache(costs, routes, demands, model.capacity)
+    columns = np.arange(1, model.num_nodes + 1)
+    feasible = cache.feasible_costs(columns)
+    loads = np.array([demands[route].sum() for route in routes])
+    assert np.array_equal(np.isinf(feasible), loads[:, None] + demands[columns][None, :] > model.capacity)
+
+
+def test_insertion_construction_is_feasible(model, small_model):
+    for instance in (model, small_model):
+        constructor = Fcvrp(None, model=instance)
+        constructor.visit_nodes(method="insertion")
+        valid, report = validate_solution(instance, [[0] + route + [0] for route in constructor.solution])
+        assert valid, report["errors"]
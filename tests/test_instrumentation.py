@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import json
+import pstats
+
+import pytest
+
+import instrumentation
+from instrumentation import format_report, instrument
+from moves import best_intra_swap
+from tabus import iter_tabu_search, tabu_search
+
+
+def test_hooks_are_inert_when_off():
+    assert instrumentation.active() is None
+    assert instrumentation.phase("a") is instrumentation.phase("b")
+    instrumentation.count("x")
+    instrumentation.improvement("tabu", 1, 10)
+    with instrument() as probe:
+        pass
+    assert not probe.counters and not probe.trajectory
+
+
+def test_instrumented_search_is_unchanged(model, constructed):
+    plain = tabu_search(constructed, model.cost_matrix, 20, 100, model=model, seed=4)
+    stats = {}
+    with instrument() as probe:
+        assert tabu_search(constructed, model.cost_matrix, 20, 100, model=model, seed=4, stats=stats) == plain
+    assert probe.counters["tabu.iterations"] == stats["iterations"] == 100
+    assert probe.phases["tabu.inter_swap"][1] >= 100
+
+
+def test_trajectory_records_every_improvement(model, constructed):
+    with instrument() as probe:
+        costs = [cost for _, cost in iter_tabu_search(constructed, model.cost_matrix, 20, 100, model=model, seed=4)]
+    assert [cost for _, stage, _, cost in probe.trajectory if stage == "tabu"] == costs[1:]
+    seconds = [point[0] for point in probe.trajectory]
+    assert seconds == sorted(seconds)
+
+
+def test_move_counter_equals_neighbourhood_size(model, constructed):
+    with instrument() as probe:
+        best_intra_swap(constructed, model.cost_matrix)
+    assert probe.counters["moves.intra_swap"] == sum(len(route) * (len(route) - 1) // 2 for route in constructed)
+
+
+def test_nested_blocks_restore_the_outer_probe():
+    with instrument() as outer:
+        instrumentation.count("a")
+        with instrument() as inner:
+            instrumentation.count("b")
+        instrumentation.count("a")
+        assert instrumentation.active() is outer
+    assert instrumentation.active() is None
+    assert (dict(outer.counters), dict(inner.counters)) == ({"a": 2}, {"b": 1})
+
+
+def test_timed_phases_and_report():
+    @instrumentation.timed("work")
+    def work(x):
+        return x * 2
+
+    assert work(2) == 4
+    with instrument() as probe:
+        for i in range(3):
+            work(i)
+            instrumentation.count("items", 2)
+        instrumentation.improvement("local", 1, 42)
+    report = probe.report()
+    assert json.loads(json.dumps(report)) == report
+    assert report["phases"]["work"]["calls"] == 3
+    assert report["counters"] == {"items": 6}
+    assert report["trajectory"] == [dict(seconds=report["trajectory"][0]["seconds"], stage="local",
+                                         iteration=1, cost=42)]
+    text = format_report(report)
+    assert "work" in text and "items" in text and "42" in text
+
+
+def test_trace_and_profile_files(tmp_path, model, constructed):
+    trace_file = tmp_path / "run.trace.json"
+    profile_file = tmp_path / "run.pstats"
+    with instrument(trace_file=str(trace_file), profile_file=str(profile_file)) as probe:
+        tabu_search(constructed, model.cost_matrix, 20, 20, model=model, seed=4)
+    with open(trace_file) as f:
+        trace = json.load(f)
+    phases = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(phases) == sum(calls for _, calls in probe.phases.values())
+    assert all(event["dur"] >= 0 for event in phases)
+    assert pstats.Stats(str(profile_file)).total_calls > 0
+
+
+def test_trace_needs_a_tracing_probe(tmp_path):
+    with instrument() as probe:
+        pass
+    with pytest.raises(ValueError):
+        probe.write_trace(str(tmp_path / "trace.json"))
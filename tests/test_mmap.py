@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import glob
+import pickle
+
+import numpy as np
+import pytest
+
+from Parser import load_model
+from conftest import assert_same_model, construct, set_cost, solution_cost
+from fcvrp import local_search
+from solution_state import Solution
+from tabus import tabu_search
+
+
+def test_mmap_matches_reference(fresh_instance):
+    model = load_model(fresh_instance, mmap=True)
+    assert isinstance(model.cost_matrix, np.memmap)
+    assert not model.cost_matrix.flags.writeable
+    assert model.cost_matrix.dtype == np.int16
+    assert_same_model(model, fresh_instance)
+    assert len(glob.glob(fresh_instance + ".*.npy")) == 1
+    assert_same_model(load_model(fresh_instance, mmap=True), fresh_instance)
+
+
+def test_mmap_keeps_int32_for_large_costs(fresh_instance):
+    set_cost(fresh_instance, 1, 1 << 20)
+    model = load_model(fresh_instance, mmap=True)
+    assert model.cost_matrix.dtype == np.int32
+    assert_same_model(model, fresh_instance)
+
+
+def test_short_matrix_row_is_rejected(fresh_instance):
+    with open(fresh_instance) as f:
+        lines = f.read().split("\n")
+    lines[5] = " ".join(lines[5].split()[:-1])
+    with open(fresh_instance, "w") as f:
+        f.write("\n".join(lines))
+    with pytest.raises(ValueError):
+        load_model(fresh_instance, mmap=True)
+    assert not glob.glob(fresh_instance + ".*")
+
+
+def test_pickle_maps_the_file_again(fresh_instance):
+    model = load_model(fresh_instance, mmap=True)
+    data = pickle.dumps(model)
+    assert len(data) < model.cost_matrix.nbytes
+    clone = pickle.loads(data)
+    assert isinstance(clone.cost_matrix, np.memmap)
+    assert_same_model(clone, fresh_instance)
+
+
+def test_search_on_int16_matrix_equals_in_memory_search(fresh_instance, model):
+    mapped = load_model(fresh_instance, mmap=True)
+    results = []
+    for instance in (model, mapped):
+        costs = instance.cost_matrix
+        solution, cost = local_search(construct(instance), costs, model=instance)
+        solution, cost = tabu_search(solution, costs, 20, 100, model=instance, seed=4)
+        assert cost == solution_cost(model.cost_matrix, solution)
+        assert Solution(instance, solution).total_cost == cost
+        results.append((solution, cost))
+    assert results[0] == results[1]
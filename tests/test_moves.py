@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import route_cost, shuffled, solution_cost
+from moves import (apply_inter_swap, apply_intra_swap, best_inter_swap, best_inter_swap_vectorized, best_intra_swap,
+                   best_intra_swap_vectorized, first_inter_swap, inter_swap_delta, inter_swap_deltas,
+                   intra_swap_delta, intra_swap_deltas)
+from solution_state import Solution
+
+
+def test_intra_swap_delta_matches_recompute(model, constructed):
+    costs = model.cost_matrix
+    route = shuffled(constructed, 0)[0][:12]
+    for i, j in itertools.combinations(range(len(route)), 2):
+        swapped = route[:]
+        swapped[i], swapped[j] = swapped[j], swapped[i]
+        assert intra_swap_delta(route, i, j, costs) == route_cost(costs, swapped) - route_cost(costs, route)
+
+
+def test_inter_swap_delta_matches_recompute(model, constructed):
+    costs = model.cost_matrix
+    route1, route2 = (route[:8] for route in shuffled(constructed, 1)[:2])
+    for idx1, idx2 in itertools.product(range(len(route1)), range(len(route2))):
+        solution = [route1[:], route2[:]]
+        apply_inter_swap(solution, 0, idx1, 1, idx2)
+        expected = solution_cost(costs, solution) - solution_cost(costs, [route1, route2])
+        assert inter_swap_delta(route1, idx1, route2, idx2, costs) == expected
+
+
+def test_best_swaps_report_the_delta_they_apply(model, constructed):
+    costs = model.cost_matrix
+    solution = shuffled(constructed, 2)
+    before = solution_cost(costs, solution)
+    delta, route_index, i, j = best_intra_swap(solution, costs)
+    apply_intra_swap(solution, route_index, i, j)
+    assert solution_cost(costs, solution) - before == delta
+
+    before = solution_cost(costs, solution)
+    delta, r1, idx1, r2, idx2 = best_inter_swap(solution, costs)
+    apply_inter_swap(solution, r1, idx1, r2, idx2)
+    assert solution_cost(costs, solution) - before == delta
+
+
+def test_best_inter_swap_is_the_minimum_delta(model, constructed):
+    costs = model.cost_matrix
+    solution = [route[:10] for route in shuffled(constructed, 3)]
+    deltas = [inter_swap_delta(solution[r1], idx1, solution[r2], idx2, costs)
+              for r1, r2 in itertools.combinations(range(len(solution)), 2)
+              for idx1 in range(len(solution[r1])) for idx2 in range(len(solution[r2]))]
+    assert best_inter_swap(solution, costs)[0] == min(deltas)
+    assert first_inter_swap(solution, costs)[0] == deltas[0]
+
+
+def test_scalar_scan_does_not_overflow_int16_costs():
+    # Only swap: 0-1-2-0 / 0-3-4-0 becomes 0-3-2-0 / 0-1-4-0, two far arcs of 20000 each
+    costs = np.full((5, 5), 20000, dtype=np.int16)
+    np.fill_diagonal(costs, -1)
+    for a, b in [(0, 1), (1, 2), (0, 2), (0, 3), (3, 4), (0, 4)]:
+        costs[a, b] = costs[b, a] = 1
+    solution = [[1, 2], [3, 4]]
+    delta = best_inter_swap(solution, costs)[0]
+    assert delta == inter_swap_delta([1, 2], 0, [3, 4], 0, costs) == 39998
+
+
+def test_delta_matrices_match_scalar_deltas(model, constructed):
+    costs = model.cost_matrix
+    route1, route2 = (route[:9] for route in shuffled(constructed, 4)[:2])
+    intra = intra_swap_deltas(route1, costs)
+    for i, j in itertools.combinations(range(len(route1)), 2):
+        assert intra[i, j] == intra_swap_delta(route1, i, j, costs)
+    inter = inter_swap_deltas(route1, route2, costs)
+    for idx1, idx2 in itertools.product(range(len(route1)), range(len(route2))):
+        assert inter[idx1, idx2] == inter_swap_delta(route1, idx1, route2, idx2, costs)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_vectorised_scans_equal_scalar_scans(model, constructed, seed):
+    costs = model.cost_matrix
+    solution = shuffled(constructed, seed)
+    assert best_intra_swap_vectorized(solution, costs) == best_intra_swap(solution, costs)
+    assert best_inter_swap_vectorized(solution, costs) == best_inter_swap(solution, costs)
+
+
+def test_vectorised_tabu_scan_equals_scalar_scan(model, constructed):
+    costs = model.cost_matrix
+    solution = shuffled(constructed, 5)
+    state = Solution(model, solution, costs)
+    # Forbid the best few exchanges, one of them with an aspiration threshold it meets
+    tabu_pairs = []
+    for _ in range(3):
+        _, r1, idx1, r2, idx2 = best_inter_swap(solution, costs, is_tabu=lambda a, b: (a, b) in tabu_pairs
+                                                or (b, a) in tabu_pairs)
+        tabu_pairs.append((solution[r1][idx1], solution[r2][idx2]))
+
+    def is_tabu(a, b):
+        return (a, b) in tabu_pairs or (b, a) in tabu_pairs
+
+    for aspiration in (None, -10**9, 0):
+        scalar = best_inter_swap(solution, costs, is_tabu=is_tabu, state=state, aspiration=aspiration)
+        vectorised = best_inter_swap_vectorized(solution, costs, tabu_pairs=tabu_pairs, state=state,
+                                                aspiration=aspiration)
+        assert vectorised == scalar
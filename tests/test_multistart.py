@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from conftest import solution_cost
+from multistart import randomized_initial_solution, run_multistart, run_seed
+from solution_state import Solution
+
+SEEDS = [4, 8, 15]
+
+
+def test_randomized_solution_is_a_shuffle_of_the_construction(small_model):
+    first = randomized_initial_solution(small_model, 4)
+    assert first == randomized_initial_solution(small_model, 4)
+    baseline = randomized_initial_solution(small_model, 8)
+    assert [sorted(route) for route in first] == [sorted(route) for route in baseline]
+
+
+def test_run_seed_reports_the_cost_of_its_solution(small_model):
+    result = run_seed(small_model, 4, max_iterations=50)
+    assert result["cost"] == solution_cost(small_model.cost_matrix, result["solution"])
+    assert result["valid"] == Solution(small_model, result["solution"]).report()[0]
+    assert result["cost"] <= result["local_cost"] <= result["initial_cost"]
+
+
+def test_pool_results_equal_serial_runs(small_model):
+    best, results = run_multistart(small_model, SEEDS, workers=2, max_iterations=50)
+    assert [result["seed"] for result in results] == SEEDS
+    for result in results:
+        serial = run_seed(small_model, result["seed"], max_iterations=50)
+        assert (result["cost"], result["solution"]) == (serial["cost"], serial["solution"])
+    assert best == min(results, key=lambda result: (not result["valid"], result["cost"]))
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from candidates import build_candidate_lists
+from conftest import route_cost, shuffled
+from operators import CHAIN_LENGTHS, EVALUATORS, OPERATORS, EdgeTable, descend
+from solution_state import Solution
+
+
+def make_state(model, constructed, seed):
+    return Solution(model, shuffled(constructed, seed) + [[]], np.asarray(model.cost_matrix))
+
+
+def neighbours(state, name, route_index, i):
+    """
+    Every move of an operator for the anchor at routes[route_index][i], as {route_index: new_route} dictionaries.
+    """
+    routes = state.routes
+    route = routes[route_index]
+    if name in CHAIN_LENGTHS:
+        for length in CHAIN_LENGTHS[name]:
+            if i + length > len(route):
+                continue
+            chain = route[i:i + length]
+            rest = route[:i] + route[i + length:]
+            for at in range(len(rest) + 1):
+                if at != i:
+                    yield {route_index: rest[:at] + chain + rest[at:]}
+            for target, other in enumerate(routes):
+                if target != route_index:
+                    for at in range(len(other) + 1):
+                        yield {route_index: rest, target: other[:at] + chain + other[at:]}
+    elif name == "two_opt":
+        for j in range(i + 1, len(route)):
+            yield {route_index: route[:i] + route[i:j + 1][::-1] + route[j + 1:]}
+    else:
+        for target, other in enumerate(routes):
+            if target != route_index:
+                for k in range(len(other) + 1):
+                    yield {route_index: route[:i + 1] + other[k:], target: other[:k] + route[i + 1:]}
+
+
+def brute_force_best(state, name, route_index, i):
+    best = 0
+    for changed in neighbours(state, name, route_index, i):
+        loads = [sum(state.demands[node] for node in route) for route in changed.values()]
+        if max(loads) > state.model.capacity:
+            continue
+        delta = sum(route_cost(state.costs, route) - route_cost(state.costs, state.routes[r])
+                    for r, route in changed.items())
+        best = min(best, delta)
+    return best
+
+
+@pytest.mark.parametrize("name", OPERATORS)
+@pytest.mark.parametrize("seed", range(2))
+def test_evaluators_find_the_best_move(model, constructed, name, seed):
+    state = make_state(model, constructed, seed)
+    edges = EdgeTable(state)
+    matrix = np.asarray(state.costs)
+    for route_index, route in enumerate(state.routes):
+        for i in range(len(route)):
+            move = EVALUATORS[name](state, edges, matrix, route_index, i, None)
+            expected = brute_force_best(state, name, route_index, i)
+            assert (move[0] if move is not None else 0) == expected
+
+
+@pytest.mark.parametrize("name", OPERATORS)
+def test_applied_moves_change_the_cost_by_their_delta(model, constructed, name):
+    state = make_state(model, constructed, 3)
+    matrix = np.asarray(state.costs)
+    for route_index, route in enumerate(state.routes):
+        for i in range(len(route)):
+            clone = state.copy()
+            move = EVALUATORS[name](clone, EdgeTable(clone), matrix, route_index, i, None)
+            if move is None:
+                continue
+            delta, apply, _ = move
+            changed = apply()
+            fresh = Solution(model, clone.routes, clone.costs)
+            assert clone.total_cost - state.total_cost == delta == fresh.total_cost - state.total_cost
+            assert all(load <= model.capacity for load in fresh.route_loads)
+            assert sorted(node for route in clone.routes for node in route) == \
+                sorted(node for route in state.routes for node in route)
+            assert {r for r in range(len(state.routes)) if clone.routes[r] != state.routes[r]} <= set(changed)
+
+
+def assert_same_edges(edges, state):
+    fresh = EdgeTable(state)
+    for field in EdgeTable.FIELDS:
+        assert np.array_equal(getattr(edges, field), getattr(fresh, field)), field
+    assert edges.start == fresh.start
+
+
+def test_edge_table_update_equals_rebuild(model, constructed):
+    state = make_state(model, constructed, 1)
+    edges = EdgeTable(state)
+    matrix = np.asarray(state.costs)
+    applied = 0
+    for name in OPERATORS * 5:
+        for route_index, route in enumerate(state.routes):
+            for i in range(len(route)):
+                move = EVALUATORS[name](state, edges, matrix, route_index, i, None)
+                if move is not None:
+                    edges.update(state, move[1]())
+                    assert_same_edges(edges, state)
+                    applied += 1
+                    break
+    assert applied
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("k", [None, 10])
+def test_descend_reaches_a_local_optimum(model, constructed, seed, k):
+    candidates = build_candidate_lists(model, k) if k else None
+    state = make_state(model, constructed, seed)
+    before = state.total_cost
+    total = descend(state, candidates=candidates)
+    fresh = Solution(model, state.routes, state.costs)
+    assert total < 0
+    assert state.total_cost == fresh.total_cost == before + total
+    assert fresh.is_feasible()
+
+    # Don't-look bits may leave moves whose arcs did not change; a pass that
+    # starts with every bit off and finds nothing ends at a local optimum
+    while descend(state, candidates=candidates) < 0:
+        pass
+
+    edges = EdgeTable(state)
+    matrix = np.asarray(state.costs)
+    for name in OPERATORS:
+        for route_index, route in enumerate(state.routes):
+            for i in range(len(route)):
+                assert EVALUATORS[name](state, edges, matrix, route_index, i, candidates) is None
+
+
+def test_descend_stops_after_max_moves(model, constructed):
+    state = make_state(model, constructed, 0)
+    before = state.total_cost
+    total = descend(state, max_moves=3)
+    assert total < 0
+    assert state.total_cost == before + total
+
+
+def test_unknown_operator_is_rejected(model, constructed):
+    with pytest.raises(ValueError):
+        descend(make_state(model, constructed, 0), operators=("three_opt",))
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import glob
+import pickle
+
+import Parser
+from Parser import load_model
+from conftest import assert_same_model, set_cost
+
+
+def test_parse_matches_reference(fresh_instance):
+    assert_same_model(load_model(fresh_instance, use_cache=False), fresh_instance)
+    assert not glob.glob(fresh_instance + ".*")
+
+
+def test_cache_round_trip(fresh_instance, monkeypatch):
+    first = load_model(fresh_instance)
+    assert len(glob.glob(fresh_instance + ".*.npz")) == 1
+
+    def no_text_parse(raw):
+        raise AssertionError("the cache was not used")
+
+    monkeypatch.setattr(Parser, "parse_instance", no_text_parse)
+    second = load_model(fresh_instance)
+    assert_same_model(second, fresh_instance)
+    assert second.cost_matrix.dtype == first.cost_matrix.dtype
+
+
+def test_corrupt_cache_falls_back_to_text(fresh_instance):
+    load_model(fresh_instance)
+    (cache_file,) = glob.glob(fresh_instance + ".*.npz")
+    with open(cache_file, "wb") as f:
+        f.write(b"not a zip file")
+    assert_same_model(load_model(fresh_instance), fresh_instance)
+
+
+def test_edited_instance_gets_a_new_cache(fresh_instance):
+    set_cost(fresh_instance, 1, int(load_model(fresh_instance).cost_matrix[0, 1]) + 1)
+    assert_same_model(load_model(fresh_instance), fresh_instance)
+    assert len(glob.glob(fresh_instance + ".*.npz")) == 2
+
+
+def test_pickle_round_trip(fresh_instance):
+    clone = pickle.loads(pickle.dumps(load_model(fresh_instance)))
+    assert_same_model(clone, fresh_instance)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import pytest
+
+from Parser import load_model
+from SolutionValidator import validate_solution
+from conftest import construct, route_cost, shuffled, solution_cost
+from fcvrp import local_search
+from instance_generator import write_instance
+from polish import RoutePool, available_backends, polish
+from test_bounds import optimum
+
+BACKENDS = available_backends()
+
+
+def assert_valid(model, solution, cost):
+    assert cost == solution_cost(model.cost_matrix, solution)
+    valid, report = validate_solution(model, [[0] + route + [0] for route in solution if route])
+    assert valid, report["errors"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tiny") / "gen_n7_f2_s0.txt"
+    write_instance(str(path), 7, 2, seed=0, capacity=40)
+    return load_model(str(path), use_cache=False)
+
+
+def test_pool_admits_feasible_distinct_routes(model, constructed):
+    pool = RoutePool(model)
+    pool.add([])
+    pool.add_solution(constructed)
+    pool.add(constructed[0][:])
+    assert len(pool) == len([route for route in constructed if route])
+    overloaded = [node for route in constructed for node in route]
+    pool.add(overloaded)
+    assert tuple(overloaded) not in set(pool)
+
+    merged = RoutePool(model)
+    merged.update(pool)
+    assert set(merged) == set(pool)
+
+
+def test_full_pool_admits_incumbent(model, constructed):
+    others = shuffled(constructed, 1)
+    pool = RoutePool(model, max_routes=2)
+    pool.add_solution(others)
+    assert len(pool) == 2
+    incumbent = {tuple(route) for route in constructed if route}
+    assert len(incumbent) > 2
+    pool.set_incumbent(constructed)
+    assert set(pool) == incumbent
+    pool.add_solution(shuffled(constructed, 2))
+    # The routes of the previous incumbent make room for those of the new one
+    pool.set_incumbent(shuffled(constructed, 3))
+    assert set(pool) == {tuple(route) for route in shuffled(constructed, 3) if route}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_polish_of_every_route_is_optimal(tiny_model, backend):
+    costs = tiny_model.cost_matrix
+    pool = RoutePool(tiny_model)
+    customers = range(1, tiny_model.num_nodes + 1)
+    for size in range(1, len(customers) + 1):
+        for subset in itertools.combinations(customers, size):
+            pool.add(list(min(itertools.permutations(subset), key=lambda route: route_cost(costs, route))))
+    incumbent = construct(tiny_model)
+
+    solution, cost = polish(tiny_model, pool, incumbent, backend=backend)
+    assert cost == optimum(tiny_model)
+    assert_valid(tiny_model, solution, cost)
+    assert len(solution) == len(incumbent)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_polish_recombines_search_routes(model, constructed, backend):
+    pool = RoutePool(model)
+    for seed in range(4):
+        local_search(shuffled(constructed, seed), model.cost_matrix, model=model, route_pool=pool)
+    incumbent, incumbent_cost = local_search(constructed, model.cost_matrix, model=model, route_pool=pool)
+
+    solution, cost = polish(model, pool, incumbent, time_limit=30, backend=backend)
+    assert cost <= incumbent_cost
+    assert_valid(model, solution, cost)
+    assert {tuple(route) for route in solution if route} <= set(pool)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_polish_of_incumbent_alone_keeps_it(model, constructed, backend):
+    pool = RoutePool(model, max_routes=1)
+    solution, cost = polish(model, pool, constructed, backend=backend)
+    assert set(pool) == {tuple(route) for route in constructed if route}
+    assert solution == constructed
+    assert cost == solution_cost(model.cost_matrix, constructed)
+
+
+def test_unknown_backend(model, constructed):
+    with pytest.raises(ValueError):
+        polish(model, RoutePool(model), constructed, backend="glpk")
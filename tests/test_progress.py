@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import logging
+
+import pytest
+
+from const_heuristic import Fcvrp
+from progress import ProgressReporter, configure_logging
+from tabus import tabu_search
+
+
+@pytest.fixture
+def log_stream():
+    """
+    Route all logging to a string buffer for the test and restore the root logger afterwards.
+    """
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    yield stream
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def build(model):
+    constructor = Fcvrp(None, model=model)
+    constructor.visit_nodes()
+    return constructor
+
+
+def test_construction_is_quiet_by_default(model, log_stream):
+    configure_logging(stream=log_stream)
+    build(model)
+    assert log_stream.getvalue() == ""
+
+
+def test_debug_trace_is_one_record_per_truck(model, log_stream):
+    configure_logging(logging.DEBUG, stream=log_stream)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logging.getLogger("const_heuristic").addHandler(handler)
+    try:
+        constructor = build(model)
+    finally:
+        logging.getLogger("const_heuristic").removeHandler(handler)
+
+    traces = [record.getMessage() for record in records if "✅" in record.getMessage()]
+    assert len(traces) == len(constructor.solution)
+    assert sum(message.count("✅") for message in traces) == constructor.placed == model.num_req
+    assert "construction:" in log_stream.getvalue()
+
+
+def test_json_lines_carry_the_report_fields(log_stream):
+    configure_logging(logging.INFO, json_lines=True, stream=log_stream)
+    reporter = ProgressReporter("tabu", min_interval=0)
+    for cost in (30, 20, 10):
+        reporter(None, cost)
+    reporter.finish(cost=10)
+
+    entries = [json.loads(line) for line in log_stream.getvalue().splitlines()]
+    assert [entry["cost"] for entry in entries] == [30, 20, 10, 10]
+    assert [entry["updates"] for entry in entries] == [1, 2, 3, 3]
+    assert all(entry["stage"] == "tabu" and entry["logger"] == "fcvrp.progress" for entry in entries)
+    assert entries[-1]["done"] is True and "done" not in entries[0]
+    assert entries[0]["message"].startswith("tabu: elapsed=")
+
+
+def test_reports_are_rate_limited(log_stream):
+    configure_logging(logging.INFO, json_lines=True, stream=log_stream)
+    reporter = ProgressReporter("local", min_interval=3600)
+    for i in range(1000):
+        reporter.update(i=i)
+    reporter.finish()
+    entries = [json.loads(line) for line in log_stream.getvalue().splitlines()]
+    assert [(entry["i"], entry["updates"]) for entry in entries] == [(0, 1), (999, 1000)]
+
+
+def test_disabled_reporter_does_nothing(log_stream):
+    configure_logging(logging.WARNING, stream=log_stream)
+    reporter = ProgressReporter("tabu", min_interval=0)
+    reporter.update(cost=1)
+    reporter.finish(cost=1)
+    assert reporter.updates == 0 and log_stream.getvalue() == ""
+
+
+def test_reporter_as_search_callback(model, constructed, log_stream):
+    configure_logging(logging.INFO, json_lines=True, stream=log_stream)
+    reporter = ProgressReporter("tabu", min_interval=0)
+    solution, cost = tabu_search(constructed, model.cost_matrix, 20, 100, model=model, seed=4,
+                                 on_improvement=reporter)
+    entries = [json.loads(line) for line in log_stream.getvalue().splitlines()
+               if json.loads(line)["logger"] == "fcvrp.progress"]
+    assert entries and entries[-1]["cost"] == cost
+    assert (solution, cost) == tabu_search(constructed, model.cost_matrix, 20, 100, model=model, seed=4)
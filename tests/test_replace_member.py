@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+import pytest
+
+from candidates import build_candidate_lists
+from conftest import route_cost, shuffled
+from moves import best_replace_member, best_replace_member_vectorized, replace_member_delta
+from solution_state import Solution
+
+
+def all_replacements(state):
+    """
+    Every (delta, route_index, idx, new_node) replacement, recomputed from whole route costs.
+    """
+    moves = []
+    for route_index, route in enumerate(state.routes):
+        for idx, a in enumerate(route):
+            for b in state.unvisited_members(state.node_family[a]):
+                changed = route[:idx] + [b] + route[idx + 1:]
+                delta = route_cost(state.costs, changed) - route_cost(state.costs, route)
+                moves.append((delta, route_index, idx, b))
+    return moves
+
+
+@pytest.fixture(params=range(3))
+def state(request, model, constructed):
+    return Solution(model, shuffled(constructed, request.param), np.asarray(model.cost_matrix))
+
+
+def test_delta_matches_recompute(state):
+    for delta, route_index, idx, b in all_replacements(state):
+        assert replace_member_delta(state.routes[route_index], idx, b, state.costs) == delta
+
+
+def test_best_replacement_is_the_minimum(state):
+    moves = all_replacements(state)
+    assert moves
+    best = best_replace_member(state)
+    assert best[0] == min(moves)[0]
+    assert best == min(moves, key=lambda move: (move[0], move[1], move[2]))
+
+
+def test_applying_the_best_replacement_keeps_loads_and_visits(state):
+    loads = list(state.route_loads)
+    visits = list(state.family_visits)
+    before = state.total_cost
+    delta, route_index, idx, b = best_replace_member(state)
+    assert state.apply_replace_member(route_index, idx, b) == delta
+    assert state.total_cost == before + delta
+    assert (state.route_loads, state.family_visits) == (loads, visits)
+    assert Solution(state.model, state.routes, state.costs).total_cost == state.total_cost
+
+
+def test_vectorised_scan_equals_scalar_scan(state):
+    candidates = build_candidate_lists(state.model, 5)
+    assert best_replace_member_vectorized(state) == best_replace_member(state)
+    assert (best_replace_member_vectorized(state, candidates=candidates)
+            == best_replace_member(state, candidates=candidates))
+
+
+@pytest.mark.parametrize("aspiration", [None, -5, 0])
+def test_tabu_scans_agree(state, aspiration):
+    rng = random.Random(0)
+    moves = sorted(all_replacements(state))
+    tabu = {(a, b) for _, route_index, idx, b in moves[:20] if rng.random() < 0.7
+            for a in [state.routes[route_index][idx]]}
+    tabu_pairs = [(b, a) if rng.random() < 0.5 else (a, b) for a, b in tabu]
+
+    scalar = best_replace_member(state, lambda a, b: (a, b) in tabu, aspiration=aspiration)
+    assert best_replace_member_vectorized(state, tabu_pairs, aspiration=aspiration) == scalar
+    allowed = [move for move in moves
+               if (state.routes[move[1]][move[2]], move[3]) not in tabu
+               or (aspiration is not None and move[0] < aspiration)]
+    assert scalar[0] == min(allowed)[0]
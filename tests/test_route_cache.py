@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from conftest import route_cost, shuffled
+from route_cache import RouteCache, RouteInfo, SeenSolutions, ZobristHasher
+from solution_state import Solution
+from test_solution_state import random_move
+
+
+def route_info(model, route):
+    families = {}
+    for node in route:
+        family = model.nodes[node].family
+        families[family] = families.get(family, 0) + 1
+    return RouteInfo(route_cost(model.cost_matrix, route), sum(model.nodes[node].demand for node in route),
+                     tuple(sorted(families.items())))
+
+
+def test_hash_ignores_route_order_but_not_visit_order():
+    hasher = ZobristHasher(10)
+    routes = [[1, 2, 3], [4, 5], [6]]
+    assert hasher.solution_hash(routes) == hasher.solution_hash(routes[::-1])
+    assert hasher.route_hash([1, 2, 3]) != hasher.route_hash([1, 3, 2])
+    assert hasher.route_hash([]) == 0
+    assert ZobristHasher(10, seed=1).route_hash([1, 2, 3]) != hasher.route_hash([1, 2, 3])
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_deltas_equal_recomputed_hashes(seed):
+    rng = random.Random(seed)
+    hasher = ZobristHasher(30, seed)
+    for length in range(1, 7):
+        route = rng.sample(range(1, 31), length)
+        value = hasher.route_hash(route)
+        unused = [node for node in range(1, 31) if node not in route]
+        for idx in range(length):
+            new_node = rng.choice(unused)
+            replaced = route[:idx] + [new_node] + route[idx + 1:]
+            assert value ^ hasher.replace_delta(route, idx, new_node) == hasher.route_hash(replaced)
+            removed = route[:idx] + route[idx + 1:]
+            assert value ^ hasher.remove_delta(route, idx) == hasher.route_hash(removed)
+        for position in range(length + 1):
+            node = rng.choice(unused)
+            inserted = route[:position] + [node] + route[position:]
+            assert value ^ hasher.insert_delta(route, position, node) == hasher.route_hash(inserted)
+    assert hasher.insert_delta([], 0, 5) == hasher.route_hash([5])
+
+
+def test_lookup_equals_recompute(model, constructed):
+    cache = RouteCache(model)
+    rng = random.Random(0)
+    for _ in range(20):
+        for route in shuffled(constructed, rng.randrange(1000)):
+            assert cache.lookup(route) == route_info(model, route)
+    misses = cache.misses
+    for route in constructed + constructed:
+        assert cache.lookup(route[::-1]) == route_info(model, route[::-1])
+    assert cache.misses - misses <= len(constructed)
+    assert cache.hits >= len(constructed)
+    assert cache.total_cost(constructed) == sum(route_cost(model.cost_matrix, route) for route in constructed)
+    assert cache.lookup([]) == RouteInfo(0, 0, ())
+
+
+def test_cache_evicts_least_recently_used(model):
+    cache = RouteCache(model, max_routes=2)
+    first, second, third = [1, 2], [3, 4], [5, 6]
+    cache.lookup(first)
+    cache.lookup(second)
+    cache.lookup(first)
+    cache.lookup(third)
+    hasher = cache.hasher
+    assert list(cache.routes) == [hasher.route_hash(first), hasher.route_hash(third)]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_state_hashes_equal_recompute(model, constructed, seed):
+    rng = random.Random(seed)
+    state = Solution(model, shuffled(constructed, seed) + [[]], model.cost_matrix, route_cache=RouteCache(model))
+    hasher = state.route_cache.hasher
+    for _ in range(200):
+        routes = state.routes
+        used = [index for index, route in enumerate(routes) if route]
+        r1, r2 = rng.sample(used, 2)
+        idx1, idx2 = rng.randrange(len(routes[r1])), rng.randrange(len(routes[r2]))
+        after = [route[:] for route in routes]
+        after[r1][idx1], after[r2][idx2] = routes[r2][idx2], routes[r1][idx1]
+        assert state.inter_swap_hash(r1, idx1, r2, idx2) == hasher.solution_hash(after)
+        unvisited = state.unvisited_members(state.node_family[routes[r1][idx1]])
+        if unvisited:
+            new_node = rng.choice(unvisited)
+            after = [route[:] for route in routes]
+            after[r1][idx1] = new_node
+            assert state.replace_member_hash(r1, idx1, new_node) == hasher.solution_hash(after)
+
+        random_move(state, rng)
+        assert state.route_hashes == [hasher.route_hash(route) for route in state.routes]
+        assert state.solution_hash() == hasher.solution_hash(state.routes)
+        assert state.total_cost == sum(route_cost(model.cost_matrix, route) for route in state.routes)
+
+
+def test_seen_solutions_forgets_oldest():
+    seen = SeenSolutions(max_size=2)
+    for value in (1, 2, 1, 3):
+        seen.add(value)
+    assert 1 in seen and 3 in seen and 2 not in seen
+    assert len(seen) == 2
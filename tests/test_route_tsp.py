@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from conftest import route_cost
+from route_tsp import RouteOptimizer, held_karp, improve_route, path_cost
+from solution_state import Solution
+
+
+@pytest.fixture(scope="module")
+def asymmetric():
+    rng = np.random.default_rng(3)
+    matrix = rng.integers(1, 100, size=(30, 30))
+    np.fill_diagonal(matrix, -1)
+    return matrix
+
+
+def brute_force(matrix, route):
+    return min(route_cost(matrix, order) for order in itertools.permutations(route))
+
+
+def neighbours(route):
+    """
+    Every 2-opt reversal and every Or-opt move of a chain of 1 to 3 nodes, in both orientations.
+    """
+    n = len(route)
+    for i in range(n):
+        for j in range(i + 2, n + 1):
+            yield route[:i] + route[i:j][::-1] + route[j:]
+    for length in (1, 2, 3):
+        for start in range(n - length + 1):
+            chain = route[start:start + length]
+            rest = route[:start] + route[start + length:]
+            for at in range(len(rest) + 1):
+                yield rest[:at] + chain + rest[at:]
+                yield rest[:at] + chain[::-1] + rest[at:]
+
+
+def test_path_cost(model, constructed):
+    assert path_cost(model.cost_matrix, []) == 0
+    for route in constructed:
+        cost = path_cost(model.cost_matrix, route)
+        assert type(cost) is int
+        assert cost == route_cost(model.cost_matrix, route)
+
+
+@pytest.mark.parametrize("size", range(1, 8))
+def test_held_karp_equals_brute_force(model, asymmetric, size):
+    rng = random.Random(size)
+    for matrix, nodes in ((model.cost_matrix, model.num_nodes), (asymmetric, 29)):
+        for _ in range(3):
+            route = rng.sample(range(1, nodes + 1), size)
+            order, cost = held_karp(matrix, route)
+            assert sorted(order) == sorted(route)
+            assert cost == route_cost(matrix, order) == brute_force(matrix, route)
+    assert held_karp(model.cost_matrix, []) == ([], 0)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_improve_route_reaches_local_optimum(model, asymmetric, seed):
+    rng = random.Random(seed)
+    for matrix, nodes in ((model.cost_matrix, model.num_nodes), (asymmetric, 29)):
+        route = rng.sample(range(1, nodes + 1), 15)
+        order, cost = improve_route(matrix, route)
+        assert sorted(order) == sorted(route)
+        assert cost == route_cost(matrix, order) <= route_cost(matrix, route)
+        assert min(route_cost(matrix, other) for other in neighbours(order)) >= cost
+
+
+def test_optimize_memoises_node_sets(model, constructed):
+    optimizer = RouteOptimizer(model.cost_matrix, exact_size=8)
+    costs = model.cost_matrix
+    rng = random.Random(0)
+    short = rng.sample(constructed[0], 8)
+    order, cost = optimizer.optimize(short)
+    assert cost == route_cost(costs, order) == brute_force(costs, short)
+    assert optimizer.optimize(short[::-1]) == (order, cost)
+    assert (optimizer.exact, optimizer.hits) == (1, 1)
+
+    long = constructed[0]
+    order, cost = optimizer.optimize(long)
+    assert sorted(order) == sorted(long)
+    assert cost == route_cost(costs, order) <= route_cost(costs, long)
+    assert optimizer.heuristic == 1
+
+    # A route cheaper than the memoised heuristic order replaces it
+    better = list(order)
+    optimizer.memo[frozenset(long)] = (tuple(long[::-1]), cost + 1, False)
+    assert optimizer.optimize(better) == (better, cost)
+    assert optimizer.memo[frozenset(long)] == (tuple(better), cost, False)
+
+    assert optimizer.optimize([]) == ([], 0)
+    pair = constructed[1][:2]
+    assert optimizer.optimize(pair)[1] == min(route_cost(costs, pair), route_cost(costs, pair[::-1]))
+
+
+def test_restore_memo_round_trips(model, constructed):
+    optimizer = RouteOptimizer(model.cost_matrix, exact_size=6)
+    for route in constructed:
+        for start in range(0, len(route) - 5, 3):
+            optimizer.optimize(route[start:start + 6])
+    entries = list(optimizer.memo.values())
+    restored = RouteOptimizer(model.cost_matrix, exact_size=6)
+    restored.restore_memo(entries)
+    assert restored.memo == optimizer.memo
+    assert list(restored.memo) == list(optimizer.memo)
+
+
+def test_optimize_route_delta_equals_recompute(model, constructed):
+    optimizer = RouteOptimizer(model.cost_matrix)
+    state = Solution(model, [route[:7] for route in constructed], model.cost_matrix)
+    for route_index, route in enumerate(state.routes):
+        before = state.total_cost
+        delta = optimizer.optimize_route(state, route_index)
+        assert delta <= 0
+        assert state.total_cost - before == delta
+        assert state.route_costs[route_index] == brute_force(model.cost_matrix, route)
+        fresh = Solution(model, state.routes, model.cost_matrix)
+        assert (state.total_cost, state.route_costs) == (fresh.total_cost, fresh.route_costs)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import INSTANCE, ROOT, solution_cost
+from fcvrp import solve
+from service import ModelCache, RequestError, SolveService, _digest, _parse_query, serve
+
+PARAMETERS = {"max_iterations": 30}
+
+
+@pytest.fixture(scope="module")
+def payload():
+    with open(os.path.join(ROOT, INSTANCE), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SolveService(workers=1, spool_dir=str(tmp_path / "spool"), default_deadline=60)
+    yield service
+    service.close()
+
+
+def test_model_cache_is_lru(tmp_path, payload):
+    files = []
+    for i in range(3):
+        path = tmp_path / f"i{i}.txt"
+        path.write_bytes(payload + b"\n" * i)
+        files.append((f"d{i}", str(path)))
+    cache = ModelCache(max_models=2)
+    first = cache.get(*files[0])
+    cache.get(*files[1])
+    assert cache.get(*files[0]) is first
+    cache.get(*files[2])
+    assert list(cache.models) == ["d0", "d2"]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_parse_query():
+    assert _parse_query("deadline=2.5&seed=4&target_gap=0.1") == ({"seed": 4, "target_gap": 0.1}, 2.5)
+    assert _parse_query("") == ({}, None)
+    for query in ("colour=red", "seed=x", "max_iterations=-1", "seed=1.5"):
+        with pytest.raises(RequestError) as error:
+            _parse_query(query)
+        assert error.value.status == 400
+
+
+def test_result_equals_a_direct_solve(service, model, payload):
+    result = asyncio.run(service.solve(payload, PARAMETERS))
+    expected = solve(model, max_iterations=30, seed=0)
+    assert result["valid"] and result["batch_size"] == 1
+    assert result["digest"] == _digest(payload)
+    assert result["solution"] == [[0] + route + [0] for route in expected["solution"] if route]
+    assert result["cost"] == expected["cost"] == result["report"]["total_cost"]
+    assert result["cost"] == solution_cost(model.cost_matrix, [route[1:-1] for route in result["solution"]])
+
+
+def test_identical_requests_share_one_solve(service, payload):
+    async def run():
+        return await asyncio.gather(*(service.solve(payload, PARAMETERS) for _ in range(3)),
+                                    service.solve(payload, {"max_iterations": 31}))
+
+    results = asyncio.run(run())
+    assert [result["batch_size"] for result in results] == [3, 3, 3, 1]
+    assert results[0] == results[1] == results[2]
+    health = service.health()
+    assert (health["requests"], health["batched"], health["inflight"], health["pinned"]) == (4, 2, 0, 0)
+    assert {name.split(".")[0] for name in os.listdir(service.spool_dir)} == {_digest(payload)}
+
+
+def test_spool_eviction_keeps_queued_instances(tmp_path, payload):
+    service = SolveService(workers=1, spool_dir=str(tmp_path / "spool"), max_spooled=1, default_deadline=60)
+    try:
+        async def run():
+            return await asyncio.gather(*(service.solve(payload + b"\n" * i, PARAMETERS) for i in range(4)))
+
+        results = asyncio.run(run())
+        assert all(result["valid"] for result in results)
+        assert len({result["cost"] for result in results}) == 1
+        assert len(service.spooled) == 1 and not service.pinned
+        (digest,) = service.spooled
+        assert {name.split(".")[0] for name in os.listdir(service.spool_dir)} == {digest}
+    finally:
+        service.close()
+
+
+def test_deadline_and_bad_instances(service, payload):
+    with pytest.raises(RequestError) as error:
+        asyncio.run(service.solve(payload, {"max_iterations": 100000}, deadline=0))
+    assert error.value.status == 504
+    with pytest.raises(RequestError) as error:
+        asyncio.run(service.solve(b"3 1 2 100 1\n3\n2\n", PARAMETERS))
+    assert error.value.status == 400
+
+
+def test_http_over_unix_socket(tmp_path, service, payload):
+    path = str(tmp_path / "fcvrp.sock")
+
+    async def request(method, target, body=b""):
+        # Read up to EOF: a connection the server closed must not be held open by a worker
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(f"{method} {target} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                     + body)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(content)
+
+    async def run():
+        server = asyncio.ensure_future(serve(service, unix_path=path))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        try:
+            return [await request("POST", "/solve?max_iterations=30&seed=0", payload),
+                    await request("GET", "/health"),
+                    await request("GET", "/solve"),
+                    await request("POST", "/nowhere", payload),
+                    await request("POST", "/solve?colour=red", payload),
+                    await request("POST", "/solve", b"")]
+        finally:
+            server.cancel()
+
+    solved, health, wrong_method, unknown, bad_query, empty = asyncio.run(run())
+    assert solved[0] == 200 and solved[1]["valid"] and solved[1]["cost"] == solved[1]["report"]["total_cost"]
+    assert health == (200, dict(service.health()))
+    assert [wrong_method[0], unknown[0], bad_query[0], empty[0]] == [405, 404, 400, 400]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+import pytest
+
+from SolutionValidator import parse_solution_file
+from conftest import shuffled, solution_cost
+from solution_io import SolutionWriter, iter_solutions, read_solution
+from solution_state import Solution
+from test_solution_state import random_move
+
+
+def depot_routes(solution):
+    return [[0] + route + [0] for route in solution if route]
+
+
+def incumbents(model, constructed, seed, count=40):
+    """
+    A sequence of solutions as a search passes through them: a few routes change at a time.
+    """
+    rng = random.Random(seed)
+    state = Solution(model, shuffled(constructed, seed) + [[]], model.cost_matrix)
+    solutions = []
+    for _ in range(count):
+        random_move(state, rng)
+        solutions.append(([route[:] for route in state.routes], state.total_cost))
+    return solutions
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_write_then_read_round_trips(model, constructed, tmp_path, binary):
+    path = str(tmp_path / "solutions")
+    solutions = incumbents(model, constructed, 0)
+    # Vehicle counts that shrink and grow between records
+    solutions.append((solutions[-1][0][:2], solution_cost(model.cost_matrix, solutions[-1][0][:2])))
+    solutions.append((constructed + [[], [1]], solution_cost(model.cost_matrix, constructed + [[], [1]])))
+    with SolutionWriter(path, binary=binary, num_nodes=model.num_nodes) as writer:
+        for stamp, (solution, cost) in enumerate(solutions):
+            writer.write(solution, cost, label="tabu", stamp=stamp, full=stamp == 20)
+    assert writer.records == len(solutions)
+
+    records = list(iter_solutions(path))
+    assert [record.routes for record in records] == [depot_routes(solution) for solution, _ in solutions]
+    assert [record.cost for record in records] == [cost for _, cost in solutions]
+    assert [record.stamp for record in records] == list(range(len(solutions)))
+    assert {record.label for record in records} == {"" if binary else "tabu"}
+    assert read_solution(path) == records[-1]
+    assert parse_solution_file(path) == records[-1].routes
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_updates_store_only_changed_routes(model, constructed, tmp_path, binary):
+    path = str(tmp_path / "solutions")
+    solution = [route[:] for route in constructed]
+    with SolutionWriter(path, binary=binary, num_nodes=model.num_nodes) as writer:
+        writer.write(solution)
+        full_size = os.path.getsize(path)
+        solution[1][0], solution[1][1] = solution[1][1], solution[1][0]
+        writer.write(solution, changed=[1])
+        assert os.path.getsize(path) - full_size < full_size / 2
+        solution[2] = []
+        writer.write(solution)
+    assert read_solution(path).routes == depot_routes(solution)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_append_continues_a_file(model, constructed, tmp_path, binary):
+    path = str(tmp_path / "solutions")
+    solutions = incumbents(model, constructed, 1, count=10)
+    with SolutionWriter(path, binary=binary, num_nodes=model.num_nodes) as writer:
+        for solution, cost in solutions[:5]:
+            writer.write(solution, cost)
+    # The appending writer detects the format itself
+    with SolutionWriter(path, append=True) as writer:
+        for solution, cost in solutions[5:]:
+            assert writer(solution, cost) is False
+    assert [record.routes for record in iter_solutions(path)] == [depot_routes(solution) for solution, _ in solutions]
+
+
+def test_wide_node_ids_round_trip(tmp_path):
+    path = str(tmp_path / "solutions")
+    solution = [[70000, 3, 65536], [65535]]
+    with SolutionWriter(path, binary=True, num_nodes=70000) as writer:
+        writer.write(solution, 12.5)
+    record = read_solution(path)
+    assert record.routes == depot_routes(solution)
+    assert record.cost == 12.5
+    assert record.stamp is None
+
+
+def test_plain_files_still_parse(tmp_path):
+    path = tmp_path / "solution.txt"
+    path.write_text("0 5 3 0\n\n0 7 0\n")
+    assert parse_solution_file(str(path)) == [[0, 5, 3, 0], [0, 7, 0]]
+    assert read_solution(str(path)).routes == [[0, 5, 3, 0], [0, 7, 0]]
+    path.write_text("")
+    assert read_solution(str(path)) is None
+    assert parse_solution_file(str(path)) == []
+
+
+def test_malformed_files(tmp_path):
+    path = tmp_path / "solution.txt"
+    path.write_text("# update\n1: 0 5 0\n")
+    with pytest.raises(ValueError):
+        read_solution(str(path))
+    path.write_text("# incumbent\n0 5 0\n")
+    with pytest.raises(ValueError):
+        read_solution(str(path))
+
+    binary = str(tmp_path / "solutions")
+    with SolutionWriter(binary, binary=True, num_nodes=10) as writer:
+        writer.write([[1, 2, 3]])
+    with open(binary, "rb+") as f:
+        f.truncate(os.path.getsize(binary) - 1)
+    with pytest.raises(ValueError):
+        read_solution(binary)
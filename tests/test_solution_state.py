@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from SolutionValidator import validate_solution
+from conftest import shuffled
+from moves import intra_swap_delta
+from solution_state import Solution
+
+CACHES = ("routes", "route_costs", "route_loads", "family_visits", "in_solution", "total_cost")
+
+
+def assert_matches_recompute(state):
+    fresh = Solution(state.model, state.routes, state.costs)
+    for name in CACHES:
+        assert getattr(state, name) == getattr(fresh, name), name
+
+
+def random_move(state, rng):
+    """
+    Apply one random move through the state; returns the cost change it reported.
+    """
+    routes = state.routes
+    used = [index for index, route in enumerate(routes) if route]
+    kind = rng.choice(["intra", "inter", "replace", "remove_insert", "set_route"])
+    if kind == "intra":
+        route_index = rng.choice(used)
+        route = routes[route_index]
+        if len(route) < 2:
+            return 0
+        i, j = sorted(rng.sample(range(len(route)), 2))
+        delta = intra_swap_delta(route, i, j, state.costs)
+        state.apply_intra_swap(route_index, i, j, delta)
+        return delta
+    if kind == "inter" and len(used) > 1:
+        r1, r2 = rng.sample(used, 2)
+        return state.apply_inter_swap(r1, rng.randrange(len(routes[r1])), r2, rng.randrange(len(routes[r2])))
+    if kind == "replace":
+        route_index = rng.choice(used)
+        idx = rng.randrange(len(routes[route_index]))
+        unvisited = state.unvisited_members(state.node_family[routes[route_index][idx]])
+        if not unvisited:
+            return 0
+        return state.apply_replace_member(route_index, idx, rng.choice(unvisited))
+    if kind == "remove_insert":
+        route_index = rng.choice(used)
+        idx = rng.randrange(len(routes[route_index]))
+        node = routes[route_index][idx]
+        delta = state.remove_node(route_index, idx)
+        target = rng.randrange(len(routes))
+        return delta + state.insert_node(target, rng.randint(0, len(routes[target])), node)
+    route_index = rng.choice(used)
+    route = routes[route_index][:]
+    rng.shuffle(route)
+    before = state.total_cost
+    state.set_route(route_index, route)
+    return state.total_cost - before
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_caches_equal_recompute(model, constructed, seed):
+    rng = random.Random(seed)
+    state = Solution(model, shuffled(constructed, seed) + [[]], model.cost_matrix)
+    for _ in range(200):
+        before = state.total_cost
+        delta = random_move(state, rng)
+        assert state.total_cost - before == delta
+        assert_matches_recompute(state)
+
+
+def test_report_equals_validator(model, constructed):
+    rng = random.Random(7)
+    state = Solution(model, constructed, model.cost_matrix)
+    for _ in range(50):
+        random_move(state, rng)
+    assert state.report() == validate_solution(model, state.depot_routes())
+
+
+def test_copy_is_independent(model, constructed):
+    state = Solution(model, constructed, model.cost_matrix)
+    clone = state.copy()
+    clone.apply_inter_swap(0, 0, 1, 0)
+    assert state.routes == constructed
+    assert_matches_recompute(state)
+    assert_matches_recompute(clone)
+
+
+def test_can_inter_swap_matches_loads(model, constructed):
+    state = Solution(model, constructed, model.cost_matrix)
+    for idx1 in range(len(state.routes[0])):
+        for idx2 in range(len(state.routes[1])):
+            clone = state.copy()
+            clone.apply_inter_swap(0, idx1, 1, idx2)
+            expected = max(clone.route_loads[0], clone.route_loads[1]) <= model.capacity
+            assert state.can_inter_swap(0, idx1, 1, idx2) == expected
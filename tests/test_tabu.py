@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+import pytest
+
+from conftest import solution_cost
+from fcvrp import local_search
+from solution_state import Solution
+from tabus import TabuMemory, iter_tabu_search, tabu_search
+
+
+@pytest.fixture(scope="module")
+def local(model, constructed):
+    return local_search(constructed, model.cost_matrix, model=model)[0]
+
+
+def test_memory_is_symmetric_and_expires():
+    memory = TabuMemory(10, random.Random(0))
+    memory.add(7, 3)
+    tenure = memory.expires[(3, 7)]
+    assert memory.min_tenure <= tenure <= memory.max_tenure
+    for iteration in range(tenure):
+        memory.iteration = iteration
+        assert memory.is_tabu(3, 7) and memory.is_tabu(7, 3)
+        assert memory.active_pairs() == [(3, 7)]
+    memory.iteration = tenure
+    assert not memory.is_tabu(3, 7)
+    assert memory.active_pairs() == []
+
+
+def test_memory_prunes_only_expired_pairs():
+    memory = TabuMemory(4, random.Random(1), spread=0)
+    for iteration in range(100):
+        memory.iteration = iteration
+        memory.add(iteration, iteration + 1)
+        assert len(memory.expires) <= 2 * memory.max_tenure
+        expected = {(a, a + 1) for a in range(max(0, iteration - 3), iteration + 1)}
+        assert set(memory.active_pairs()) == expected
+
+
+@pytest.mark.parametrize("seed", [4, 8])
+def test_search_reports_the_cost_of_its_solution(model, local, seed):
+    solution, cost = tabu_search(local, model.cost_matrix, 20, 150, model=model, seed=seed)
+    assert cost == solution_cost(model.cost_matrix, solution)
+    assert Solution(model, solution).is_feasible()
+    assert cost <= solution_cost(model.cost_matrix, local)
+
+
+def test_seeded_search_is_reproducible(model, local):
+    first = tabu_search(local, model.cost_matrix, 20, 150, model=model, seed=4)
+    assert tabu_search(local, model.cost_matrix, 20, 150, model=model, seed=4) == first
+
+
+@pytest.mark.parametrize("with_model", [False, True])
+def test_vectorised_search_equals_scalar_search(model, local, with_model):
+    costs = np.asarray(model.cost_matrix)
+    kwargs = dict(model=model if with_model else None, seed=8)
+    assert (tabu_search(local, costs, 20, 100, vectorized=True, **kwargs)
+            == tabu_search(local, costs, 20, 100, vectorized=False, **kwargs))
+
+
+def test_anytime_improvements_are_strictly_better(model, local):
+    costs = []
+    for solution, cost in iter_tabu_search(local, model.cost_matrix, 20, 200, model=model, seed=4):
+        assert cost == solution_cost(model.cost_matrix, solution)
+        costs.append(cost)
+    assert len(costs) > 1
+    assert costs == sorted(set(costs), reverse=True)
+
+
+def test_revisits_are_avoided(model, local):
+    stats = {}
+    tabu_search(local, model.cost_matrix, 5, 200, model=model, seed=4, stats=stats)
+    assert stats["iterations"] == 200
+    assert stats["revisits"] > 0
+
+
+def test_missing_stop_criterion_is_rejected(model, local):
+    with pytest.raises(ValueError):
+        tabu_search(local, model.cost_matrix, 20, None, model=model)
+    with pytest.raises(ValueError):
+        tabu_search(local, model.cost_matrix, 20, 10, operators=("relocate",))